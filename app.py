@@ -1,96 +1,283 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, send_file, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+import time
+_INICIO = time.perf_counter()  # para o relatório de inicialização (ver criar_app)
+
+from flask import Flask, Blueprint, current_app, render_template, request, flash, redirect, url_for, send_file, jsonify, Response, stream_with_context, session, make_response, g, has_app_context, has_request_context, before_render_template, template_rendered
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from flask_wtf.csrf import CSRFProtect
 from dotenv import load_dotenv
 from collections import Counter
-from datetime import datetime, timedelta
-import pandas as pd
-from fpdf import FPDF
+from datetime import datetime, timedelta, date
+from functools import wraps
+from bisect import bisect_left, bisect_right
+from types import SimpleNamespace
+import numpy as np
 import random
 import os
 import io
+import csv
+import json
+import click
+import subprocess
+import sys
+import tempfile
+import threading
 import re
-from sqlalchemy import func
-
-# --- IMPORT DA IA ---
-from google import genai
+import hashlib
+from sqlalchemy import func, event
+from sqlalchemy.engine import Engine
+from indice_sorteios import para_mascara, extrair_dezenas
+from backtest import backtest, FAIXAS_PREMIO
+from loto_logic import gerar_fechamento, pagina_fechamento
+from fechamento_garantia import otimizar_fechamento, aplicar_desenho, validar_garantia, trabalho_estimado, LIMITE_TRABALHO_DIRETO, LIMITE_TRABALHO_FILA
+import estrategias
+import espaco_total
+import modelos
+from modelos import (db, configurar_banco, User, JogoSalvo, ResultadoLotofacil, AcertoJogo, DesenhoFechamento, contem_dezenas,
+                     preparar_banco, obter_indice, versao_resultados, sincronizar_estatisticas, estatisticas_janela, conferir_carteiras,
+                     reabrir_conferencia, desempenho_carteira, atualizar_espaco_total, PASTA_ESPACO)
+from coocorrencia import Coocorrencia
+from replay import ReplayEstrategias, ler_parametros as ler_parametros_replay, jogos_estimados as jogos_estimados_replay
+from tarefas import FilaTarefas, LimiteTarefas, rodar_pool, SITUACOES as SITUACOES_TAREFA
+import exportacao
+from cache_respostas import CacheRespostas
+from consultor_ia import ConsultorIA, ClienteFalso, Ocupado
+import metricas
+# Pesados e usados por poucas rotas, importados na hora: google.genai (IA), openpyxl e fpdf (exportar)
 
+_FIM_IMPORTACOES = time.perf_counter()
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'chave-padrao-insegura')
-
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'database.db')
-app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'static/uploads')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-csrf = CSRFProtect(app)
-db = SQLAlchemy(app)
+# Extensões sem app: criar_app() liga cada uma na aplicação que montar
+csrf = CSRFProtect()
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'rotas.login'
+rotas = Blueprint('rotas', __name__, cli_group=None)
+
+# --- MÉTRICAS (/metrics, formato Prometheus) E PERFILADOR ---
+medidor = metricas.Registro()
+medidor.histograma('lotofacil_requisicao_segundos', "Duração das requisições (até o fim do corpo, inclusive streaming).")
+medidor.histograma('lotofacil_requisicao_sql_consultas', "Consultas SQL por requisição.", metricas.BUCKETS_QUANTIDADE)
+medidor.contador('lotofacil_requisicao_sql_segundos_total', "Tempo gasto no banco, por rota.")
+medidor.contador('lotofacil_requisicao_template_segundos_total', "Tempo gasto renderizando templates, por rota.")
+medidor.contador('lotofacil_sql_consultas_total', "Consultas SQL executadas (dentro e fora de requisições).")
+medidor.contador('lotofacil_sql_segundos_total', "Tempo total das consultas SQL.")
+medidor.contador('lotofacil_jogos_gerados_total', "Jogos entregues pelos geradores.")
+medidor.contador('lotofacil_geracao_segundos_total', "Tempo gasto gerando jogos (jogos/segundo = razão entre os dois contadores).")
+medidor.histograma('lotofacil_ia_segundos', "Duração das chamadas ao modelo do Consultor GR.")
+medidor.histograma('lotofacil_replay_segundos', "Duração dos replays históricos calculados (acertos do cache não entram).")
+medidor.contador('lotofacil_tarefas_enfileiradas_total', "Tarefas postas na fila de segundo plano, por tipo.")
+medidor.contador('lotofacil_perfis_gravados_total', "Perfis .prof gravados de requisições lentas.")
+
+# PERFIL_AMOSTRA=0.05 perfila 5% das requisições; grava as que passarem de PERFIL_LENTO_MS em PERFIL_DIR
+perfilador = metricas.Perfilador(os.getenv('PERFIL_DIR', os.path.join(basedir, 'perfis')),
+                                 amostra=float(os.getenv('PERFIL_AMOSTRA', 0)), limite_ms=int(os.getenv('PERFIL_LENTO_MS', 500)))
+
+def rota_atual():
+    """Regra da rota ('/api/estatisticas/<int:limite>'), não a URL: mantém poucas séries."""
+    return request.url_rule.rule if request.url_rule else 'sem_rota'
+
+@rotas.before_app_request
+def iniciar_medicao():
+    g.inicio = time.perf_counter()
+    g.sql_consultas, g.sql_segundos, g.template_segundos = 0, 0.0, 0.0
+    g.perfil = perfilador.iniciar()
+
+@rotas.after_app_request
+def agendar_medicao(resposta):
+    # Respostas em streaming continuam depois daqui: a medição fecha quando o corpo termina de sair
+    if 'inicio' not in g: return resposta
+    medicao, rotulos = g._get_current_object(), {'rota': rota_atual(), 'metodo': request.method, 'status': str(resposta.status_code)}
+    resposta.call_on_close(lambda: registrar_requisicao(medicao, rotulos))
+    return resposta
+
+def registrar_requisicao(medicao, rotulos):
+    duracao = time.perf_counter() - medicao.inicio
+    medidor.observar('lotofacil_requisicao_segundos', duracao, **rotulos)
+    medidor.observar('lotofacil_requisicao_sql_consultas', medicao.sql_consultas, rota=rotulos['rota'])
+    medidor.inc('lotofacil_requisicao_sql_segundos_total', medicao.sql_segundos, rota=rotulos['rota'])
+    medidor.inc('lotofacil_requisicao_template_segundos_total', medicao.template_segundos, rota=rotulos['rota'])
+    if medicao.perfil and perfilador.finalizar(medicao.perfil, rotulos['rota'], duracao * 1000):
+        medidor.inc('lotofacil_perfis_gravados_total')
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def sql_inicio(conn, cursor, statement, parameters, context, executemany):
+    if context is not None: context._inicio_metricas = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def sql_fim(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_metricas', None)
+    if inicio is None: return
+    duracao = time.perf_counter() - inicio
+    medidor.inc('lotofacil_sql_consultas_total')
+    medidor.inc('lotofacil_sql_segundos_total', duracao)
+    if has_request_context() and 'sql_consultas' in g:
+        g.sql_consultas += 1; g.sql_segundos += duracao
+
+def template_inicio(sender, template, context, **extra):
+    if has_request_context(): g.template_inicio = time.perf_counter()
+
+def template_fim(sender, template, context, **extra):
+    if has_request_context() and 'template_inicio' in g:
+        g.template_segundos += time.perf_counter() - g.pop('template_inicio')
+
+def medir_geracao(estrategia, quantidade, segundos):
+    medidor.inc('lotofacil_jogos_gerados_total', quantidade, estrategia=estrategia)
+    medidor.inc('lotofacil_geracao_segundos_total', segundos, estrategia=estrategia)
+
+def conexoes_do_banco():
+    if not has_app_context(): return []
+    pools = [(chave or 'principal', engine.pool) for chave, engine in db.engines.items()]
+    return [({'pool': nome}, pool.checkedout()) for nome, pool in pools if hasattr(pool, 'checkedout')]
+
+@medidor.coletor
+def metricas_dos_caches():
+    consultor = _consultor.get('instancia')
+    caches = {'respostas': cache, 'ia': consultor.cache if consultor else None}
+    consultas = [({'cache': nome, 'resultado': r}, q) for nome, c in caches.items() if c is not None for r, q in c.consultas.items()]
+    itens = [({'cache': nome}, len(c)) for nome, c in caches.items() if c is not None]
+    itens.append(({'cache': 'janelas'}, modelos.itens_cache_janelas()))
+    return [('lotofacil_cache_consultas_total', 'counter', "Consultas aos caches: acerto (memoria/arquivo) ou falta.", consultas),
+            ('lotofacil_cache_itens', 'gauge', "Itens guardados em memória por cache.", itens),
+            ('lotofacil_banco_conexoes', 'gauge', "Conexões em uso por pool do banco (principal / leitura).", conexoes_do_banco()),
+            ('lotofacil_perfilador_amostra', 'gauge', "Fração das requisições perfiladas (0 = desligado).", [({}, perfilador.amostra)]),
+            ('lotofacil_inicializacao_segundos', 'gauge', "Tempo de subida do processo: importações e criar_app.",
+             [({'fase': f}, _inicializacao[f]) for f in ('importacoes', 'criar_app') if f in _inicializacao])]
 
 # --- CONFIGURAÇÃO DA IA ---
-CHAVE_API = "SUA_CHAVE_AQUI_AIza..." 
-
-try:
-    client = genai.Client(api_key=CHAVE_API)
-except Exception as e:
-    print(f"Aviso: IA não configurada. {e}")
-    client = None
-
-# --- MODELOS ---
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100))
-    email = db.Column(db.String(100), unique=True)
-    telefone = db.Column(db.String(20))
-    senha = db.Column(db.String(100))
-    foto_perfil = db.Column(db.String(120), default='default.png')
-    is_admin = db.Column(db.Boolean, default=False)
-    jogos = db.relationship('JogoSalvo', backref='dono', lazy=True)
-
-class JogoSalvo(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    numeros = db.Column(db.String(100))
-    tipo = db.Column(db.String(50))
-    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-
-class ResultadoLotofacil(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    concurso = db.Column(db.Integer, unique=True, nullable=False)
-    data_sorteio = db.Column(db.String(20))
-    dezenas = db.Column(db.String(100))
+CHAVE_API = os.getenv('GEMINI_API_KEY', "SUA_CHAVE_AQUI_AIza...")
+_consultor = {}
+_trava_consultor = threading.Lock()
+
+def obter_consultor():
+    """Cria o cliente na primeira pergunta: só importar google.genai leva mais de meio segundo. None se a IA não está configurada."""
+    with _trava_consultor:
+        if 'instancia' not in _consultor:
+            try:
+                # IA_CLIENTE_FALSO=1 troca o Gemini por um eco local (testes e desenvolvimento sem chave)
+                if os.getenv('IA_CLIENTE_FALSO'):
+                    client = ClienteFalso()
+                else:
+                    from google import genai
+                    client = genai.Client(api_key=CHAVE_API)
+            except Exception as e:
+                print(f"Aviso: IA não configurada. {e}")
+                client = None
+            _consultor['instancia'] = ConsultorIA(client, workers=int(os.getenv('IA_WORKERS', 4)), timeout=int(os.getenv('IA_TIMEOUT', 30)),
+                                                  ao_terminar=lambda segundos, situacao: medidor.observar('lotofacil_ia_segundos', segundos, situacao=situacao)) if client else None
+        return _consultor['instancia']
 
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(User, int(user_id))
 
+@rotas.cli.command('preparar-banco')
+def preparar_banco_cli():
+    """Cria tabelas, aplica a migração das máscaras e recalcula as estatísticas."""
+    preparar_banco(); print('Banco pronto.')
+
+@rotas.cli.command('construir-espaco')
+def construir_espaco_cli():
+    """Monta o arquivo com os 3.268.760 jogos possíveis e o histórico de acertos de cada um."""
+    idx = obter_indice()
+    espaco_total.construir(PASTA_ESPACO, zip(idx.concursos, idx.mascaras), progresso=lambda i, t: print(f'   {i}/{t} concursos...'))
+    print(f'Espaço total pronto em {espaco_total.caminhos(PASTA_ESPACO)[0]}.')
+
+# --- CACHE DE RESPOSTAS (chaves com a versão dos resultados, ver modelos.versao_resultados) ---
+cache = CacheRespostas(maximo=512, ttl=int(os.getenv('CACHE_TTL', 300)), arquivo=os.getenv('CACHE_ARQUIVO'))
+
+def em_cache(publico=False):
+    """
+    Para rotas que só mudam quando entra/sai um concurso.
+
+    A ETag sai de rota + parâmetros + versão dos resultados, sem executar a view: se o
+    navegador/proxy mandar a mesma, responde 304 direto. Rotas públicas (JSON) também
+    guardam o corpo no cache. Páginas HTML entram com usuário, token CSRF da sessão e
+    uma janela de 30 min na chave (o token da página tem validade), e nunca respondem
+    304 com mensagem flash pendente.
+    """
+    def decorador(view):
+        @wraps(view)
+        def envolvida(*args, **kwargs):
+            if not publico and session.get('_flashes'): return view(*args, **kwargs)
+            versao, modificado = versao_resultados()
+            partes = [request.endpoint, sorted(kwargs.items()), sorted(request.args.items(multi=True)), versao]
+            if not publico: partes += [current_user.get_id(), session.get('csrf_token'), int(time.time() // 1800)]
+            chave = hashlib.sha1(json.dumps(partes, default=str).encode()).hexdigest()
+            etag = chave[:24]
+
+            if etag in request.if_none_match or (publico and not request.if_none_match and request.if_modified_since and modificado <= request.if_modified_since):
+                resposta = Response(status=304)
+            elif publico:
+                corpo = cache.obter(chave)
+                if corpo is None:
+                    resposta = make_response(view(*args, **kwargs))
+                    if resposta.status_code != 200: return resposta
+                    corpo = (resposta.get_data(), resposta.mimetype)
+                    cache.guardar(chave, corpo)
+                resposta = Response(corpo[0], mimetype=corpo[1])
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200: return resposta
+
+            resposta.set_etag(etag)
+            resposta.last_modified = modificado
+            resposta.cache_control.no_cache = True  # pode guardar, mas revalida sempre (barato: 304)
+            if publico: resposta.cache_control.public = True
+            else: resposta.cache_control.private = True
+            return resposta
+        return envolvida
+    return decorador
+
+def somente_leitura(view):
+    """Rotas de consulta: os SELECTs vão para o pool de leitura (modelos.SessaoRoteada), sem disputar com quem grava."""
+    @wraps(view)
+    def envolvida(*args, **kwargs):
+        g.banco_leitura = True
+        return view(*args, **kwargs)
+    return envolvida
+
+def resultado_simples(r):
+    """Cópia 'solta' de um ResultadoLotofacil para guardar no cache (os templates só leem atributos)."""
+    return SimpleNamespace(id=r.id, concurso=r.concurso, data_sorteio=r.data_sorteio, dezenas=r.dezenas)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# --- ESTATÍSTICAS ---
+# --- COOCORRÊNCIA (pares e trios que saem juntos, ver coocorrencia.py) ---
+coocorrencia = Coocorrencia()
+_assinatura_coocorrencia = None
+
+def obter_coocorrencia():
+    """Acompanha o índice: concurso novo no fim custa O(1); exclusão ou carga grande reconta."""
+    global _assinatura_coocorrencia
+    idx = obter_indice()
+    assinatura = idx.assinatura()
+    if _assinatura_coocorrencia != assinatura:
+        coocorrencia.sincronizar(idx.janela(0))
+        _assinatura_coocorrencia = assinatura
+    return coocorrencia
+
+def afinidade_pedida(dados):
+    """Parâmetros de pares fortes (estrategias.ler_afinidade) já com os pesos da janela pedida."""
+    afinidade = estrategias.ler_afinidade(dados)
+    if afinidade: afinidade['pesos'] = obter_coocorrencia().pesos(afinidade['janela'])
+    return afinidade
+
 def obter_estatisticas(limite=10):
-    query = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc())
-    if limite > 0: resultados_db = query.limit(limite).all()
-    else: resultados_db = query.all()
-    todos_numeros = []
-    if resultados_db:
-        for res in resultados_db:
-            nums = [int(n) for n in re.findall(r'\d+', res.dezenas)]
-            todos_numeros.extend(nums)
-    top_10 = Counter(todos_numeros).most_common(10)
+    contagem = estatisticas_janela(limite)['frequencias']
+    top_10 = Counter({n: qtd for n, qtd in enumerate(contagem, 1) if qtd}).most_common(10)
     stats_ordenado = sorted(top_10, key=lambda x: x[0])
     return stats_ordenado
 
 # --- ROTAS ---
-@app.route('/')
+@rotas.route('/')
+@somente_leitura
+@em_cache()
 def index():
     filtro = request.args.get('filtro', default=10, type=int)
     stats = obter_estatisticas(filtro)
@@ -99,343 +286,718 @@ def index():
     chart_data = [x[1] for x in stats]
     return render_template('index.html', estatisticas=stats, filtro_atual=filtro, ultimo_concurso_db=ultimo_concurso_db, chart_labels=chart_labels, chart_data=chart_data)
 
-@app.route('/api/estatisticas/<int:limite>')
+@rotas.route('/api/estatisticas/<int:limite>')
+@somente_leitura
+@em_cache(publico=True)
 def api_estatisticas(limite):
+    janela = estatisticas_janela(limite)
     stats = obter_estatisticas(limite)
     labels = [f"{x[0]:02d}" for x in stats]
     values = [x[1] for x in stats]
     html_lista = ""
     for num, qtd in stats:
         html_lista += f'<div class="border rounded-3 px-2 py-1 text-center bg-light" style="min-width: 50px;"><span class="d-block fw-bold fs-6 text-danger">{num:02d}</span><span class="small text-muted">{qtd}x</span></div>'
-    return jsonify({'labels': labels, 'data': values, 'html': html_lista})
+    return jsonify({'labels': labels, 'data': values, 'html': html_lista, 'atraso': janela['atraso'],
+                    'media_impares': janela['media_impares'], 'media_primos': janela['media_primos'], 'media_moldura': janela['media_moldura']})
 
-# --- GERAÇÃO PURA (MODIFICADA: TIPO LIMPO) ---
-@app.route('/gerar-pura', methods=['POST'])
-def gerar_pura():
-    ultimo_concurso_db = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first()
-    
-    ultimos_10 = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).limit(10).all()
-    if not ultimos_10:
-        flash("Preciso de pelo menos 10 resultados cadastrados no Admin para calcular a Estatística Pura.", "warning")
-        return redirect(url_for('index'))
-
-    todos_numeros = []
-    ultimo_resultado_nums = set()
-    if ultimos_10:
-        ultimo_resultado_nums = set(int(n) for n in re.findall(r'\d+', ultimos_10[0].dezenas))
-
-    for res in ultimos_10:
-        nums = [int(n) for n in re.findall(r'\d+', res.dezenas)]
-        todos_numeros.extend(nums)
-    
-    contagem = Counter(todos_numeros)
-    lista_analise = []
-    for n in range(1, 26):
-        freq = contagem[n]
-        no_ultimo = 1 if n in ultimo_resultado_nums else 0
-        lista_analise.append({'num': n, 'freq': freq, 'hot': no_ultimo})
-
-    ranking = sorted(lista_analise, key=lambda x: (x['freq'], x['hot'], x['num']), reverse=True)
-    fixas_obj = ranking[:7]
-    reservas_obj = ranking[7:]
-    fixas = sorted([x['num'] for x in fixas_obj])
-    reservas = [x['num'] for x in reservas_obj]
-
-    jogos = []
-    # Jogo 1
-    comp1 = reservas[:8]
-    j1_nums = sorted(fixas + comp1)
-    # AQUI: Criamos 'tipo' (com emoji) e 'tipo_limpo' (sem emoji)
-    jogos.append({
-        'tipo': 'Pura - Lógica (Top Reservas) 🧠', 
-        'tipo_limpo': 'Pura - Lógica',
-        'numeros': j1_nums, 
-        'numeros_str': ", ".join([f"{n:02d}" for n in j1_nums]), 
-        'zap': f"Pura Lógica: {j1_nums}"
-    })
-    # Jogo 2
-    comp2 = reservas[:5] + reservas[-3:]
-    j2_nums = sorted(fixas + comp2)
-    jogos.append({
-        'tipo': 'Pura - Equilíbrio (C/ Zebras) ⚖️', 
-        'tipo_limpo': 'Pura - Equilíbrio',
-        'numeros': j2_nums, 
-        'numeros_str': ", ".join([f"{n:02d}" for n in j2_nums]), 
-        'zap': f"Pura Equilíbrio: {j2_nums}"
-    })
-    # Jogo 3
-    comp3 = reservas[5:13] 
-    j3_nums = sorted(fixas + comp3)
-    jogos.append({
-        'tipo': 'Pura - Intermediária (Meio Tabela) 🎯', 
-        'tipo_limpo': 'Pura - Intermediária',
-        'numeros': j3_nums, 
-        'numeros_str': ", ".join([f"{n:02d}" for n in j3_nums]), 
-        'zap': f"Pura Meio: {j3_nums}"
-    })
+# --- GERAÇÃO (a lógica fica em estrategias.py; aqui só entrada e tela) ---
+def formatar_jogos(jogos):
+    """(tipo, tipo_limpo, dezenas) do motor -> dicts usados no index.html."""
+    saida = []
+    for tipo, tipo_limpo, numeros in jogos:
+        nums_fmt = ", ".join([f"{n:02d}" for n in numeros])
+        saida.append({'tipo': tipo, 'tipo_limpo': tipo_limpo, 'numeros': list(numeros), 'numeros_str': nums_fmt, 'zap': f"{tipo_limpo}: {nums_fmt}"})
+    return saida
 
-    stats = obter_estatisticas(10)
+def pagina_com_jogos(jogos, filtro=10, **extras):
+    # Nas rotas HTML a geração é tudo o que acontece antes desta página: mede do início da requisição até aqui
+    medir_geracao(request.endpoint.rpartition('.')[2], len(jogos), time.perf_counter() - g.inicio)
+    stats = obter_estatisticas(filtro)
+    ultimo_concurso_db = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first()
     chart_labels = [f"{x[0]:02d}" for x in stats]
     chart_data = [x[1] for x in stats]
+    return render_template('index.html', jogos=formatar_jogos(jogos), estatisticas=stats, filtro_atual=filtro, chart_labels=chart_labels, chart_data=chart_data, ultimo_concurso_db=ultimo_concurso_db, **extras)
 
+def snapshot_estrategias():
+    """Retrato usado pelo motor: último concurso + frequências dos últimos 10 (None sem resultados)."""
+    ultimo = obter_indice().ultimo()
+    if not ultimo: return None
+    return estrategias.montar_snapshot(ultimo[0], ultimo[1], estatisticas_janela(10)['frequencias'])
+
+def gerar_com_filtros(fixos, qtd_jogos, filtros, nome, emoji='', afinidade=None, minimo_fixos=0):
+    """Padrão/Surpresinha com filtros (soma, ímpares, primos, moldura, repetidas, sequência) e/ou pares fortes. Avisa quantos candidatos custou."""
+    res = estrategias.gerar_filtrado(snapshot_estrategias(), fixos, qtd_jogos, filtros, afinidade=afinidade, minimo_fixos=minimo_fixos)
+    qtd = len(res['jogos'])
+    if not qtd: raise ValueError("Nenhum jogo passou nos filtros. Afrouxe as faixas e tente de novo.")
+    categoria = "success" if res['completo'] else "warning"
+    pares = f" Pares fortes: {afinidade['modo']}." if afinidade else ""
+    if filtros: flash(f"{qtd} de {qtd_jogos} jogos passaram nos filtros ({res['examinados'] / qtd:.0f} candidatos analisados por jogo).{pares}", categoria)
+    else: flash(f"{qtd} jogos gerados!{pares}", categoria)
+    return estrategias.rotular(res['jogos'], nome, emoji)
+
+@rotas.route('/gerar-pura', methods=['POST'])
+def gerar_pura():
+    snapshot = snapshot_estrategias()
+    if not snapshot:
+        flash("Preciso de pelo menos 10 resultados cadastrados no Admin para calcular a Estatística Pura.", "warning")
+        return redirect(url_for('rotas.index'))
+    fixas, jogos = estrategias.gerar_pura(snapshot)
     flash("Estratégia Pura calculada com sucesso! (3 Jogos)", "success")
-    return render_template('index.html', jogos=jogos, estatisticas=stats, filtro_atual=10, chart_labels=chart_labels, chart_data=chart_data, pura_fixas=fixas, ultimo_concurso_db=ultimo_concurso_db)
+    return pagina_com_jogos(jogos, pura_fixas=list(fixas))
 
-# --- GERAÇÃO PADRÃO (MODIFICADA: TIPO LIMPO) ---
-@app.route('/gerar-ouro', methods=['POST'])
-def gerar_ouro():
-    ultimo_concurso_db = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first()
+# Jogos gerados para a tela (viram HTML): a API em lote tem o próprio teto (MAX_JOGOS_API)
+MAX_JOGOS_TELA = 50
 
+@rotas.route('/gerar-ouro', methods=['POST'])
+def gerar_ouro():
     ultimo = [int(n) for n in request.form.getlist('numeros')]
     fixos = [int(n) for n in request.form.getlist('fixos')]
     filtro = request.form.get('filtro_hidden', default=10, type=int)
-    qtd_jogos = int(request.form.get('qtd_jogos', 4))
-    stats = obter_estatisticas(filtro)
-    chart_labels = [f"{x[0]:02d}" for x in stats]
-    chart_data = [x[1] for x in stats]
-    
-    if len(ultimo) != 15 or len(fixos) < 1 or len(fixos) > 14:
+    qtd_jogos = request.form.get('qtd_jogos', default=4, type=int)
+    if len(ultimo) != 15:
         flash("Verifique os números marcados na aba Estratégia.", "warning")
-        return redirect(url_for('index'))
-
-    todos, set_fixos = set(range(1, 26)), set(fixos)
-    disponiveis = list(todos - set_fixos)
-    jogos = []
-    for i in range(qtd_jogos):
-        try:
-            restantes = 15 - len(set_fixos)
-            if restantes > 0:
-                comp = random.sample(disponiveis, restantes)
-                final = sorted(list(set_fixos) + comp)
-            else: final = sorted(list(set_fixos))
-            nums_fmt = ", ".join([f"{n:02d}" for n in final])
-            letra = chr(65 + i) if i < 26 else f"#{i+1}"
-            jogos.append({
-                'tipo': f'Estratégia Padrão {letra}', 
-                'tipo_limpo': f'Estratégia Padrão {letra}', # Sem emoji mesmo
-                'numeros': final, 
-                'numeros_str': nums_fmt, 
-                'zap': f"Jogo {letra}: {nums_fmt}"
-            })
-        except: pass
-
-    flash(f"{len(jogos)} Jogos gerados com sucesso!", "success")
-    return render_template('index.html', jogos=jogos, selecionados=ultimo, fixos_selecionados=fixos, estatisticas=stats, filtro_atual=filtro, chart_labels=chart_labels, chart_data=chart_data, ultimo_concurso_db=ultimo_concurso_db)
-
-# --- MÉTODO 25 DEZENAS (MODIFICADA: TIPO LIMPO) ---
-@app.route('/gerar-metodo-25', methods=['POST'])
-def gerar_metodo_25():
-    ultimo_concurso_db = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first()
+        return redirect(url_for('rotas.index'))
+    if not 1 <= qtd_jogos <= MAX_JOGOS_TELA:
+        qtd_jogos = min(max(qtd_jogos, 1), MAX_JOGOS_TELA)
+        flash(f"A quantidade de jogos vai de 1 a {MAX_JOGOS_TELA}: gerando {qtd_jogos}.", "warning")
+    try:
+        filtros, afinidade = estrategias.ler_filtros(request.form), afinidade_pedida(request.form)
+        if filtros or afinidade: jogos = gerar_com_filtros(fixos, qtd_jogos, filtros, 'Estratégia Padrão', afinidade=afinidade, minimo_fixos=1)
+        else: jogos = estrategias.gerar_padrao(snapshot_estrategias(), fixos, qtd_jogos)
+    except ValueError as e: flash(str(e), "warning"); return redirect(url_for('rotas.index'))
+    if not (filtros or afinidade): flash(f"{len(jogos)} Jogos gerados com sucesso!", "success")
+    return pagina_com_jogos(jogos, filtro=filtro, selecionados=ultimo, fixos_selecionados=fixos)
 
-    ultimo_str = request.form.get('ultimo_resultado_25', '') 
-    fixas_sorteadas = [int(n) for n in request.form.getlist('fixas_sorteadas')] 
-    fixas_ausentes = [int(n) for n in request.form.getlist('fixas_ausentes')]   
-    
+@rotas.route('/gerar-metodo-25', methods=['POST'])
+def gerar_metodo_25():
+    ultimo_str = request.form.get('ultimo_resultado_25', '')
+    fixas_sorteadas = [int(n) for n in request.form.getlist('fixas_sorteadas')]
+    fixas_ausentes = [int(n) for n in request.form.getlist('fixas_ausentes')]
     if not ultimo_str:
-        flash("Primeiro preencha o Último Resultado na aba Método 25.", "danger"); return redirect(url_for('index'))
-
-    sorteadas = set(int(n.strip()) for n in ultimo_str.split(',') if n.strip().isdigit())
-    todas = set(range(1, 26))
-    ausentes = todas - sorteadas
-
-    if len(sorteadas) != 15: flash("O último resultado precisa ter 15 números.", "warning"); return redirect(url_for('index'))
-    if len(fixas_sorteadas) != 3: flash("Você precisa escolher exatamente 3 Fixas das Sorteadas.", "warning"); return redirect(url_for('index'))
-    if len(fixas_ausentes) != 2: flash("Você precisa escolher exatamente 2 Fixas das Ausentes.", "warning"); return redirect(url_for('index'))
-    
-    resto_sorteadas = list(sorteadas - set(fixas_sorteadas)); random.shuffle(resto_sorteadas)
-    g1_sort = resto_sorteadas[:6]; g2_sort = resto_sorteadas[6:]
-    resto_ausentes = list(ausentes - set(fixas_ausentes)); random.shuffle(resto_ausentes)
-    g1_aus = resto_ausentes[:4]; g2_aus = resto_ausentes[4:]
-
-    jogos_finais = []
-    # Criação dos jogos com tipo e tipo_limpo
-    j1 = list(set(fixas_sorteadas) | set(g1_sort) | set(fixas_ausentes) | set(g1_aus)); 
-    jogos_finais.append({'tipo': 'M25 - Jogo 1 (G1+G1) 🎱', 'tipo_limpo': 'M25 - Jogo 1', 'numeros': sorted(j1)})
-    
-    j2 = list(set(fixas_sorteadas) | set(g1_sort) | set(fixas_ausentes) | set(g2_aus)); 
-    jogos_finais.append({'tipo': 'M25 - Jogo 2 (G1+G2) 🎱', 'tipo_limpo': 'M25 - Jogo 2', 'numeros': sorted(j2)})
-    
-    j3 = list(set(fixas_sorteadas) | set(g2_sort) | set(fixas_ausentes) | set(g1_aus)); 
-    jogos_finais.append({'tipo': 'M25 - Jogo 3 (G2+G1) 🎱', 'tipo_limpo': 'M25 - Jogo 3', 'numeros': sorted(j3)})
-    
-    j4 = list(set(fixas_sorteadas) | set(g2_sort) | set(fixas_ausentes) | set(g2_aus)); 
-    jogos_finais.append({'tipo': 'M25 - Jogo 4 (G2+G2) 🎱', 'tipo_limpo': 'M25 - Jogo 4', 'numeros': sorted(j4)})
-
-    jogos_view = []
-    for j in jogos_finais:
-        nums_fmt = ", ".join([f"{n:02d}" for n in j['numeros']])
-        jogos_view.append({
-            'tipo': j['tipo'], 
-            'tipo_limpo': j['tipo_limpo'],
-            'numeros': j['numeros'], 
-            'numeros_str': nums_fmt, 
-            'zap': f"{j['tipo']}: {nums_fmt}"
-        })
-
-    stats = obter_estatisticas(10)
-    chart_labels = [f"{x[0]:02d}" for x in stats]
-    chart_data = [x[1] for x in stats]
-
+        flash("Primeiro preencha o Último Resultado na aba Método 25.", "danger"); return redirect(url_for('rotas.index'))
+    sorteadas = [int(n.strip()) for n in ultimo_str.split(',') if n.strip().isdigit()]
+    try: jogos = estrategias.gerar_metodo_25(snapshot_estrategias(), sorteadas, fixas_sorteadas, fixas_ausentes)
+    except ValueError as e: flash(str(e), "warning"); return redirect(url_for('rotas.index'))
     flash("Método 25 Dezenas gerado com sucesso! (4 Jogos)", "success")
-    return render_template('index.html', jogos=jogos_view, estatisticas=stats, filtro_atual=10, chart_labels=chart_labels, chart_data=chart_data, ultimo_concurso_db=ultimo_concurso_db)
+    return pagina_com_jogos(jogos)
 
-# --- SURPRESINHA (MODIFICADA: TIPO LIMPO) ---
-@app.route('/surpresinha', methods=['POST'])
+@rotas.route('/surpresinha', methods=['POST'])
 def surpresinha():
-    ultimo_concurso_db = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first()
-
     try: qtd_jogos = int(request.form.get('qtd_surpresa', 1))
     except ValueError: qtd_jogos = 1
-    if qtd_jogos < 1: qtd_jogos = 1
-    if qtd_jogos > 50: qtd_jogos = 50 
-
-    jogos = []
-    for i in range(qtd_jogos):
-        nums = sorted(random.sample(range(1, 26), 15))
-        nums_fmt = ", ".join([f"{n:02d}" for n in nums])
-        letra = chr(65 + i) if i < 26 else f"#{i+1}"
-        jogos.append({
-            'tipo': f'Surpresinha {letra} 🎲', 
-            'tipo_limpo': f'Surpresinha {letra}', # Sem emoji
-            'numeros': nums, 
-            'numeros_str': nums_fmt, 
-            'zap': f"Surpresa {letra}: {nums_fmt}"
-        })
-    
-    stats = obter_estatisticas(10)
-    chart_labels = [f"{x[0]:02d}" for x in stats]
-    chart_data = [x[1] for x in stats]
-    
-    flash(f"{len(jogos)} Surpresinhas geradas! Boa sorte 🍀", "success")
-    return render_template('index.html', jogos=jogos, estatisticas=stats, filtro_atual=10, chart_labels=chart_labels, chart_data=chart_data, ultimo_concurso_db=ultimo_concurso_db)
+    qtd_jogos = min(max(qtd_jogos, 1), MAX_JOGOS_TELA)
+    try:
+        filtros, afinidade = estrategias.ler_filtros(request.form), afinidade_pedida(request.form)
+        if filtros or afinidade: jogos = gerar_com_filtros((), qtd_jogos, filtros, 'Surpresinha', '🎲', afinidade)
+        else: jogos = estrategias.gerar_surpresinha(snapshot_estrategias(), qtd_jogos)
+    except ValueError as e: flash(str(e), "warning"); return redirect(url_for('rotas.index'))
+    if not (filtros or afinidade): flash(f"{len(jogos)} Surpresinhas geradas! Boa sorte 🍀", "success")
+    return pagina_com_jogos(jogos)
+
+# --- API DE GERAÇÃO EM LOTE ---
+MAX_JOGOS_API = 500_000
+
+def _lista_param(dados, nome):
+    # MultiDict (query/form) também é dict: testar o getlist primeiro, senão ?fixos=3&fixos=9 viraria só [3]
+    valor = dados.getlist(nome) if hasattr(dados, 'getlist') else dados.get(nome)
+    if isinstance(valor, str): return extrair_dezenas(valor)
+    if isinstance(valor, list) and len(valor) == 1 and isinstance(valor[0], str): return extrair_dezenas(valor[0])
+    return [int(n) for n in valor or []]
+
+def medir_blocos(blocos, estrategia):
+    """Repassa os blocos do gerador contando jogos e só o tempo de gerar (a serialização fica de fora)."""
+    blocos = iter(blocos)
+    while True:
+        inicio = time.perf_counter()
+        bloco = next(blocos, None)
+        if bloco is None: return
+        medir_geracao(estrategia, len(bloco), time.perf_counter() - inicio)
+        yield bloco
+
+@rotas.route('/api/v1/gerar/<estrategia>', methods=['GET', 'POST'])
+@csrf.exempt
+def api_gerar(estrategia):
+    """
+    Gera jogos em lote sem renderizar template.
+    Parâmetros (JSON ou query/form): qtd, semente, formato=json|ndjson, fixos (padrao),
+    ultimo/fixas_sorteadas/fixas_ausentes (metodo25). Cada jogo é uma lista de 15 inteiros.
+    Padrão e Surpresinha aceitam filtros: soma_min/_max, impares_*, primos_*, moldura_*,
+    repetidas_* (do último concurso) e max_consecutivas; aí os jogos saem distintos.
+    Também aceitam pares=favorecer|evitar (pares_janela, pares_forca): puxa os jogos para
+    os pares de dezenas que mais (ou menos) saíram juntos.
+    """
+    if estrategia not in estrategias.LOTES: return jsonify({'success': False, 'message': f"Estratégia desconhecida: {estrategia}"}), 404
+    dados = request.get_json(silent=True) or request.values
+    try:
+        qtd = int(dados.get('qtd', 1))
+        semente = dados.get('semente')
+        semente = int(semente) if semente not in (None, '') else int(np.random.SeedSequence().entropy % 2**63)
+        if not 1 <= qtd <= MAX_JOGOS_API: raise ValueError(f"qtd deve estar entre 1 e {MAX_JOGOS_API}.")
+        parametros = {}
+        if estrategia == 'padrao': parametros['fixos'] = _lista_param(dados, 'fixos')
+        elif estrategia == 'metodo25':
+            parametros = {'sorteadas': _lista_param(dados, 'ultimo'), 'fixas_sorteadas': _lista_param(dados, 'fixas_sorteadas'), 'fixas_ausentes': _lista_param(dados, 'fixas_ausentes')}
+        snapshot = snapshot_estrategias()
+        rng = np.random.default_rng(semente)
+        filtros, afinidade = estrategias.ler_filtros(dados), estrategias.ler_afinidade(dados)
+        if (filtros or afinidade) and estrategia not in ('padrao', 'surpresinha'): raise ValueError("Filtros e pares só valem para 'padrao' e 'surpresinha'.")
+        if afinidade:
+            afinidade['pesos'] = obter_coocorrencia().pesos(afinidade['janela'])
+            parametros['afinidade'] = afinidade
+        if filtros:
+            inicio = time.perf_counter()
+            filtrado = estrategias.gerar_filtrado(snapshot, rng=rng, qtd=qtd, filtros=filtros, minimo_fixos=int(estrategia == 'padrao'), **parametros)
+            medir_geracao(estrategia, len(filtrado['jogos']), time.perf_counter() - inicio)
+            blocos = [filtrado['jogos']]
+        else:
+            blocos = medir_blocos(estrategias.LOTES[estrategia](snapshot, qtd=qtd, rng=rng, **parametros), estrategia)
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    cabecalho = {'success': True, 'estrategia': estrategia, 'semente': semente, 'concurso_base': snapshot['concurso'] if snapshot else None}
+    if afinidade: cabecalho['pares'] = {k: afinidade[k] for k in ('modo', 'janela', 'forca')}
+    if filtros:
+        aceitos = len(filtrado['jogos'])
+        cabecalho.update({'filtros': filtros, 'completo': filtrado['completo'], 'examinados': filtrado['examinados'],
+                          'examinados_por_jogo': round(filtrado['examinados'] / aceitos, 2) if aceitos else None})
+    if dados.get('formato') == 'ndjson':
+        # Uma linha por jogo: o cliente processa enquanto recebe
+        def linhas():
+            yield json.dumps(cabecalho) + "\n"
+            for bloco in blocos:
+                yield json.dumps(bloco.tolist(), separators=(',', ':'))[1:-1].replace('],[', ']\n[') + "\n"
+        return Response(stream_with_context(linhas()), mimetype='application/x-ndjson')
+
+    def documento():
+        yield json.dumps(cabecalho)[:-1] + ', "jogos": ['
+        primeiro = True
+        for bloco in blocos:
+            yield ("" if primeiro else ",") + json.dumps(bloco.tolist(), separators=(',', ':'))[1:-1]
+            primeiro = False
+        yield "]}"
+    return Response(stream_with_context(documento()), mimetype='application/json')
+
+@rotas.route('/api/v1/coocorrencia')
+@somente_leitura
+@em_cache(publico=True)
+def api_coocorrencia():
+    """
+    Pares e trios de dezenas que mais/menos saem juntos. Parâmetros: janela (últimos N
+    concursos, 0 = todos), top (pares, até 300), trios (até 2300), dezena (parceiras de
+    uma dezena) e matriz=1 (matriz 25x25 completa; a diagonal é a frequência de cada dezena).
+    'afinidade' = vezes / esperado pelo acaso (1.0 = neutro).
+    """
+    try:
+        janela = request.args.get('janela', 0, type=int)
+        top = request.args.get('top', 15, type=int)
+        trios = request.args.get('trios', 10, type=int)
+        dezena = request.args.get('dezena', type=int)
+        if janela < 0 or not 0 <= top <= 300 or not 0 <= trios <= 2300: raise ValueError("Use janela >= 0, top entre 0 e 300 e trios entre 0 e 2300.")
+        if dezena is not None and not 1 <= dezena <= 25: raise ValueError("A dezena deve estar entre 1 e 25.")
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    resumo = obter_coocorrencia().resumo(janela, top, trios, dezena, matriz=request.args.get('matriz') in ('1', 'true'))
+    return jsonify({'success': True, 'janela': janela, **resumo})
+
+# --- ESPAÇO TOTAL (todos os jogos possíveis, ver espaco_total.py) ---
+espaco = espaco_total.EspacoTotal(PASTA_ESPACO)
+
+def obter_espaco():
+    """Leitor do espaço total na versão gravada (o delta entra por quem grava resultados), ou None se o arquivo não foi construído."""
+    return espaco.atual()
+
+@rotas.route('/api/v1/espaco')
+def api_espaco():
+    """
+    Consulta sobre todos os C(25,15) jogos.
+    ?dezenas=... devolve um jogo (quantas vezes fez 11..15 no histórico); senão filtra
+    pelos mesmos filtros da geração + faixa/vezes_min e devolve o total e até `limite` jogos
+    (os que mais fizeram a faixa primeiro).
+    """
+    et = obter_espaco()
+    if et is None: return jsonify({'success': False, 'message': "Espaço total ainda não construído. Rode 'flask construir-espaco'."}), 503
+
+    if request.args.get('dezenas'):
+        numeros = set(extrair_dezenas(request.args['dezenas']))
+        linha = et.linha(para_mascara(numeros)) if len(numeros) == 15 else None
+        if linha is None: return jsonify({'success': False, 'message': 'Informe 15 números válidos.'}), 400
+        return jsonify({'success': True, 'concursos': et.qtd_concursos, 'jogo': espaco_total.como_dict(linha)})
+
+    try:
+        filtros = estrategias.ler_filtros(request.args)
+        faixa = request.args.get('faixa', type=int)
+        if faixa is not None and faixa not in espaco_total.FAIXAS: raise ValueError("faixa deve ser de 11 a 15.")
+        vezes_min = max(request.args.get('vezes_min', 1, type=int), 0)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    limite = min(max(request.args.get('limite', 100, type=int), 0), 1000)
+    ultimo = obter_indice().ultimo()
+    if 'repetidas' in filtros and not ultimo: return jsonify({'success': False, 'message': 'Sem resultados para o filtro de repetidas.'}), 400
+
+    posicoes = et.filtrar(filtros, faixa, vezes_min, ultimo[1] if ultimo else None)
+    total = len(posicoes)
+    if faixa is not None and limite:
+        # Só os `limite` que mais fizeram a faixa, sem ordenar o resto
+        coluna = et.tabela['acertos'][posicoes, espaco_total.FAIXAS.index(faixa)].astype(np.int32)
+        if total > limite:
+            topo = np.argpartition(-coluna, limite - 1)[:limite]
+            posicoes, coluna = posicoes[topo], coluna[topo]
+        posicoes = posicoes[np.argsort(-coluna, kind='stable')]
+    return jsonify({'success': True, 'concursos': et.qtd_concursos, 'total': total,
+                    'jogos': [espaco_total.como_dict(et.tabela[p]) for p in posicoes[:limite]]})
+
+# --- FECHAMENTO COMBINATÓRIO (PAGINADO / STREAMING) ---
+@rotas.route('/fechamento', methods=['GET', 'POST'])
+def fechamento():
+    """
+    Fechamento completo do pool: JSON paginado ou CSV em streaming (?formato=csv).
+    CSV com mais de FECHAMENTO_DIRETO jogos (ou ?fundo=1) vira tarefa (exige login): 202 com o id e a URL de status.
+    """
+    pool = extrair_dezenas(request.values.get('pool', ''))
+    fixos = extrair_dezenas(request.values.get('fixos', ''))
+    resultado = gerar_fechamento(len(set(pool) | set(fixos)), fixos, numeros_variaveis=pool)
+    if 'erro' in resultado: return jsonify({'success': False, 'message': resultado['erro']})
+
+    if request.values.get('formato') == 'csv':
+        if request.values.get('fundo') or resultado['total_jogos'] > FECHAMENTO_DIRETO:
+            return rodar_em_segundo_plano('fechamento', {'pool': pool, 'fixos': fixos}, 'Entre na sua conta para gerar fechamentos grandes em segundo plano.')
+        def linhas():
+            yield "jogo;dezenas\n"
+            for i, jogo in enumerate(resultado['jogos'], 1):
+                yield f"{i};{' '.join(f'{n:02d}' for n in jogo)}\n"
+        return Response(stream_with_context(linhas()), mimetype='text/csv', headers={'Content-Disposition': 'attachment; filename=fechamento.csv'})
+
+    pagina = request.values.get('pagina', 1, type=int)
+    por_pagina = min(max(request.values.get('por_pagina', 100, type=int), 1), 1000)
+    return jsonify({
+        'success': True,
+        'total_jogos': resultado['total_jogos'],
+        'numeros_base': resultado['numeros_base'],
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'jogos': pagina_fechamento(resultado['numeros_base'], pagina, por_pagina)
+    })
+
+_calculando_desenho = {}  # (pool, garantia, condição) -> Lock: pedidos iguais e simultâneos esperam o primeiro
+
+def buscar_desenho(tamanho_pool, garantia, condicao):
+    return DesenhoFechamento.query.filter_by(tamanho_pool=tamanho_pool, garantia=garantia, condicao=condicao).first()
+
+@rotas.route('/fechamento-garantia', methods=['GET', 'POST'])
+def fechamento_garantia():
+    """
+    Fechamento otimizado: 'garantia' pontos se 'condicao' sorteadas estiverem no pool. Desenhos ficam em cache.
+    Desenho que ainda não existe exige login e só é calculado na hora se couber em
+    LIMITE_TRABALHO_DIRETO (ver fechamento_garantia.trabalho_estimado); até LIMITE_TRABALHO_FILA
+    vira tarefa 'fechamento-garantia' (202) e, pronto, passa a sair do cache.
+    """
+    pool = sorted(set(extrair_dezenas(request.values.get('pool', ''))))
+    garantia = request.values.get('garantia', 14, type=int)
+    condicao = request.values.get('condicao', 15, type=int)
+    if any(n < 1 or n > 25 for n in pool): return jsonify({'success': False, 'message': 'Use apenas números de 1 a 25.'})
+    erro = validar_garantia(len(pool), garantia, condicao)
+    if erro: return jsonify({'success': False, 'message': erro})
+
+    desenho = buscar_desenho(len(pool), garantia, condicao)
+    em_cache = desenho is not None
+    if not desenho:
+        if not current_user.is_authenticated: return jsonify({'success': False, 'message': 'Entre na sua conta para calcular um desenho novo.'}), 401
+        trabalho = trabalho_estimado(len(pool), garantia, condicao)
+        if trabalho > LIMITE_TRABALHO_FILA:
+            return jsonify({'success': False, 'message': f"Desenho grande demais para calcular aqui ({len(pool)} dezenas, {garantia} se {condicao}). "
+                                                         "Peça ao administrador: flask --app app desenhar-fechamento."}), 422
+        if trabalho > LIMITE_TRABALHO_DIRETO:
+            return rodar_em_segundo_plano('fechamento-garantia', {'tamanho_pool': len(pool), 'garantia': garantia, 'condicao': condicao})
+        with _calculando_desenho.setdefault((len(pool), garantia, condicao), threading.Lock()):
+            desenho = buscar_desenho(len(pool), garantia, condicao)
+            if not desenho:
+                modelos.guardar_desenho(len(pool), garantia, condicao, otimizar_fechamento(len(pool), garantia, condicao))
+                desenho = buscar_desenho(len(pool), garantia, condicao)
 
-@app.route('/simular', methods=['POST'])
+    jogos = aplicar_desenho(pool, [int(m) for m in desenho.mascaras.split(',')])
+    return jsonify({'success': True, 'em_cache': em_cache, 'total_jogos': len(jogos), 'numeros_base': pool, 'garantia': garantia, 'condicao': condicao, 'jogos': jogos})
+
+@rotas.cli.command('desenhar-fechamento')
+@click.argument('tamanho_pool', type=int)
+@click.argument('garantia', type=int)
+@click.argument('condicao', type=int, default=15)
+def desenhar_fechamento_cli(tamanho_pool, garantia, condicao):
+    """Calcula e grava o desenho de um fechamento com garantia, sem o teto de tempo das rotas."""
+    erro = validar_garantia(tamanho_pool, garantia, condicao)
+    if erro: raise click.ClickException(erro)
+    if buscar_desenho(tamanho_pool, garantia, condicao): print('Esse desenho já existe.'); return
+    passos = set()
+    def progresso(i, t):
+        if i * 20 // t not in passos: passos.add(i * 20 // t); print(f'   {i}/{t} cenários cobertos...')
+    mascaras = otimizar_fechamento(tamanho_pool, garantia, condicao, progresso=progresso)
+    modelos.guardar_desenho(tamanho_pool, garantia, condicao, mascaras)
+    print(f'Desenho pronto: {len(mascaras)} jogos.')
+
+@rotas.route('/simular', methods=['POST'])
 def simular():
     try:
         entrada = request.form.get('dezenas_simular')
         filtro_sim = int(request.form.get('filtro_simulacao', 10))
         meus_nums = set(int(n) for n in re.findall(r'\d+', entrada))
         if len(meus_nums) != 15: return jsonify({'success': False, 'message': 'Digite 15 números válidos.'})
-        query = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc())
-        if filtro_sim > 0: resultados = query.limit(filtro_sim).all()
-        else: resultados = query.all()
-        analise = {11: 0, 12: 0, 13: 0, 14: 0, 15: 0}
-        for res in resultados:
-            acertos = len(meus_nums.intersection(set(int(n) for n in re.findall(r'\d+', res.dezenas))))
-            if acertos >= 11: analise[acertos] += 1
-        msg = f"Nos últimos {len(resultados)} concursos:<br>15 Pontos: <b>{analise[15]}x</b><br>14 Pontos: <b>{analise[14]}x</b><br>13 Pontos: <b>{analise[13]}x</b><br>12 Pontos: <b>{analise[12]}x</b><br>11 Pontos: <b>{analise[11]}x</b>"
+        faixas = obter_indice().distribuicao_acertos(para_mascara(meus_nums), filtro_sim)
+        analise = {pts: faixas[pts] for pts in range(11, 16)}
+        msg = f"Nos últimos {sum(faixas)} concursos:<br>15 Pontos: <b>{analise[15]}x</b><br>14 Pontos: <b>{analise[14]}x</b><br>13 Pontos: <b>{analise[13]}x</b><br>12 Pontos: <b>{analise[12]}x</b><br>11 Pontos: <b>{analise[11]}x</b>"
         return jsonify({'success': True, 'message': msg})
     except Exception as e: return jsonify({'success': False, 'message': str(e)})
 
-@app.route('/salvar-jogo', methods=['POST'])
+# O backtest monta arrays por jogo (histograma, prêmios, sequência): lista com teto, e sem login só listas pequenas
+MAX_JOGOS_SIMULACAO = 10_000
+MAX_JOGOS_SIMULACAO_ANONIMO = 50
+
+@rotas.route('/simular-lote', methods=['POST'])
+def simular_lote():
+    """Backtest de vários jogos de uma vez: lista enviada no JSON ou, se vazia, todos os jogos salvos do usuário."""
+    dados = request.get_json(silent=True) or {}
+    try: filtro_sim = int(dados.get('filtro', 0))
+    except (TypeError, ValueError): filtro_sim = 0
+    jogos_txt = dados.get('jogos') or []
+    if not isinstance(jogos_txt, list): return jsonify({'success': False, 'message': 'Envie os jogos numa lista.'}), 400
+    if not jogos_txt and current_user.is_authenticated:
+        jogos_txt = [j.numeros for j in JogoSalvo.query.filter_by(user_id=current_user.id).limit(MAX_JOGOS_SIMULACAO + 1)]
+    if len(jogos_txt) > MAX_JOGOS_SIMULACAO:
+        return jsonify({'success': False, 'message': f'Simule no máximo {MAX_JOGOS_SIMULACAO} jogos por vez.'}), 400
+    if len(jogos_txt) > MAX_JOGOS_SIMULACAO_ANONIMO and not current_user.is_authenticated:
+        return jsonify({'success': False, 'message': f'Entre na sua conta para simular mais de {MAX_JOGOS_SIMULACAO_ANONIMO} jogos.'}), 401
+    mascaras = [para_mascara(extrair_dezenas(str(t))) for t in jogos_txt]
+    if not mascaras: return jsonify({'success': False, 'message': 'Nenhum jogo para simular.'})
+    if any(m.bit_count() != 15 for m in mascaras): return jsonify({'success': False, 'message': 'Todos os jogos precisam ter 15 números válidos.'})
+
+    res = backtest(mascaras, obter_indice().janela(filtro_sim))
+    premios = res['premios']
+    return jsonify({
+        'success': True,
+        'total_concursos': res['total_concursos'],
+        'totais': {str(f): int(q) for f, q in zip(FAIXAS_PREMIO, premios.sum(axis=0))},
+        'jogos': [{
+            'numeros': str(t),
+            'histograma': h.tolist(),
+            'premios': {str(f): int(q) for f, q in zip(FAIXAS_PREMIO, p)},
+            'melhor_sequencia': int(s)
+        } for t, h, p, s in zip(jogos_txt, res['histograma'], premios, res['melhor_sequencia'])]
+    })
+
+# --- REPLAY HISTÓRICO DAS ESTRATÉGIAS (walk-forward, ver replay.py) ---
+# Calcula no próprio worker (REPLAY_PROCESSOS > 1 usa um pool de processos); o resultado fica em cache até o próximo concurso.
+# Replays com mais de REPLAY_DIRETO jogos (medido: ~0,4 s) vão para a fila de tarefas.
+replay = ReplayEstrategias(processos=int(os.getenv('REPLAY_PROCESSOS', 1)))
+REPLAY_TTL = 7 * 24 * 3600
+REPLAY_DIRETO = int(os.getenv('REPLAY_DIRETO', 20_000))
+
+@rotas.route('/api/v1/replay/<estrategia>')
+@somente_leitura
+def api_replay(estrategia):
+    """
+    "Como a estratégia teria ido?": em cada concurso gera os jogos só com o que se sabia
+    até ele e confere no sorteio seguinte. Parâmetros: janela (últimos N concursos, 0 = todos),
+    qtd e semente (aleatórias), fixos (padrao), escolha=frequentes|aleatorias (metodo25).
+    Acima de REPLAY_DIRETO jogos vira tarefa (exige login): 202 com a URL de status; o JSON
+    pronto sai no arquivo da tarefa e, pedindo de novo, por aqui (já em cache).
+    """
+    if estrategia not in estrategias.LOTES: return jsonify({'success': False, 'message': f"Estratégia desconhecida: {estrategia}"}), 404
+    idx = obter_indice()
+    try:
+        parametros = ler_parametros_replay(estrategia, request.values, _lista_param(request.values, 'fixos'), total=len(idx.concursos))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    # Chave: estratégia + parâmetros + (quantidade, último concurso); concurso novo = replay novo
+    chave = f"replay:{estrategia}:{json.dumps(parametros, sort_keys=True)}:{idx.assinatura()}"
+    resultado = cache.obter(chave)
+    if resultado is not None: return jsonify({'success': True, **resultado})
+
+    if jogos_estimados_replay(parametros, len(idx.concursos)) > REPLAY_DIRETO:
+        if not current_user.is_authenticated: return jsonify({'success': False, 'message': 'Entre na sua conta para rodar um replay desse tamanho.'}), 401
+        tarefa = fila.obter(enfileirar('replay', {'estrategia': estrategia, 'parametros': parametros, 'assinatura': list(idx.assinatura())}))
+        if tarefa['situacao'] != 'concluida': return resposta_enfileirada(tarefa['id'])
+        with open(os.path.join(fila.pasta_da(tarefa['id']), tarefa['arquivo']), encoding='utf-8') as f: resultado = json.load(f)
+        cache.guardar(chave, resultado, ttl=REPLAY_TTL)
+        return jsonify({'success': True, **resultado})
+
+    inicio = time.perf_counter()
+    try:
+        resultado = replay.rodar(estrategia, parametros, idx.concursos, idx.janela(0))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+    medidor.observar('lotofacil_replay_segundos', resultado['segundos'], estrategia=estrategia)
+    cache.guardar(chave, resultado, ttl=REPLAY_TTL)
+    return jsonify({'success': True, **resultado})
+
+MAX_JOGOS_POR_SALVAMENTO = 20_000
+
+def salvar_jogos(user_id, entradas):
+    """
+    Valida, canoniza ("01, 02, ...") e grava de uma vez os jogos (numeros, tipo) que o usuário ainda não tem.
+    Duplicados (no lote ou já na carteira, pela máscara) são ignorados. Retorna (novos, ja_salvos, invalidos).
+    """
+    lote, invalidos = {}, 0
+    for numeros, tipo in entradas:
+        dezenas = set(extrair_dezenas(numeros if isinstance(numeros, str) else " ".join(map(str, numeros or []))))
+        if len(dezenas) != 15 or min(dezenas) < 1 or max(dezenas) > 25: invalidos += 1; continue
+        lote.setdefault(para_mascara(dezenas), (", ".join(f"{n:02d}" for n in sorted(dezenas)), str(tipo or 'Manual')[:50]))
+
+    existentes, mascaras = set(), list(lote)
+    for i in range(0, len(mascaras), 500):  # usa o índice (user_id, mascara)
+        existentes.update(m for (m,) in db.session.query(JogoSalvo.mascara).filter(JogoSalvo.user_id == user_id, JogoSalvo.mascara.in_(mascaras[i:i + 500])))
+    agora = datetime.utcnow()
+    novos = [{'numeros': numeros, 'tipo': tipo, 'mascara': m, 'user_id': user_id, 'data_criacao': agora}
+             for m, (numeros, tipo) in lote.items() if m not in existentes]
+    if novos: db.session.execute(JogoSalvo.__table__.insert(), novos)
+    db.session.commit()
+    if novos: conferir_carteiras(user_id)  # os jogos novos já entram conferidos contra o histórico
+    return len(novos), len(lote) - len(novos), invalidos
+
+def mensagem_salvamento(novos, ja_salvos, invalidos):
+    partes = [f'{novos} jogo{"s" if novos != 1 else ""} salvo{"s" if novos != 1 else ""}!']
+    if ja_salvos: partes.append(f'{ja_salvos} já estava{"m" if ja_salvos != 1 else ""} na sua carteira.')
+    if invalidos: partes.append(f'{invalidos} inválido{"s" if invalidos != 1 else ""} ignorado{"s" if invalidos != 1 else ""}.')
+    return " ".join(partes)
+
+@rotas.route('/salvar-jogo', methods=['POST'])
 @login_required
 def salvar_jogo():
     # AQUI: O tipo_limpo será enviado pelo formulário ou JS
-    db.session.add(JogoSalvo(numeros=request.form.get('numeros_salvar'), tipo=request.form.get('tipo_salvar'), dono=current_user))
-    db.session.commit()
-    return jsonify({'success': True})
+    novos, ja_salvos, invalidos = salvar_jogos(current_user.id, [(request.form.get('numeros_salvar', ''), request.form.get('tipo_salvar'))])
+    if invalidos: return jsonify({'success': False, 'message': 'O jogo precisa ter 15 números entre 1 e 25.'})
+    return jsonify({'success': True, 'novos': novos, 'ja_salvos': ja_salvos,
+                    'message': 'Jogo manual salvo com sucesso!' if novos else 'Esse jogo já estava na sua carteira.'})
 
-@app.route('/salvar-multiplos', methods=['POST'])
+@rotas.route('/salvar-multiplos', methods=['POST'])
 @login_required
 def salvar_multiplos():
-    dados = request.json.get('jogos', [])
-    if not dados: return jsonify({'success': False})
-    for j in dados: db.session.add(JogoSalvo(numeros=j['numeros'], tipo=j['tipo'], dono=current_user))
-    db.session.commit()
-    return jsonify({'success': True, 'message': f'{len(dados)} jogos salvos!'})
+    dados = (request.get_json(silent=True) or {}).get('jogos', [])
+    if not dados: return jsonify({'success': False, 'message': 'Nenhum jogo enviado.'})
+    if len(dados) > MAX_JOGOS_POR_SALVAMENTO: return jsonify({'success': False, 'message': f'Envie no máximo {MAX_JOGOS_POR_SALVAMENTO} jogos por vez.'})
+    entradas = [(j.get('numeros'), j.get('tipo')) if isinstance(j, dict) else (j, None) for j in dados]
+    novos, ja_salvos, invalidos = salvar_jogos(current_user.id, entradas)
+    return jsonify({'success': True, 'novos': novos, 'ja_salvos': ja_salvos, 'invalidos': invalidos,
+                    'message': mensagem_salvamento(novos, ja_salvos, invalidos)})
 
 # --- IA ---
-@app.route('/ia-chat', methods=['POST'])
+def contexto_estatistico():
+    """Resumo das estatísticas atuais (último concurso, últimos 10) para ancorar as respostas da IA. Muda só com a versão."""
+    def calcular():
+        ultimo = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first()
+        if not ultimo: return "Nenhum resultado cadastrado ainda."
+        janela = estatisticas_janela(10)
+        freq, atraso = janela['frequencias'], janela['atraso']
+        ranking = sorted(range(1, 26), key=lambda n: (-freq[n - 1], n))
+        atrasadas = sorted(range(1, 26), key=lambda n: (-atraso[n - 1], n))[:5]
+        return "\n".join([
+            f"Último concurso: {ultimo.concurso} ({ultimo.data_sorteio}) - {ultimo.dezenas}",
+            f"Mais frequentes nos últimos {janela['concursos']}: " + ", ".join(f"{n:02d} ({freq[n - 1]}x)" for n in ranking[:10]),
+            "Menos frequentes: " + ", ".join(f"{n:02d}" for n in ranking[-5:]),
+            "Mais atrasadas: " + ", ".join(f"{n:02d} ({atraso[n - 1]} concursos)" for n in atrasadas),
+            f"Médias por concurso: {janela['media_impares']} ímpares, {janela['media_primos']} primos, {janela['media_moldura']} na moldura",
+        ])
+    versao = versao_resultados()[0]
+    return versao, cache.obter_ou_calcular(f"ia-contexto:{versao}", calcular)
+
+@rotas.route('/ia-chat', methods=['POST'])
 def ia_chat():
-    if not client: return jsonify({'resposta': "A IA não foi configurada."})
+    """
+    Resposta do consultor em streaming (texto puro). O modelo roda no pool do ConsultorIA, não neste worker.
+    O stream dura no máximo IA_TIMEOUT segundos: depois disso termina com um aviso de tempo esgotado.
+    Sem vaga (pool cheio ou pergunta anterior do mesmo usuário em andamento): 429.
+    """
+    consultor = obter_consultor()
+    if not consultor: return jsonify({'resposta': "A IA não foi configurada."})
+    mensagem_usuario = ((request.get_json(silent=True) or {}).get('msg') or '').strip()[:1000]
+    if not mensagem_usuario: return jsonify({'resposta': "Digite uma pergunta."})
+    usuario = current_user.get_id() if current_user.is_authenticated else request.remote_addr
+    versao, contexto = contexto_estatistico()
     try:
-        mensagem_usuario = request.json.get('msg', '')
-        CONTEXTO_ESPECIALISTA = """
-        VOCÊ É O 'CONSULTOR GR', ESPECIALISTA EM LOTOFÁCIL.
-        IMPORTANTE: Sempre que o usuário pedir para "fazer uma aposta", pergunte:
-        "Qual estratégia você prefere? Padrão, Pura ou Método 25?"
-        Conhecimentos:
-        1. Padrão: Fixos e Aleatórios.
-        2. Método 25 (Novo): 3 Fixas Sorteadas + 2 Fixas Ausentes. Gera 4 jogos.
-        3. Pura: Analisa os últimos 10 concursos. Gera 3 jogos (Lógica, Equilíbrio, Meio).
-        """
-        prompt = f"{CONTEXTO_ESPECIALISTA}\n\nUsuário: {mensagem_usuario}\nConsultor GR:"
-        response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-        return jsonify({'resposta': response.text.replace('\n', '<br>')})
-    except Exception as e: return jsonify({'resposta': "Erro na IA. Tente novamente."})
+        pedacos = consultor.perguntar(mensagem_usuario, contexto, versao, usuario)
+    except Ocupado as e:
+        return jsonify({'resposta': str(e)}), 429
+    return Response(pedacos, mimetype='text/plain; charset=utf-8', headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+# --- MÉTRICAS E PERFILADOR (rotas) ---
+@rotas.route('/metrics')
+@csrf.exempt
+def metrics():
+    """
+    Formato texto do Prometheus. Expõe rotas, tempos de SQL e pools: exige 'Authorization: Bearer <METRICAS_TOKEN>'
+    ou um admin logado. Aberto só em debug ou com METRICAS_ABERTO=1 (e sem token definido).
+    """
+    token = os.getenv('METRICAS_TOKEN')
+    liberado = ((token and request.headers.get('Authorization') == f"Bearer {token}")
+                or (current_user.is_authenticated and current_user.is_admin)
+                or (not token and (current_app.debug or os.getenv('METRICAS_ABERTO') == '1')))
+    if not liberado: return Response("Não autorizado.\n", status=401, mimetype='text/plain')
+    return Response(medidor.texto(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@rotas.route('/admin/perfilador', methods=['POST'])
+@login_required
+def admin_perfilador():
+    """Liga/desliga o perfilador em tempo de execução (vale só para este processo)."""
+    if not current_user.is_admin: return redirect(url_for('rotas.index'))
+    try:
+        amostra = min(max(float(request.form.get('amostra', 0)) / 100, 0.0), 1.0)
+        limite_ms = max(int(request.form.get('limite_ms', perfilador.limite_ms)), 0)
+    except ValueError:
+        flash("Valores inválidos para o perfilador.", "danger"); return redirect(url_for('rotas.admin_panel'))
+    perfilador.amostra, perfilador.limite_ms = amostra, limite_ms
+    if amostra: flash(f"Perfilador ligado: {amostra:.0%} das requisições, grava as acima de {limite_ms} ms em {perfilador.pasta}.", "success")
+    else: flash("Perfilador desligado.", "info")
+    return redirect(url_for('rotas.admin_panel'))
 
 # --- OUTROS (Admin, Login, etc) ---
-@app.route('/admin')
+@rotas.route('/admin')
 @login_required
 def admin_panel():
-    if not current_user.is_admin: return redirect(url_for('index'))
-    users = User.query.all()
+    if not current_user.is_admin: return redirect(url_for('rotas.index'))
     busca = request.args.get('q', '')
-    query_res = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc())
-    if busca:
-        if busca.isdigit(): query_res = query_res.filter_by(concurso=int(busca))
-        else: query_res = query_res.filter(ResultadoLotofacil.data_sorteio.contains(busca))
-    resultados = query_res.all() if busca else query_res.limit(20).all()
-    return render_template('admin.html', usuarios=users, resultados=resultados, busca=busca, total_res=len(resultados) if busca else ResultadoLotofacil.query.count())
+    antes = request.args.get('antes', type=int)
+    depois = request.args.get('depois', type=int)
+    # A lista de usuários muda por outros motivos: só a parte dos resultados vai para o cache
+    pagina = cache.obter_ou_calcular(f"admin:{versao_resultados()[0]}:{antes}:{depois}:{busca}", lambda: buscar_resultados(busca, antes, depois))
 
-@app.route('/admin/novo-resultado', methods=['POST'])
+    # Usuários: cursor no id, 50 por página
+    u_apos = request.args.get('u_apos', 0, type=int)
+    usuarios = User.query.filter(User.id > u_apos).order_by(User.id).limit(51).all()
+    proximo_usuario = usuarios[49].id if len(usuarios) > 50 else None
+    return render_template('admin.html', usuarios=usuarios[:50], u_apos=u_apos, proximo_usuario=proximo_usuario,
+                           resultados=pagina.items, pagina=pagina, busca=busca, total_res=len(obter_indice()), perfilador=perfilador)
+
+@rotas.route('/admin/novo-resultado', methods=['POST'])
 @login_required
 def admin_novo_resultado():
-    if not current_user.is_admin: return redirect(url_for('index'))
+    if not current_user.is_admin: return redirect(url_for('rotas.index'))
     try:
         lista_nums = sorted(list(set(int(n) for n in re.findall(r'\d+', request.form.get('dezenas')))))
         if len(lista_nums) != 15: raise ValueError
         novo = ResultadoLotofacil(concurso=request.form.get('concurso'), data_sorteio=request.form.get('data'), dezenas=", ".join([f"{n:02d}" for n in lista_nums]))
-        db.session.add(novo)
-        db.session.commit(); flash('Cadastrado!', 'success')
+        db.session.add(novo); reabrir_conferencia(int(novo.concurso))
+        db.session.commit(); sincronizar_estatisticas(); conferir_carteiras(); atualizar_espaco_total(); flash('Cadastrado!', 'success')
     except: flash('Erro ao cadastrar.', 'danger')
-    return redirect(url_for('admin_panel'))
+    return redirect(url_for('rotas.admin_panel'))
 
-@app.route('/admin/excluir-resultado/<int:id>', methods=['POST'])
+@rotas.route('/admin/excluir-resultado/<int:id>', methods=['POST'])
 @login_required
 def admin_excluir_resultado(id):
-    if not current_user.is_admin: return redirect(url_for('index'))
+    if not current_user.is_admin: return redirect(url_for('rotas.index'))
     res = db.session.get(ResultadoLotofacil, id)
-    if res: db.session.delete(res); db.session.commit(); flash('Excluído.', 'success')
-    return redirect(url_for('admin_panel'))
+    if res:
+        # A conferência desse concurso sai junto; se ele voltar, os jogos são conferidos de novo
+        AcertoJogo.query.filter_by(concurso=res.concurso).delete()
+        reabrir_conferencia(res.concurso)
+        db.session.delete(res); db.session.commit(); sincronizar_estatisticas(); conferir_carteiras(); atualizar_espaco_total(); flash('Excluído.', 'success')
+    return redirect(url_for('rotas.admin_panel'))
 
-@app.route('/virar-admin')
+@rotas.route('/virar-admin')
 @login_required
 def virar_admin():
-    current_user.is_admin = True; db.session.commit(); flash(f'Parabéns {current_user.nome}! Você agora é Admin.', 'success'); return redirect(url_for('admin_panel'))
+    current_user.is_admin = True; db.session.commit(); flash(f'Parabéns {current_user.nome}! Você agora é Admin.', 'success'); return redirect(url_for('rotas.admin_panel'))
 
-@app.route('/meus-jogos')
+@rotas.route('/meus-jogos')
 @login_required
 def meus_jogos():
-    meus_jogos = JogoSalvo.query.filter_by(user_id=current_user.id).order_by(JogoSalvo.data_criacao.desc()).all()
+    query = JogoSalvo.query.filter_by(user_id=current_user.id)
+    contem = extrair_dezenas(request.args.get('contem', ''))
+    if contem: query = query.filter(contem_dezenas(JogoSalvo.mascara, contem))
+    meus_jogos = query.order_by(JogoSalvo.data_criacao.desc()).all()
     ultimos_resultados = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).limit(50).all()
-    return render_template('perfil.html', jogos=meus_jogos, ultimos_resultados=ultimos_resultados)
+    return render_template('perfil.html', jogos=meus_jogos, ultimos_resultados=ultimos_resultados, desempenho=desempenho_carteira(current_user.id))
 
-@app.route('/conferir', methods=['POST'])
+@rotas.route('/conferir', methods=['POST'])
 @login_required
 def conferir():
     oficial = set(int(n) for n in re.findall(r'\d+', request.form.get('resultado_oficial', '')))
-    if len(oficial) != 15: flash('Precisa de 15 números para conferir.', 'danger'); return redirect(url_for('meus_jogos'))
+    if len(oficial) != 15: flash('Precisa de 15 números para conferir.', 'danger'); return redirect(url_for('rotas.meus_jogos'))
     data_filtro = request.form.get('data_filtro') 
     query = JogoSalvo.query.filter_by(user_id=current_user.id)
     if data_filtro: query = query.filter(func.date(JogoSalvo.data_criacao) == data_filtro)
     jogos = query.order_by(JogoSalvo.data_criacao.desc()).all()
-    mapa = {j.id: len(set(int(n) for n in re.findall(r'\d+', j.numeros)).intersection(oficial)) for j in jogos}
+    # Acertos calculados no próprio SQLite: popcount(mascara & resultado)
+    acertos = func.popcount(JogoSalvo.mascara.op('&')(para_mascara(oficial)))
+    mapa = dict(query.with_entities(JogoSalvo.id, acertos).all())
     if not jogos and data_filtro: flash(f'Nenhum jogo encontrado na data {data_filtro}.', 'warning')
-    return render_template('perfil.html', jogos=jogos, resultado_oficial=sorted(list(oficial)), mapa_acertos=mapa, ultimos_resultados=ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).limit(50).all(), data_filtro_atual=data_filtro)
+    return render_template('perfil.html', jogos=jogos, resultado_oficial=sorted(list(oficial)), mapa_acertos=mapa, ultimos_resultados=ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).limit(50).all(), data_filtro_atual=data_filtro, desempenho=desempenho_carteira(current_user.id))
 
-@app.route('/resultados')
+# --- BUSCA E PAGINAÇÃO POR CURSOR (concurso) ---
+POR_PAGINA = 20
+
+def intervalo_de_datas(busca):
+    """'25/12/2023', '12/2023', '/2023', '2023-12-25' ou '2023-12' -> (primeiro dia, último dia) ou None."""
+    busca = busca.strip()
+    try:
+        if m := re.fullmatch(r'(\d{1,2})/(\d{1,2})/(\d{4})', busca): dia = date(int(m[3]), int(m[2]), int(m[1])); return dia, dia
+        if m := re.fullmatch(r'(\d{4})-(\d{1,2})-(\d{1,2})', busca): dia = date(int(m[1]), int(m[2]), int(m[3])); return dia, dia
+        if m := re.fullmatch(r'(\d{1,2})/(\d{4})|(\d{4})-(\d{1,2})', busca):
+            ano, mes = (int(m[2]), int(m[1])) if m[1] else (int(m[3]), int(m[4]))
+            inicio = date(ano, mes, 1)
+            return inicio, (date(ano + mes // 12, mes % 12 + 1, 1) - timedelta(days=1))
+        if m := re.fullmatch(r'/(\d{4})', busca): return date(int(m[1]), 1, 1), date(int(m[1]), 12, 31)
+    except ValueError:
+        pass
+    return None
+
+def buscar_resultados(busca='', antes=None, depois=None, por_pagina=POR_PAGINA):
+    """
+    Página de resultados do mais novo para o mais antigo, com cursor no número do concurso
+    (sem COUNT nem OFFSET). `antes` = página seguinte (mais antigos), `depois` = anterior.
+
+    Busca: número do concurso, data/mês/ano (faixa na coluna 'data', indexada) ou
+    dezenas (concursos que contêm todas, pelo índice em memória). Outro texto cai no LIKE antigo.
+    """
+    R = ResultadoLotofacil
+    query = R.query
+    lista = None  # concursos já filtrados (busca por dezenas)
+    busca = (busca or '').strip()
+    if busca:
+        intervalo = intervalo_de_datas(busca)
+        if busca.isdigit(): query = query.filter(R.concurso == int(busca))
+        elif intervalo: query = query.filter(R.data.between(*intervalo))
+        elif re.fullmatch(r'[\d\s,;-]+', busca): lista = obter_indice().contendo(para_mascara(extrair_dezenas(busca)))
+        else: query = query.filter(R.data_sorteio.contains(busca))
+
+    if lista is not None:
+        # Cursor sobre a lista em memória (crescente); a página sai do banco por IN
+        if depois is not None:
+            pos = bisect_right(lista, depois)
+            fatia = lista[pos:pos + por_pagina]
+            tem_anterior, tem_proxima = pos + por_pagina < len(lista), pos > 0
+        else:
+            pos = bisect_left(lista, antes) if antes is not None else len(lista)
+            fatia = lista[max(0, pos - por_pagina):pos]
+            tem_anterior, tem_proxima = antes is not None and pos < len(lista), pos - por_pagina > 0
+        itens = R.query.filter(R.concurso.in_(fatia)).order_by(R.concurso.desc()).all() if fatia else []
+    else:
+        if depois is not None:
+            itens = query.filter(R.concurso > depois).order_by(R.concurso.asc()).limit(por_pagina + 1).all()
+            tem_anterior = len(itens) > por_pagina
+            itens = itens[:por_pagina][::-1]
+            tem_proxima = True
+        else:
+            if antes is not None: query = query.filter(R.concurso < antes)
+            itens = query.order_by(R.concurso.desc()).limit(por_pagina + 1).all()
+            tem_proxima = len(itens) > por_pagina
+            itens = itens[:por_pagina]
+            tem_anterior = antes is not None
+
+    return SimpleNamespace(
+        items=[resultado_simples(r) for r in itens],
+        tem_anterior=tem_anterior and bool(itens), tem_proxima=tem_proxima and bool(itens),
+        depois=itens[0].concurso if itens else None, antes=itens[-1].concurso if itens else None,
+    )
+
+@rotas.route('/resultados')
+@somente_leitura
+@em_cache()
 def resultados():
-    page = request.args.get('page', 1, type=int)
     busca = request.args.get('q', '')
-    query = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc())
-    if busca:
-        if busca.isdigit(): query = query.filter_by(concurso=int(busca))
-        else: query = query.filter(ResultadoLotofacil.data_sorteio.contains(busca))
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
-    return render_template('resultados.html', pagination=pagination, busca=busca)
+    antes = request.args.get('antes', type=int)
+    depois = request.args.get('depois', type=int)
+    pagina = cache.obter_ou_calcular(f"resultados:{versao_resultados()[0]}:{antes}:{depois}:{busca}", lambda: buscar_resultados(busca, antes, depois))
+    return render_template('resultados.html', pagination=pagina, busca=busca)
 
-@app.route('/editar-perfil', methods=['POST'])
+@rotas.route('/editar-perfil', methods=['POST'])
 @login_required
 def editar_perfil():
     user = db.session.get(User, current_user.id)
@@ -444,55 +1006,253 @@ def editar_perfil():
         file = request.files['foto']
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], f"user_{user.id}_{filename}"))
+            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], f"user_{user.id}_{filename}"))
             user.foto_perfil = f"user_{user.id}_{filename}"
-    db.session.commit(); flash('Atualizado!', 'success'); return redirect(url_for('meus_jogos'))
+    db.session.commit(); flash('Atualizado!', 'success'); return redirect(url_for('rotas.meus_jogos'))
 
-@app.route('/excluir-jogo/<int:id>', methods=['POST'])
+@rotas.route('/excluir-jogo/<int:id>', methods=['POST'])
 @login_required
 def excluir_jogo(id):
     jogo = db.session.get(JogoSalvo, id)
-    if jogo and jogo.user_id == current_user.id: db.session.delete(jogo); db.session.commit(); flash('Excluído.', 'success')
-    return redirect(url_for('meus_jogos'))
+    if jogo and jogo.user_id == current_user.id:
+        AcertoJogo.query.filter_by(jogo_id=jogo.id).delete()
+        db.session.delete(jogo); db.session.commit(); flash('Excluído.', 'success')
+    return redirect(url_for('rotas.meus_jogos'))
 
-@app.route('/excluir-todos', methods=['POST'])
+@rotas.route('/excluir-todos', methods=['POST'])
 @login_required
 def excluir_todos():
-    if not check_password_hash(current_user.senha, request.form.get('senha_confirmacao')): flash('Senha errada.', 'danger'); return redirect(url_for('meus_jogos'))
-    JogoSalvo.query.filter_by(user_id=current_user.id).delete(); db.session.commit(); flash('Limpo.', 'success'); return redirect(url_for('meus_jogos'))
+    if not check_password_hash(current_user.senha, request.form.get('senha_confirmacao')): flash('Senha errada.', 'danger'); return redirect(url_for('rotas.meus_jogos'))
+    AcertoJogo.query.filter(AcertoJogo.jogo_id.in_(db.session.query(JogoSalvo.id).filter_by(user_id=current_user.id))).delete(synchronize_session=False)
+    JogoSalvo.query.filter_by(user_id=current_user.id).delete(); db.session.commit(); flash('Limpo.', 'success'); return redirect(url_for('rotas.meus_jogos'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@rotas.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         user = User.query.filter_by(email=request.form.get('email')).first()
-        if user and check_password_hash(user.senha, request.form.get('senha')): login_user(user); return redirect(url_for('meus_jogos'))
+        if user and check_password_hash(user.senha, request.form.get('senha')): login_user(user); return redirect(url_for('rotas.meus_jogos'))
         flash('Erro no login.', 'danger')
     return render_template('login.html')
 
-@app.route('/registro', methods=['GET', 'POST'])
+@rotas.route('/registro', methods=['GET', 'POST'])
 def registro():
     if request.method == 'POST':
-        if User.query.filter_by(email=request.form.get('email')).first(): flash('Email existe.', 'warning'); return redirect(url_for('registro'))
+        if User.query.filter_by(email=request.form.get('email')).first(): flash('Email existe.', 'warning'); return redirect(url_for('rotas.registro'))
         db.session.add(User(nome=request.form.get('nome'), email=request.form.get('email'), telefone=request.form.get('telefone'), senha=generate_password_hash(request.form.get('senha'))))
-        db.session.commit(); flash('Criado!', 'success'); return redirect(url_for('login'))
+        db.session.commit(); flash('Criado!', 'success'); return redirect(url_for('rotas.login'))
     return render_template('registro.html')
 
-@app.route('/logout')
+@rotas.route('/logout')
 @login_required
-def logout(): logout_user(); return redirect(url_for('index'))
+def logout(): logout_user(); return redirect(url_for('rotas.index'))
 
-@app.route('/exportar/<formato>')
+# --- EXPORTAÇÃO (STREAMING; carteiras grandes vão para a fila, ver exportacao.py) ---
+@rotas.route('/exportar/<formato>')
 @login_required
 def exportar(formato):
-    jogos = JogoSalvo.query.filter_by(user_id=current_user.id).all()
-    dados = [{"Data": j.data_criacao.strftime("%d/%m/%Y"), "Estratégia": j.tipo, "Dezenas": j.numeros} for j in jogos]
-    if formato == 'excel':
-        output = io.BytesIO(); pd.DataFrame(dados).to_excel(output, index=False); output.seek(0)
-        return send_file(output, download_name="historico.xlsx", as_attachment=True)
-    pdf = FPDF(); pdf.add_page(); pdf.set_font("Arial", size=12)
-    for d in dados: pdf.cell(0, 10, f"{d['Data']} | {d['Dezenas']}", 1, 1)
-    return send_file(io.BytesIO(pdf.output(dest='S').encode('latin1')), download_name="historico.pdf", as_attachment=True, mimetype='application/pdf')
+    """
+    Histórico do usuário em csv, excel ou pdf, lido do banco em lotes.
+    ?concurso=N (ou 'ultimo') acrescenta a coluna de acertos contra esse concurso.
+    Excel/PDF com mais de EXPORTACAO_DIRETA jogos (ou ?fundo=1) viram tarefa em segundo plano.
+    CSV e Excel usam memória constante; o PDF não (o FPDF segura todas as páginas até o fim),
+    por isso fica limitado a exportacao.MAX_JOGOS_PDF jogos.
+    """
+    if formato not in exportacao.FORMATOS: return redirect(url_for('rotas.meus_jogos'))
+    colunas, alvo = ["Data", "Estratégia", "Dezenas"], None
+    pedido = request.args.get('concurso', '')
+    if pedido:
+        sorteio = (ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first() if pedido == 'ultimo'
+                   else ResultadoLotofacil.query.filter_by(concurso=int(pedido)).first() if pedido.isdigit() else None)
+        if not sorteio: flash("Concurso não encontrado para a conferência.", "warning"); return redirect(url_for('rotas.meus_jogos'))
+        alvo = sorteio.mascara if sorteio.mascara is not None else para_mascara(extrair_dezenas(sorteio.dezenas))
+        colunas.append(f"Acertos {sorteio.concurso}")
+
+    total = JogoSalvo.query.filter_by(user_id=current_user.id).count() if formato != 'csv' else 0
+    if formato == 'pdf' and total > exportacao.MAX_JOGOS_PDF:
+        flash(f"PDF vai até {exportacao.MAX_JOGOS_PDF} jogos; para a carteira inteira ({total}) use Excel ou CSV.", "warning")
+        return redirect(url_for('rotas.meus_jogos'))
+    if request.args.get('fundo') or total > EXPORTACAO_DIRETA:
+        enfileirar('exportar', {'formato': formato, 'colunas': colunas, 'alvo': alvo})
+        flash("Exportação grande: o arquivo está sendo gerado em segundo plano. Baixe em Tarefas, no seu perfil.", "info")
+        return redirect(url_for('rotas.meus_jogos'))
+    linhas = exportacao.linhas_exportacao(current_user.id, alvo)
+    nome, tipo_mime = exportacao.FORMATOS[formato]
+
+    if formato == 'csv':
+        def gerar():
+            saida = io.StringIO(); escritor = csv.writer(saida, delimiter=';')
+            escritor.writerow(colunas)
+            for i, linha in enumerate(linhas, 1):
+                escritor.writerow(linha)
+                if i % 500 == 0: yield saida.getvalue(); saida.seek(0); saida.truncate()
+            yield saida.getvalue()
+        return Response(stream_with_context(gerar()), mimetype=tipo_mime, headers={'Content-Disposition': f'attachment; filename={nome}'})
+
+    # Excel e PDF vão para um arquivo temporário (apagado ao fechar a resposta), não para um BytesIO
+    arquivo = tempfile.TemporaryFile()
+    (exportacao.escrever_excel if formato == 'excel' else exportacao.escrever_pdf)(arquivo, colunas, linhas)
+    arquivo.seek(0)
+    resposta = send_file(arquivo, download_name=nome, as_attachment=True, mimetype=tipo_mime)
+    resposta.call_on_close(arquivo.close)
+    return resposta
+
+# --- TAREFAS EM SEGUNDO PLANO (fila em SQLite + pool de processos, ver tarefas.py) ---
+# Os trabalhadores rodam à parte: `flask --app app tarefas`. TAREFAS_EMBUTIDO=1 sobe o pool junto do app (desenvolvimento).
+fila = FilaTarefas(os.getenv('TAREFAS_ARQUIVO', os.path.join(basedir, 'tarefas.db')), os.getenv('TAREFAS_DIR', os.path.join(basedir, 'tarefas')))
+EXPORTACAO_DIRETA = int(os.getenv('EXPORTACAO_DIRETA', 5000))  # jogos; acima disso excel/pdf viram tarefa
+FECHAMENTO_DIRETO = int(os.getenv('FECHAMENTO_DIRETO', 100_000))  # jogos; acima disso o CSV do fechamento vira tarefa
+TAREFAS_POR_USUARIO = int(os.getenv('TAREFAS_POR_USUARIO', 3))  # na fila ou rodando, ao mesmo tempo
+# Resultado igual para qualquer um: quem pedir o mesmo reaproveita a tarefa de outro (e pode ver/baixar)
+TAREFAS_COMPARTILHADAS = {'fechamento', 'fechamento-garantia', 'replay'}
+_pool_embutido = {}
+
+def enfileirar(tipo, parametros, anexos=None):
+    """
+    Só para usuário logado (a rota garante). Tarefas compartilhadas iguais são reaproveitadas;
+    LimiteTarefas se ele já tem TAREFAS_POR_USUARIO em andamento.
+    """
+    id = fila.enfileirar(tipo, parametros, current_user.id, anexos, maximo_ativas=TAREFAS_POR_USUARIO, reaproveitar=tipo in TAREFAS_COMPARTILHADAS)
+    medidor.inc('lotofacil_tarefas_enfileiradas_total', tipo=tipo)
+    if os.getenv('TAREFAS_EMBUTIDO') and not _pool_embutido:
+        _pool_embutido['thread'] = threading.Thread(target=rodar_pool, args=(fila.arquivo, fila.pasta, int(os.getenv('TAREFAS_PROCESSOS', 1))), daemon=True)
+        _pool_embutido['thread'].start()
+    return id
+
+def tarefa_publica(tarefa):
+    quando = lambda t: datetime.fromtimestamp(t).strftime("%d/%m/%Y %H:%M:%S") if t else None
+    return {
+        'id': tarefa['id'], 'tipo': tarefa['tipo'], 'situacao': tarefa['situacao'], 'mensagem': tarefa['mensagem'],
+        'feitos': tarefa['feitos'], 'total': tarefa['total'],
+        'progresso': round(tarefa['feitos'] / tarefa['total'], 3) if tarefa['total'] else (1.0 if tarefa['situacao'] == 'concluida' else 0.0),
+        'criada_em': quando(tarefa['criada_em']), 'terminada_em': quando(tarefa['terminada_em']),
+        'cancelamento_pedido': bool(tarefa['cancelar']),
+        'status': url_for('rotas.tarefa_status', id=tarefa['id']),
+        'arquivo': url_for('rotas.tarefa_arquivo', id=tarefa['id']) if tarefa['arquivo'] else None,
+    }
+
+def resposta_enfileirada(id):
+    return jsonify({'success': True, 'tarefa': id, 'status': url_for('rotas.tarefa_status', id=id)}), 202
+
+def rodar_em_segundo_plano(tipo, parametros, aviso_login='Entre na sua conta para rodar isso em segundo plano.'):
+    """Para as rotas JSON: enfileira (ou reaproveita) e responde 202; sem login, 401."""
+    if not current_user.is_authenticated: return jsonify({'success': False, 'message': aviso_login}), 401
+    return resposta_enfileirada(enfileirar(tipo, parametros))
+
+ROTAS_TAREFAS_HTML = ('rotas.exportar', 'rotas.admin_importar_excel', 'rotas.admin_importar_api')
+
+@rotas.errorhandler(LimiteTarefas)
+def limite_de_tarefas(erro):
+    """Rotas de página avisam e voltam; as JSON respondem 429."""
+    if request.endpoint in ROTAS_TAREFAS_HTML: flash(str(erro), "warning"); return redirect(request.referrer or url_for('rotas.index'))
+    return jsonify({'success': False, 'message': str(erro)}), 429
+
+def tarefa_permitida(id, alterar=False):
+    """A tarefa, se quem pede pode vê-la: o dono, um admin ou, nas compartilhadas (sem alterar), qualquer usuário logado."""
+    tarefa = fila.obter(id)
+    if tarefa is None or not current_user.is_authenticated: return None
+    if current_user.id == tarefa['user_id'] or current_user.is_admin: return tarefa
+    return tarefa if tarefa['tipo'] in TAREFAS_COMPARTILHADAS and not alterar else None
+
+@medidor.coletor
+def metricas_das_tarefas():
+    contagem = fila.contagem()
+    return [('lotofacil_tarefas', 'gauge', "Tarefas em segundo plano por situação.", [({'situacao': s}, contagem.get(s, 0)) for s in SITUACOES_TAREFA])]
+
+@rotas.route('/tarefas')
+@login_required
+def tarefas_lista():
+    """As tarefas mais recentes do usuário (?todas=1 no admin: de todos)."""
+    todas = request.args.get('todas') and current_user.is_admin
+    return jsonify({'success': True, 'tarefas': [tarefa_publica(t) for t in fila.listar(None if todas else current_user.id)]})
+
+@rotas.route('/tarefas/<id>')
+def tarefa_status(id):
+    tarefa = tarefa_permitida(id)
+    if not tarefa: return jsonify({'success': False, 'message': "Tarefa não encontrada."}), 404
+    return jsonify({'success': True, 'tarefa': tarefa_publica(tarefa)})
+
+@rotas.route('/tarefas/<id>/cancelar', methods=['POST'])
+def tarefa_cancelar(id):
+    if not tarefa_permitida(id, alterar=True): return jsonify({'success': False, 'message': "Tarefa não encontrada."}), 404
+    if not fila.cancelar(id): return jsonify({'success': False, 'message': "A tarefa já terminou."}), 409
+    return jsonify({'success': True, 'tarefa': tarefa_publica(fila.obter(id))})
+
+@rotas.route('/tarefas/<id>/arquivo')
+def tarefa_arquivo(id):
+    tarefa = tarefa_permitida(id)
+    if not tarefa or not tarefa['arquivo']: return jsonify({'success': False, 'message': "Arquivo não disponível."}), 404
+    return send_file(os.path.join(fila.pasta_da(id), tarefa['arquivo']), download_name=tarefa['nome_arquivo'], as_attachment=True, mimetype=tarefa['mime'])
+
+@rotas.route('/admin/importar-excel', methods=['POST'])
+@login_required
+def admin_importar_excel():
+    if not current_user.is_admin: return redirect(url_for('rotas.index'))
+    planilha = request.files.get('planilha')
+    if not planilha or not planilha.filename.lower().endswith(('.xlsx', '.xls')):
+        flash("Envie uma planilha .xlsx.", "warning"); return redirect(url_for('rotas.admin_panel'))
+    nome = secure_filename(planilha.filename) or 'resultados.xlsx'
+    enfileirar('importar-excel', {'arquivo': nome}, anexos={nome: planilha.save})
+    flash("Planilha na fila de importação. Acompanhe em Tarefas.", "info")
+    return redirect(url_for('rotas.admin_panel'))
+
+@rotas.route('/admin/importar-api', methods=['POST'])
+@login_required
+def admin_importar_api():
+    if not current_user.is_admin: return redirect(url_for('rotas.index'))
+    enfileirar('importar-api', {'quantidade': max(request.form.get('quantidade', 50, type=int), 0)})
+    flash("Importação pela API na fila. Acompanhe em Tarefas.", "info")
+    return redirect(url_for('rotas.admin_panel'))
+
+@rotas.cli.command('tarefas')
+def tarefas_cli():
+    """Sobe o pool de trabalhadores da fila de tarefas (TAREFAS_PROCESSOS processos) até Ctrl+C."""
+    processos = int(os.getenv('TAREFAS_PROCESSOS', 2))
+    print(f"Trabalhando na fila {fila.arquivo} com {processos} processo(s). Ctrl+C para parar.")
+    rodar_pool(fila.arquivo, fila.pasta, processos)
+
+# --- APLICAÇÃO (factory) ---
+_inicializacao = {}
+MODULOS_PESADOS = ('pandas', 'google.genai', 'openpyxl', 'fpdf')
+
+def criar_app(config=None):
+    """
+    Monta a aplicação: configuração (.env + `config`), banco, CSRF, login, rotas e
+    medições. Os módulos pesados ficam para a primeira rota que precisar deles.
+    Com RELATORIO_INICIALIZACAO=1 imprime quanto a subida custou.
+    """
+    inicio = time.perf_counter()
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'chave-padrao-insegura')
+    app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'static/uploads')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    app.config.update(config or {})
+    configurar_banco(app)
+    csrf.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(rotas)
+    before_render_template.connect(template_inicio, app)
+    template_rendered.connect(template_fim, app)
+
+    _inicializacao.update(importacoes=round(_FIM_IMPORTACOES - _INICIO, 4), criar_app=round(time.perf_counter() - inicio, 4))
+    app.extensions['inicializacao'] = dict(_inicializacao, pesados_carregados=[m for m in MODULOS_PESADOS if m in sys.modules])
+    if os.getenv('RELATORIO_INICIALIZACAO'): print(f"Inicialização: {app.extensions['inicializacao']}", file=sys.stderr)
+    return app
+
+@rotas.cli.command('tempo-inicializacao')
+def tempo_inicializacao_cli():
+    """Mede, em processos novos, quanto custa subir o app (worker) e carregar os importadores."""
+    medir = ("import sys, time; t = time.perf_counter(); import {modulo}{extra}; "
+             "print(round(time.perf_counter() - t, 3), [m for m in {pesados!r} if m in sys.modules])")
+    alvos = [('worker (app.criar_app)', 'app', ''), ('importar_resultados', 'importar_resultados', ''),
+             ('importar_excel', 'importar_excel', ''), ('modelos.criar_app_dados', 'modelos', '; modelos.criar_app_dados()')]
+    for nome, modulo, extra in alvos:
+        saida = subprocess.run([sys.executable, '-c', medir.format(modulo=modulo, extra=extra, pesados=MODULOS_PESADOS)],
+                               capture_output=True, text=True, cwd=basedir)
+        print(f"{nome:28s} {saida.stdout.strip() or saida.stderr.strip().splitlines()[-1]}")
+
+# gunicorn "app:app" / flask --app app. Para outra configuração (testes, scripts): criar_app({...})
+app = criar_app()
 
 if __name__ == '__main__':
-    with app.app_context(): db.create_all()
+    with app.app_context(): preparar_banco()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import numpy as np
+
+# Faixas premiadas da Lotofácil
+FAIXAS_PREMIO = (11, 12, 13, 14, 15)
+# Quantos jogos entram em cada multiplicação (limita a memória da matriz jogos x concursos)
+TAMANHO_BLOCO = 2048
+
+_BITS = np.arange(25, dtype=np.uint32)
+
+def mascaras_para_matriz(mascaras):
+    """Converte máscaras de 25 bits em matriz (n x 25) de 0/1 em float32."""
+    m = np.asarray(mascaras, dtype=np.uint32).reshape(-1)
+    return ((m[:, None] >> _BITS) & 1).astype(np.float32)
+
+def _maior_sequencia(premiado):
+    """Maior quantidade de concursos seguidos premiados (11+) em cada linha."""
+    qtd, total = premiado.shape
+    # Coluna extra de False no fim de cada linha: nenhuma sequência "vaza" para a linha seguinte
+    borda = np.zeros((qtd, total + 1), dtype=bool)
+    borda[:, :-1] = premiado
+    posicoes = np.flatnonzero(borda)
+    maiores = np.zeros(qtd, dtype=np.int32)
+    if len(posicoes) == 0:
+        return maiores
+    # Uma sequência nova começa onde a posição não é vizinha da anterior
+    quebras = np.flatnonzero(np.diff(posicoes) != 1) + 1
+    inicios = np.concatenate(([0], quebras))
+    tamanhos = np.diff(np.concatenate((inicios, [len(posicoes)])))
+    np.maximum.at(maiores, posicoes[inicios] // (total + 1), tamanhos.astype(np.int32))
+    return maiores
+
+def backtest(jogos, sorteios):
+    """
+    Confere vários jogos contra vários concursos de uma vez.
+
+    :param jogos: máscaras dos jogos (qualquer quantidade).
+    :param sorteios: máscaras dos concursos em ordem cronológica (mais antigo primeiro).
+    :return: dict com 'histograma' (jogos x 16, vezes que fez 0..15 pontos),
+             'premios' (jogos x 5, vezes em 11..15), 'melhor_sequencia' (jogos,)
+             e 'total_concursos'.
+    """
+    jogos = np.asarray(jogos, dtype=np.uint32).reshape(-1)
+    matriz_sorteios = mascaras_para_matriz(sorteios).T  # 25 x concursos
+    total_jogos = len(jogos)
+
+    histograma = np.zeros((total_jogos, 16), dtype=np.int32)
+    melhor_sequencia = np.zeros(total_jogos, dtype=np.int32)
+
+    for inicio in range(0, total_jogos, TAMANHO_BLOCO):
+        bloco = mascaras_para_matriz(jogos[inicio:inicio + TAMANHO_BLOCO])
+        acertos = bloco @ matriz_sorteios  # jogos x concursos (float32 com valores inteiros exatos)
+        qtd = len(bloco)
+        # bincount com deslocamento por linha = histograma de cada jogo sem loop
+        deslocado = (acertos + (np.arange(qtd, dtype=np.float32) * 16)[:, None]).astype(np.intp)
+        histograma[inicio:inicio + qtd] = np.bincount(deslocado.ravel(), minlength=qtd * 16).reshape(qtd, 16)
+        melhor_sequencia[inicio:inicio + qtd] = _maior_sequencia(acertos >= FAIXAS_PREMIO[0])
+
+    return {
+        'histograma': histograma,
+        'premios': histograma[:, FAIXAS_PREMIO[0]:],
+        'melhor_sequencia': melhor_sequencia,
+        'total_concursos': matriz_sorteios.shape[1],
+    }
+
+def acertos_premiados(jogos, sorteios, conferido_ate, criacao, concursos, datas):
+    """
+    Pares (jogo, concurso) com 11+ pontos, só nos concursos que o jogo ainda não conferiu
+    (concurso > conferido_ate) e sorteados a partir da criação dele (data >= criacao).
+
+    Usado pela conferência da carteira. A máscara "liberado" é montada por bloco de
+    TAMANHO_BLOCO jogos, como os acertos: a memória não cresce com jogos x concursos.
+    :param conferido_ate, criacao: por jogo (concurso, dia em ordinal)
+    :param concursos, datas: por concurso (número, dia em ordinal)
+    :return: (índices dos jogos, índices dos concursos, acertos)
+    """
+    jogos = np.asarray(jogos, dtype=np.uint32).reshape(-1)
+    conferido_ate, criacao = np.asarray(conferido_ate, dtype=np.int64), np.asarray(criacao, dtype=np.int64)
+    concursos, datas = np.asarray(concursos, dtype=np.int64), np.asarray(datas, dtype=np.int64)
+    matriz_sorteios = mascaras_para_matriz(sorteios).T
+    saida_j, saida_s, saida_a = [], [], []
+    for inicio in range(0, len(jogos), TAMANHO_BLOCO):
+        fim = inicio + TAMANHO_BLOCO
+        acertos = mascaras_para_matriz(jogos[inicio:fim]) @ matriz_sorteios
+        liberado = (concursos[None, :] > conferido_ate[inicio:fim, None]) & (datas[None, :] >= criacao[inicio:fim, None])
+        j, s = np.nonzero((acertos >= FAIXAS_PREMIO[0]) & liberado)
+        saida_j.append(j + inicio); saida_s.append(s); saida_a.append(acertos[j, s].astype(np.int32))
+    if not saida_j:
+        vazio = np.zeros(0, dtype=np.int64)
+        return vazio, vazio, vazio
+    return np.concatenate(saida_j), np.concatenate(saida_s), np.concatenate(saida_a)
@@ -0,0 +1,170 @@
+"""
+Benchmark das rotas de geração e do loto_logic.
+
+Cria um SQLite temporário com históricos sintéticos (100 / 3.000 / 30.000 concursos
+por padrão) e milhares de jogos salvos, chama cada rota pelo test client do Flask e
+cada função pura direto, e grava p50/p95, vazão e pico de memória num JSON para
+comparar entre commits.
+
+Uso: python benchmark.py [--tamanhos 100,3000,30000] [--jogos 2000] [--repeticoes 20] [--saida benchmark.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# O banco temporário precisa estar definido antes de importar o app
+PASTA_TEMP = tempfile.mkdtemp(prefix='bench_gr_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(PASTA_TEMP, 'bench.db')
+
+import app as aplicacao
+import modelos
+from app import app, db, User, JogoSalvo, ResultadoLotofacil
+from backtest import backtest
+from fechamento_garantia import otimizar_fechamento
+from indice_sorteios import indice, para_mascara
+from loto_logic import gerar_fechamento, pagina_fechamento
+from werkzeug.security import generate_password_hash
+
+SEMENTE = 2024
+# As rotas de replay medem o cálculo, não o enfileiramento (acima de REPLAY_DIRETO viram tarefa)
+aplicacao.REPLAY_DIRETO = float('inf')
+
+def formatar(numeros):
+    return ", ".join(f"{n:02d}" for n in numeros)
+
+def popular_banco(qtd_concursos, qtd_jogos):
+    """Recria o banco com um histórico sintético reproduzível."""
+    rnd = random.Random(SEMENTE)
+    db.drop_all(); db.create_all()
+    inicio = datetime(2003, 9, 29)
+    resultados = []
+    for c in range(1, qtd_concursos + 1):
+        nums = sorted(rnd.sample(range(1, 26), 15))
+        dia = inicio + timedelta(days=c)
+        resultados.append({'concurso': c, 'data_sorteio': dia.strftime('%d/%m/%Y'), 'data': dia.date(),
+                           'dezenas': formatar(nums), 'mascara': para_mascara(nums)})
+    db.session.execute(ResultadoLotofacil.__table__.insert(), resultados)
+    usuario = User(nome='Bench', email='bench@local', senha=generate_password_hash('bench'))
+    db.session.add(usuario); db.session.commit()
+    jogos = []
+    for _ in range(qtd_jogos):
+        nums = sorted(rnd.sample(range(1, 26), 15))
+        jogos.append({'numeros': formatar(nums), 'mascara': para_mascara(nums), 'tipo': 'Bench', 'user_id': usuario.id, 'data_criacao': datetime.utcnow()})
+    db.session.execute(JogoSalvo.__table__.insert(), jogos)
+    db.session.commit()
+    # Estado do processo (índice e estatísticas) volta ao zero a cada tamanho
+    indice.carregado = False
+    modelos._assinatura_estatisticas = None
+    aplicacao.cache.limpar()
+    aplicacao.preparar_banco()
+    return [r['mascara'] for r in resultados], [j['mascara'] for j in jogos]
+
+def medir(chamada, repeticoes, itens=1):
+    """Roda `chamada` várias vezes: latências (ms), vazão e pico de memória (uma rodada extra com tracemalloc)."""
+    chamada()  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        t = time.perf_counter(); chamada(); tempos.append((time.perf_counter() - t) * 1000)
+    tracemalloc.start()
+    chamada()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    tempos.sort()
+    media = statistics.fmean(tempos)
+    return {
+        'p50_ms': round(statistics.median(tempos), 3),
+        'p95_ms': round(tempos[min(len(tempos) - 1, int(round(0.95 * (len(tempos) - 1))))], 3),
+        'media_ms': round(media, 3),
+        'vazao_por_s': round(itens * 1000 / media, 1) if media else None,
+        'pico_memoria_kb': round(pico / 1024, 1),
+    }
+
+def post_ok(cliente, rota, **kwargs):
+    def chamada():
+        r = cliente.post(rota, **kwargs)
+        assert r.status_code == 200, f"{rota} devolveu {r.status_code}"
+    return chamada
+
+def rodar_tamanho(qtd_concursos, qtd_jogos, repeticoes):
+    with app.app_context():
+        t = time.perf_counter()
+        sorteios, jogos = popular_banco(qtd_concursos, qtd_jogos)
+        preparo = time.perf_counter() - t
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'email': 'bench@local', 'senha': 'bench'})
+    with app.app_context():
+        dezenas_ultimo = ResultadoLotofacil.query.order_by(ResultadoLotofacil.concurso.desc()).first().dezenas
+    numeros_ultimo = [int(n) for n in dezenas_ultimo.split(', ')]
+    pool_18 = list(range(1, 19))
+
+    rotas = {
+        'rota_index': lambda: cliente.get('/?filtro=0'),
+        'rota_gerar_pura': post_ok(cliente, '/gerar-pura'),
+        'rota_gerar_ouro': post_ok(cliente, '/gerar-ouro', data={'numeros': numeros_ultimo, 'fixos': numeros_ultimo[:8], 'qtd_jogos': 10, 'filtro_hidden': 0}),
+        'rota_gerar_metodo_25': post_ok(cliente, '/gerar-metodo-25', data={'ultimo_resultado_25': dezenas_ultimo, 'fixas_sorteadas': numeros_ultimo[:3],
+                                                                           'fixas_ausentes': [n for n in range(1, 26) if n not in numeros_ultimo][:2]}),
+        'rota_surpresinha': post_ok(cliente, '/surpresinha', data={'qtd_surpresa': 50}),
+        'rota_api_surpresinha_10k': lambda: cliente.get('/api/v1/gerar/surpresinha?qtd=10000&semente=1').get_data(),
+        'rota_api_surpresinha_pares_10k': lambda: cliente.get('/api/v1/gerar/surpresinha?qtd=10000&semente=1&pares=favorecer').get_data(),
+        'rota_api_replay_pura': lambda: (aplicacao.cache.limpar(), cliente.get('/api/v1/replay/pura').get_data()),
+        'rota_api_replay_surpresinha_10': lambda: (aplicacao.cache.limpar(), cliente.get('/api/v1/replay/surpresinha?qtd=10').get_data()),
+        'rota_simular': post_ok(cliente, '/simular', data={'dezenas_simular': dezenas_ultimo, 'filtro_simulacao': 0}),
+        'rota_simular_lote': post_ok(cliente, '/simular-lote', json={'filtro': 0}),
+        'rota_resultados_busca_dezenas': lambda: cliente.get(f"/resultados?q={'+'.join(map(str, numeros_ultimo[:3]))}&antes={qtd_concursos // 2}"),
+    }
+    resultado = {'preparo_s': round(preparo, 2)}
+    for nome, chamada in rotas.items():
+        resultado[nome] = medir(chamada, repeticoes)
+
+    total_fechamento_18 = gerar_fechamento(18, [], numeros_variaveis=pool_18)['total_jogos']
+    resultado['fn_gerar_fechamento_18'] = medir(lambda: sum(1 for _ in gerar_fechamento(18, [], numeros_variaveis=pool_18)['jogos']), repeticoes, itens=total_fechamento_18)
+    resultado['fn_pagina_fechamento_25'] = medir(lambda: pagina_fechamento(list(range(1, 26)), 1000, 1000), repeticoes, itens=1000)
+    resultado['fn_backtest_carteira'] = medir(lambda: backtest(jogos, sorteios), max(3, repeticoes // 5), itens=len(jogos))
+    resultado['fn_otimizar_fechamento_18_14'] = medir(lambda: otimizar_fechamento(18, 14), max(3, repeticoes // 5))
+    return resultado
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark das estratégias de geração.")
+    parser.add_argument('--tamanhos', default='100,3000,30000', help="quantidades de concursos sintéticos")
+    parser.add_argument('--jogos', type=int, default=2000, help="jogos salvos do usuário de teste")
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--saida', default='benchmark.json')
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    relatorio = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'jogos_salvos': args.jogos,
+        'repeticoes': args.repeticoes,
+        'tamanhos': {},
+    }
+    for tamanho in [int(t) for t in args.tamanhos.split(',')]:
+        print(f"⏱️ {tamanho} concursos...")
+        relatorio['tamanhos'][str(tamanho)] = rodar_tamanho(tamanho, args.jogos, args.repeticoes)
+        for nome, medida in relatorio['tamanhos'][str(tamanho)].items():
+            if isinstance(medida, dict): print(f"   {nome:32s} p50 {medida['p50_ms']:>9.2f} ms   p95 {medida['p95_ms']:>9.2f} ms")
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(PASTA_TEMP, ignore_errors=True)
+    print(f"\n📄 Resultado salvo em {args.saida}")
@@ -0,0 +1,93 @@
+"""
+Cache de respostas: LRU em memória com TTL e, opcionalmente, um arquivo SQLite
+compartilhado entre os workers (segundo nível).
+
+As chaves já carregam a versão dos dados (ver VersaoDados no app), então não existe
+"invalidar": quando um concurso entra ou sai, as chaves novas simplesmente não batem
+com as antigas, que expiram pelo TTL ou saem pelo LRU.
+"""
+import contextlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class CacheRespostas:
+
+    def __init__(self, maximo=512, ttl=300, arquivo=None):
+        self.maximo = maximo
+        self.ttl = ttl
+        self.arquivo = arquivo
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self._gravacoes = 0
+        self.consultas = {'memoria': 0, 'arquivo': 0, 'falta': 0}  # acertos por nível e faltas (lido pelo /metrics)
+        if arquivo:
+            with self._conectar() as con:
+                con.execute('CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, expira REAL, valor BLOB)')
+
+    def __len__(self):
+        """Itens no nível de memória (o /metrics lê isto)."""
+        return len(self._itens)
+
+    @contextlib.contextmanager
+    def _conectar(self):
+        # `with conexão` só faz commit/rollback: o closing é que fecha a conexão (e o arquivo) na saída
+        with contextlib.closing(sqlite3.connect(self.arquivo, timeout=5)) as con, con:
+            yield con
+
+    def obter(self, chave):
+        agora = time.time()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item and item[0] > agora:
+                self._itens.move_to_end(chave)
+                self.consultas['memoria'] += 1
+                return item[1]
+            self._itens.pop(chave, None)
+        linha = None
+        if self.arquivo:
+            try:
+                with self._conectar() as con:
+                    linha = con.execute('SELECT expira, valor FROM cache WHERE chave = ?', (chave,)).fetchone()
+            except sqlite3.Error:
+                pass
+        if not linha or linha[0] <= agora:
+            self.consultas['falta'] += 1
+            return None
+        self.consultas['arquivo'] += 1
+        valor = pickle.loads(linha[1])
+        self._guardar_local(chave, valor, linha[0])
+        return valor
+
+    def _guardar_local(self, chave, valor, expira):
+        with self._lock:
+            self._itens[chave] = (expira, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+    def guardar(self, chave, valor, ttl=None):
+        expira = time.time() + (ttl or self.ttl)
+        self._guardar_local(chave, valor, expira)
+        if not self.arquivo: return
+        try:
+            with self._conectar() as con:
+                con.execute('INSERT OR REPLACE INTO cache (chave, expira, valor) VALUES (?, ?, ?)', (chave, expira, pickle.dumps(valor)))
+                self._gravacoes += 1
+                if self._gravacoes % 100 == 0: con.execute('DELETE FROM cache WHERE expira <= ?', (time.time(),))
+        except sqlite3.Error:
+            pass  # o segundo nível é só otimização
+
+    def obter_ou_calcular(self, chave, calcular, ttl=None):
+        valor = self.obter(chave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(chave, valor, ttl)
+        return valor
+
+    def limpar(self):
+        with self._lock: self._itens.clear()
+        if self.arquivo:
+            with self._conectar() as con: con.execute('DELETE FROM cache')
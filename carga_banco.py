@@ -0,0 +1,190 @@
+"""
+Teste de carga do banco: usuários em processos separados (como os workers do gunicorn)
+chamando / e /resultados e salvando jogos (/salvar-multiplos, uma fração --escritas das
+requisições) enquanto outro processo importa concursos do mesmo jeito que importar_excel.py:
+INSERT em lote com commit por lote e, no fim, estatísticas + conferência de todas as carteiras.
+
+Cada lote segura a transação aberta por --segurar segundos (uma importação lenta), acima dos
+5 s que o SQLite espera por uma trava: no modo simples os salvamentos caem em "database is
+locked". As telas só leem (quem grava resultados sincroniza as estatísticas), então não
+disputam a trava de escrita. No modo producao --espera-ms (BANCO_BUSY_TIMEOUT_MS) maior que a
+transação mais longa zera os erros de escrita; o modo simples não tem esse ajuste.
+
+Cada modo (BANCO_MODO=simples e producao) roda sobre um SQLite temporário próprio e
+imprime requisições, erros ("database is locked" e outros) de leitura, de escrita e da
+importação, p50/p95/máximo das leituras e a duração da importação.
+
+Uso: python carga_banco.py [--leitores 4] [--concursos 3000] [--importar 3000] [--lote 1000] [--segurar 6]
+                           [--espera-ms 30000] [--escritas 0.2] [--jogos 200] [--modos simples,producao]
+                           [--saida carga.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import traceback
+from datetime import datetime, timedelta
+
+SEMENTE = 2024
+SENHA = 'carga'
+ROTAS = ('/?filtro=10', '/?filtro=0', '/resultados', '/resultados?q=1+2+3', '/api/estatisticas/10')
+
+def ambiente(banco, modo):
+    # Antes de importar app/modelos: a configuração do banco sai do ambiente
+    os.environ['DATABASE_URL'] = 'sqlite:///' + banco
+    os.environ['BANCO_MODO'] = modo
+
+def concursos(inicio, fim):
+    rnd = random.Random(SEMENTE + inicio)
+    from indice_sorteios import para_mascara
+    primeiro_dia = datetime(2003, 9, 29)
+    saida = []
+    for c in range(inicio, fim + 1):
+        nums = sorted(rnd.sample(range(1, 26), 15))
+        # 6 por dia: mesmo com dezenas de milhares de concursos o histórico fica no passado. Sorteio com data
+        # futura seria conferido contra os jogos salvos durante o teste e a conferência viraria o gargalo
+        dia = primeiro_dia + timedelta(days=c // 6)
+        saida.append({'concurso': c, 'data_sorteio': dia.strftime('%d/%m/%Y'), 'data': dia.date(),
+                      'dezenas': ", ".join(f"{n:02d}" for n in nums), 'mascara': para_mascara(nums)})
+    return saida
+
+def preparar(banco, modo, qtd, usuarios):
+    ambiente(banco, modo)
+    from werkzeug.security import generate_password_hash
+    from modelos import criar_app_dados, db, preparar_banco, ResultadoLotofacil, User
+    with criar_app_dados().app_context():
+        db.create_all()
+        db.session.execute(ResultadoLotofacil.__table__.insert(), concursos(1, qtd))
+        senha = generate_password_hash(SENHA)
+        db.session.execute(User.__table__.insert(), [{'nome': f'Carga {i}', 'email': f'carga{i}@teste', 'senha': senha} for i in range(usuarios)])
+        db.session.commit()
+        preparar_banco()
+        db.engine.dispose()
+
+def tipo_erro(e):
+    return 'database is locked' if 'locked' in str(e) else type(e).__name__
+
+def leitor(banco, modo, numero, escritas, jogos, prontos, parar, saida):
+    """Um usuário logado: lê as telas e, numa fração `escritas` das vezes, salva `jogos` jogos de uma vez."""
+    ambiente(banco, modo)
+    try:
+        from app import app
+        app.config['PROPAGATE_EXCEPTIONS'] = True  # o erro do banco chega aqui em vez de virar uma página 500
+        app.config['WTF_CSRF_ENABLED'] = False
+        cliente, rnd = app.test_client(), random.Random(SEMENTE + numero)
+        if cliente.post('/login', data={'email': f'carga{numero}@teste', 'senha': SENHA}).status_code != 302: raise RuntimeError('login falhou')
+        for rota in ROTAS: cliente.get(rota).close()  # aquecimento (índice, estatísticas)
+    except Exception:
+        prontos.release(); saida.put({'falhou': traceback.format_exc()}); return
+    prontos.release()
+    tempos, erros, salvamentos, erros_escrita = [], {}, 0, {}
+    while not parar.is_set():
+        if rnd.random() < escritas:
+            lote = [sorted(rnd.sample(range(1, 26), 15)) for _ in range(jogos)]
+            try:
+                r = cliente.post('/salvar-multiplos', json={'jogos': lote}); r.close()
+                if r.status_code >= 400: raise RuntimeError(f'status {r.status_code}')
+                salvamentos += 1
+            except Exception as e:
+                erros_escrita[tipo_erro(e)] = erros_escrita.get(tipo_erro(e), 0) + 1
+            continue
+        rota = rnd.choice(ROTAS)
+        t = time.perf_counter()
+        try:
+            r = cliente.get(rota); r.get_data(); r.close()
+            if r.status_code >= 500: raise RuntimeError(f'status {r.status_code}')
+            tempos.append((time.perf_counter() - t) * 1000)
+        except Exception as e:
+            erros[tipo_erro(e)] = erros.get(tipo_erro(e), 0) + 1
+    saida.put({'tempos': tempos, 'erros': erros, 'salvamentos': salvamentos, 'erros_escrita': erros_escrita})
+
+def importador(banco, modo, inicio, fim, lote, segurar, saida):
+    """
+    Como importar_excel.py: lotes com commit e, no fim, estatísticas e a conferência das carteiras
+    (que cresceram durante o teste). `segurar` segundos com a transação do lote aberta antes do
+    commit fazem o papel de uma importação lenta (fonte lenta, validação linha a linha).
+    """
+    ambiente(banco, modo)
+    from modelos import (criar_app_dados, db, inserir_ignorando, incrementar_versao, reabrir_conferencia, sincronizar_estatisticas,
+                         conferir_carteiras, ResultadoLotofacil)
+    registros, erros, t = concursos(inicio, fim), {}, time.perf_counter()
+    def tentar(passo):
+        try: passo()
+        except Exception as e:
+            db.session.rollback()
+            erros[tipo_erro(e)] = erros.get(tipo_erro(e), 0) + 1
+    with criar_app_dados().app_context():
+        comando = inserir_ignorando(ResultadoLotofacil.__table__, ['concurso'])
+        for i in range(0, len(registros), lote):
+            tentar(lambda: (db.session.execute(comando, registros[i:i + lote]), incrementar_versao(), time.sleep(segurar), db.session.commit()))
+        tentar(lambda: (reabrir_conferencia(inicio), incrementar_versao(), db.session.commit()))
+        tentar(sincronizar_estatisticas)
+        tentar(conferir_carteiras)
+    saida.put({'importacao_s': round(time.perf_counter() - t, 2), 'lotes': -(-len(registros) // lote), 'erros_importacao': erros})
+
+def rodar_modo(modo, args):
+    pasta = tempfile.mkdtemp(prefix='carga_gr_')
+    banco = os.path.join(pasta, 'carga.db')
+    ctx = multiprocessing.get_context('spawn')
+    try:
+        preparo = ctx.Process(target=preparar, args=(banco, modo, args.concursos, args.leitores)); preparo.start(); preparo.join()
+        prontos, parar, saida = ctx.Semaphore(0), ctx.Event(), ctx.Queue()
+        leitores = [ctx.Process(target=leitor, args=(banco, modo, i, args.escritas, args.jogos, prontos, parar, saida)) for i in range(args.leitores)]
+        for p in leitores: p.start()
+        for _ in leitores: prontos.acquire()
+
+        escrita = ctx.Queue()
+        imp = ctx.Process(target=importador, args=(banco, modo, args.concursos + 1, args.concursos + args.importar, args.lote, args.segurar, escrita))
+        imp.start()
+        resultado = escrita.get(); imp.join()
+        parar.set()
+        partes = [saida.get() for _ in leitores]
+        for p in leitores: p.join()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    falhas = [p['falhou'] for p in partes if 'falhou' in p]
+    if falhas: raise SystemExit(f"Leitor não subiu ({modo}):\n{falhas[0]}")
+    tempos = sorted(t for p in partes for t in p['tempos'])
+    erros, erros_escrita = {}, {}
+    for p in partes:
+        for tipo, qtd in p['erros'].items(): erros[tipo] = erros.get(tipo, 0) + qtd
+        for tipo, qtd in p['erros_escrita'].items(): erros_escrita[tipo] = erros_escrita.get(tipo, 0) + qtd
+    resultado.update({
+        'requisicoes': len(tempos) + sum(erros.values()), 'erros_leitura': erros,
+        'salvamentos': sum(p['salvamentos'] for p in partes) + sum(erros_escrita.values()), 'erros_escrita': erros_escrita,
+        'p50_ms': round(statistics.median(tempos), 2) if tempos else None,
+        'p95_ms': round(tempos[int(0.95 * (len(tempos) - 1))], 2) if tempos else None,
+        'max_ms': round(tempos[-1], 2) if tempos else None,
+    })
+    return resultado
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Usuários concorrentes (leitura e escrita) durante uma importação em lote.")
+    parser.add_argument('--leitores', type=int, default=4, help="processos leitores (workers)")
+    parser.add_argument('--concursos', type=int, default=3000, help="histórico inicial")
+    parser.add_argument('--importar', type=int, default=3000, help="concursos importados durante o teste")
+    parser.add_argument('--lote', type=int, default=1000, help="concursos por commit (o padrão do importar_excel.py)")
+    parser.add_argument('--segurar', type=float, default=6, help="segundos com a transação de cada lote aberta (acima dos 5 s de espera padrão)")
+    parser.add_argument('--espera-ms', type=int, default=None, help="BANCO_BUSY_TIMEOUT_MS (só o modo producao aplica; o simples fica nos 5 s do driver)")
+    parser.add_argument('--escritas', type=float, default=0.2, help="fração das requisições que salvam jogos")
+    parser.add_argument('--jogos', type=int, default=200, help="jogos por salvamento")
+    parser.add_argument('--modos', default='simples,producao')
+    parser.add_argument('--saida', default=None, help="grava o resultado em JSON")
+    args = parser.parse_args()
+    if args.espera_ms: os.environ['BANCO_BUSY_TIMEOUT_MS'] = str(args.espera_ms)  # os processos filhos herdam
+
+    relatorio = {}
+    for modo in args.modos.split(','):
+        print(f"⏱️ BANCO_MODO={modo}: {args.leitores} usuários ({args.escritas:.0%} salvando {args.jogos} jogos), importando {args.importar} concursos em lotes de {args.lote}...")
+        r = relatorio[modo] = rodar_modo(modo, args)
+        print(f"   importação {r['importacao_s']}s ({r['lotes']} lotes, erros {r['erros_importacao'] or 0})")
+        print(f"   leituras: {r['requisicoes']} requisições, erros {r['erros_leitura'] or 0}, p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms, máx {r['max_ms']} ms")
+        print(f"   escritas: {r['salvamentos']} salvamentos, erros {r['erros_escrita'] or 0}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f: json.dump(relatorio, f, indent=2, ensure_ascii=False)
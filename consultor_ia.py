@@ -0,0 +1,131 @@
+"""
+Consultor GR: chamadas ao modelo fora do worker do Flask.
+
+As perguntas rodam num pool de threads limitado, com tempo máximo e limite de
+perguntas simultâneas por usuário. A resposta chega em pedaços (streaming) e as
+respostas completas ficam num cache LRU por (pergunta normalizada, concurso base).
+"""
+import queue
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_respostas import CacheRespostas
+
+CONTEXTO_ESPECIALISTA = """
+VOCÊ É O 'CONSULTOR GR', ESPECIALISTA EM LOTOFÁCIL.
+IMPORTANTE: Sempre que o usuário pedir para "fazer uma aposta", pergunte:
+"Qual estratégia você prefere? Padrão, Pura ou Método 25?"
+Conhecimentos:
+1. Padrão: Fixos e Aleatórios.
+2. Método 25 (Novo): 3 Fixas Sorteadas + 2 Fixas Ausentes. Gera 4 jogos.
+3. Pura: Analisa os últimos 10 concursos. Gera 3 jogos (Lógica, Equilíbrio, Meio).
+Use apenas os números dos DADOS ATUAIS abaixo quando falar de estatísticas; não invente.
+"""
+
+class Ocupado(Exception):
+    """Pool cheio ou usuário já com o máximo de perguntas em andamento."""
+
+def normalizar_pergunta(texto):
+    """Minúsculas, sem acento, sem pontuação e espaços repetidos: 'Qual a MELHOR dezena?' == 'qual a melhor dezena'."""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', texto)).strip()
+
+def montar_prompt(pergunta, contexto_estatistico):
+    return f"{CONTEXTO_ESPECIALISTA}\nDADOS ATUAIS:\n{contexto_estatistico}\n\nUsuário: {pergunta}\nConsultor GR:"
+
+class ConsultorIA:
+
+    def __init__(self, cliente, modelo="gemini-2.5-flash", workers=4, fila=8, timeout=30, por_usuario=1, cache=None, ao_terminar=None):
+        self.cliente = cliente
+        self.ao_terminar = ao_terminar  # ao_terminar(segundos, situacao) depois de cada chamada ao modelo (métricas)
+        self.modelo = modelo
+        self.timeout = timeout
+        self.por_usuario = por_usuario
+        self.cache = cache if cache is not None else CacheRespostas(maximo=256, ttl=6 * 3600)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='consultor')
+        self._vagas = threading.BoundedSemaphore(workers + fila)  # rodando + esperando
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def _reservar(self, usuario):
+        with self._lock:
+            if self._em_andamento.get(usuario, 0) >= self.por_usuario:
+                raise Ocupado("Aguarde a resposta anterior terminar.")
+            if not self._vagas.acquire(blocking=False):
+                raise Ocupado("O consultor está ocupado agora. Tente em alguns segundos.")
+            self._em_andamento[usuario] = self._em_andamento.get(usuario, 0) + 1
+
+    def _liberar(self, usuario):
+        with self._lock:
+            self._vagas.release()
+            if self._em_andamento.get(usuario, 0) <= 1: self._em_andamento.pop(usuario, None)
+            else: self._em_andamento[usuario] -= 1
+
+    def _chamar_modelo(self, prompt, fila, cancelado, usuario):
+        # A vaga só volta quando a chamada ao modelo termina de verdade (mesmo se quem pediu já desistiu)
+        inicio, situacao = time.monotonic(), 'ok'
+        try:
+            for pedaco in self.cliente.models.generate_content_stream(model=self.modelo, contents=prompt):
+                if cancelado.is_set(): situacao = 'cancelada'; break
+                if pedaco.text: fila.put(('texto', pedaco.text))
+            fila.put(('fim', None))
+        except Exception as e:
+            situacao = 'erro'
+            fila.put(('erro', e))
+        finally:
+            self._liberar(usuario)
+            if self.ao_terminar: self.ao_terminar(time.monotonic() - inicio, situacao)
+
+    def perguntar(self, pergunta, contexto_estatistico, chave_contexto, usuario):
+        """
+        Gerador com os pedaços da resposta. Levanta Ocupado antes de começar se não há vaga.
+        A resposta inteira (espera no pool incluída) dura no máximo `timeout` segundos, contados
+        daqui e não do primeiro pedaço lido. Se o tempo esgotar ou o cliente desconectar, a
+        chamada ao modelo é abandonada no próximo pedaço.
+        """
+        chave = f"{chave_contexto}:{normalizar_pergunta(pergunta)}"
+        pronta = self.cache.obter(chave)
+        if pronta is not None: return iter([pronta])
+
+        self._reservar(usuario)
+        fila, cancelado, limite = queue.Queue(), threading.Event(), time.monotonic() + self.timeout
+        try:
+            self._executor.submit(self._chamar_modelo, montar_prompt(pergunta, contexto_estatistico), fila, cancelado, usuario)
+        except RuntimeError:
+            self._liberar(usuario); raise Ocupado("O consultor está indisponível.")
+
+        def pedacos():
+            partes = []
+            try:
+                while True:
+                    try: tipo, valor = fila.get(timeout=max(0.0, limite - time.monotonic()))
+                    except queue.Empty:
+                        yield "\n\n(Tempo esgotado. Tente perguntar de novo.)"; return
+                    if tipo == 'texto':
+                        partes.append(valor); yield valor
+                    elif tipo == 'erro':
+                        yield "Erro na IA. Tente novamente."; return
+                    else:
+                        if partes: self.cache.guardar(chave, "".join(partes))
+                        return
+            finally:
+                cancelado.set()
+        return pedacos()
+
+class ClienteFalso:
+    """Substituto local do cliente do Gemini (IA_CLIENTE_FALSO=1): responde ecoando, em pedaços, com atraso opcional."""
+
+    def __init__(self, atraso=0.0):
+        self.atraso = atraso
+        self.chamadas = 0
+        self.models = self
+
+    def generate_content_stream(self, model, contents):
+        self.chamadas += 1
+        pergunta = contents.rsplit("Usuário:", 1)[-1].split("\nConsultor GR:")[0].strip()
+        for palavra in f"Resposta de teste para: {pergunta}".split(' '):
+            if self.atraso: time.sleep(self.atraso)
+            yield type('Pedaco', (), {'text': palavra + ' '})()
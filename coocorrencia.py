@@ -0,0 +1,152 @@
+"""
+Coocorrência de dezenas: quantas vezes cada par (matriz 25x25) e cada trio (tabela
+compacta com os C(25,3) = 2.300 trios) saiu junto no histórico.
+
+Um concurso novo custa só somar os 105 pares e 455 trios dele. Para as janelas
+("últimos N concursos") guardamos marcos a cada PASSO_MARCOS concursos com os totais
+acumulados até ali: janela = total - (marco mais próximo + no máximo 63 concursos),
+sem depender do tamanho do histórico.
+"""
+import threading
+from array import array
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+PASSO_MARCOS = 64
+
+# Trio i = dezenas TRIPLAS[i] + 1 (índices 0..24); _POSICAO_TRIO[a, b, c] devolve i para a < b < c
+TRIPLAS = np.array(list(combinations(range(25), 3)), dtype=np.int64)
+_POSICAO_TRIO = np.full((25, 25, 25), -1, dtype=np.int64)
+_POSICAO_TRIO[TRIPLAS[:, 0], TRIPLAS[:, 1], TRIPLAS[:, 2]] = np.arange(len(TRIPLAS))
+_PARES = np.triu_indices(25, 1)
+
+# Chance de um par / trio fixo sair num sorteio de 15 em 25 (referência da afinidade = 1.0)
+CHANCE_PAR = 15 * 14 / (25 * 24)
+CHANCE_TRIO = 15 * 14 * 13 / (25 * 24 * 23)
+
+def _presencas(mascaras):
+    """Matriz (n, 25) de 0/1: linha = concurso, coluna = dezena."""
+    m = np.asarray(mascaras, dtype=np.uint32)
+    return ((m[:, None] >> np.arange(25, dtype=np.uint32)) & 1).astype(np.uint8)
+
+def contar(mascaras):
+    """(pares 25x25, trios 2300) de uma lista de máscaras. A diagonal dos pares é a frequência de cada dezena."""
+    if not len(mascaras): return np.zeros((25, 25), dtype=np.int32), np.zeros(len(TRIPLAS), dtype=np.int32)
+    x = _presencas(mascaras)
+    pares = x.T.astype(np.int32) @ x.astype(np.int32)
+    trios = (x[:, TRIPLAS[:, 0]] & x[:, TRIPLAS[:, 1]] & x[:, TRIPLAS[:, 2]]).sum(axis=0, dtype=np.int32)
+    return pares, trios
+
+@lru_cache(maxsize=None)
+def _combinacoes(k):
+    return np.array(list(combinations(range(k), 3)), dtype=np.int64).reshape(-1, 3)
+
+def posicoes_trios(dezenas):
+    """Posições na tabela compacta de todos os trios de uma lista de dezenas (1..25)."""
+    indices = np.array(sorted(dezenas), dtype=np.int64) - 1
+    c = _combinacoes(len(indices))
+    return _POSICAO_TRIO[indices[c[:, 0]], indices[c[:, 1]], indices[c[:, 2]]]
+
+class Coocorrencia:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._carregar(array('I'))
+
+    def __len__(self):
+        return len(self.mascaras)
+
+    def _carregar(self, mascaras):
+        self.mascaras = array('I', mascaras)
+        zeros = (np.zeros((25, 25), dtype=np.int32), np.zeros(len(TRIPLAS), dtype=np.int32))
+        if not self.mascaras:
+            self.pares, self.trios = zeros[0].copy(), zeros[1].copy()
+            self.marcos = [zeros]
+            return
+        # Tudo de uma vez: soma por blocos de PASSO_MARCOS concursos e acumula os blocos
+        x = _presencas(self.mascaras)
+        por_concurso_pares = (x[:, :, None] & x[:, None, :]).reshape(len(x), 625)
+        por_concurso_trios = x[:, TRIPLAS[:, 0]] & x[:, TRIPLAS[:, 1]] & x[:, TRIPLAS[:, 2]]
+        inicios = np.arange(0, len(x), PASSO_MARCOS)
+        pares = np.cumsum(np.add.reduceat(por_concurso_pares, inicios, axis=0, dtype=np.int32), axis=0, dtype=np.int32)
+        trios = np.cumsum(np.add.reduceat(por_concurso_trios, inicios, axis=0, dtype=np.int32), axis=0, dtype=np.int32)
+        completos = len(x) // PASSO_MARCOS
+        self.marcos = [zeros] + [(pares[i].reshape(25, 25), trios[i]) for i in range(completos)]
+        self.pares, self.trios = pares[-1].reshape(25, 25).copy(), trios[-1].copy()
+
+    def _adicionar(self, mascara):
+        dezenas = [n for n in range(1, 26) if mascara >> (n - 1) & 1]
+        indices = np.array(dezenas) - 1
+        self.pares[np.ix_(indices, indices)] += 1
+        self.trios[posicoes_trios(dezenas)] += 1
+        self.mascaras.append(mascara)
+        if len(self.mascaras) % PASSO_MARCOS == 0: self.marcos.append((self.pares.copy(), self.trios.copy()))
+
+    def sincronizar(self, mascaras):
+        """
+        Acompanha o histórico (máscaras em ordem cronológica): se só chegaram concursos no
+        fim, soma um a um; se algo mudou no meio (exclusão, correção) ou chegou muita
+        coisa de uma vez (primeira carga, importação), reconta tudo vetorizado.
+        """
+        with self._lock:
+            n = len(self.mascaras)
+            if n <= len(mascaras) <= n + PASSO_MARCOS and mascaras[:n] == self.mascaras:
+                for m in mascaras[n:]: self._adicionar(m)
+            else:
+                self._carregar(mascaras)
+
+    def _prefixo(self, posicao):
+        """Totais dos primeiros `posicao` concursos: marco anterior + o que falta até ele."""
+        marco = posicao // PASSO_MARCOS
+        pares, trios = self.marcos[marco]
+        resto = self.mascaras[marco * PASSO_MARCOS:posicao]
+        if not resto: return pares, trios
+        mais_pares, mais_trios = contar(resto)
+        return pares + mais_pares, trios + mais_trios
+
+    def contagens(self, janela=0):
+        """(concursos, pares 25x25, trios 2300) dos últimos `janela` concursos (0 = histórico todo)."""
+        with self._lock:
+            n = len(self.mascaras)
+            if janela <= 0 or janela >= n: return n, self.pares.copy(), self.trios.copy()
+            pares, trios = self._prefixo(n - janela)
+            return janela, self.pares - pares, self.trios - trios
+
+    def pesos(self, janela=0):
+        """
+        Matriz 25x25 com o log da afinidade de cada par (0 = saiu o esperado, > 0 = mais
+        junto que o acaso). Suavizada (+1) para janelas curtas não explodirem. Diagonal 0.
+        """
+        qtd, pares, _ = self.contagens(janela)
+        esperado = qtd * CHANCE_PAR
+        pesos = np.log((pares + 1.0) / (esperado + 1.0)).astype(np.float32)
+        np.fill_diagonal(pesos, 0)
+        return pesos
+
+    def resumo(self, janela=0, top=15, trios=10, dezena=None, matriz=False):
+        """Dados da API: pares e trios mais/menos frequentes, parceiras de uma dezena e (opcional) a matriz."""
+        qtd, pares, contagem_trios = self.contagens(janela)
+        esperado_par, esperado_trio = qtd * CHANCE_PAR, qtd * CHANCE_TRIO
+        afinidade = lambda vezes, esperado: round(float(vezes) / esperado, 3) if esperado else None
+
+        vezes = pares[_PARES]
+        ordem = np.lexsort((np.arange(len(vezes)), -vezes))  # mais frequentes primeiro; empate pela ordem das dezenas
+        par = lambda i: {'dezenas': [int(_PARES[0][i]) + 1, int(_PARES[1][i]) + 1], 'vezes': int(vezes[i]), 'afinidade': afinidade(vezes[i], esperado_par)}
+        ordem_trios = np.lexsort((np.arange(len(TRIPLAS)), -contagem_trios))
+        trio = lambda i: {'dezenas': [int(d) + 1 for d in TRIPLAS[i]], 'vezes': int(contagem_trios[i]), 'afinidade': afinidade(contagem_trios[i], esperado_trio)}
+
+        saida = {
+            'concursos': qtd, 'esperado_par': round(esperado_par, 2), 'esperado_trio': round(esperado_trio, 2),
+            'pares_fortes': [par(i) for i in ordem[:top]], 'pares_fracos': [par(i) for i in ordem[::-1][:top]],
+            'trios_fortes': [trio(i) for i in ordem_trios[:trios]], 'trios_fracos': [trio(i) for i in ordem_trios[::-1][:trios]],
+        }
+        if dezena:
+            linha, aparicoes = pares[dezena - 1], int(pares[dezena - 1, dezena - 1])
+            outras = sorted((n for n in range(1, 26) if n != dezena), key=lambda n: (-linha[n - 1], n))
+            # 'junto': em que fração dos concursos com a dezena a parceira também saiu (o acaso daria 14/24)
+            saida['parceiras'] = {'dezena': dezena, 'aparicoes': aparicoes, 'lista': [
+                {'dezena': n, 'vezes': int(linha[n - 1]), 'junto': round(float(linha[n - 1]) / aparicoes, 3) if aparicoes else None} for n in outras]}
+        if matriz: saida['matriz'] = pares.tolist()
+        return saida
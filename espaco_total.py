@@ -0,0 +1,223 @@
+"""
+Tabela com todos os C(25,15) = 3.268.760 jogos possíveis, num arquivo .npy mapeado em memória.
+
+Cada linha guarda a máscara do jogo, características fixas (soma, ímpares, primos,
+moldura, maior sequência) e quantas vezes ele teria feito 11..15 pontos no histórico.
+As linhas ficam em ordem crescente de máscara, então achar um jogo é um searchsorted.
+
+O arquivo é montado uma vez (`flask construir-espaco`) e depois só recebe o delta
+dos concursos que entraram ou saíram do banco, pelo caminho que grava resultados
+(admin e importadores). Os workers abrem em modo leitura.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+from estatisticas import MASCARA_IMPARES, MASCARA_PRIMOS, MASCARA_MOLDURA
+
+TOTAL_JOGOS = 3_268_760
+FAIXAS = (11, 12, 13, 14, 15)
+
+DTYPE = np.dtype([
+    ('mascara', '<u4'),
+    ('soma', '<u2'),
+    ('impares', 'u1'),
+    ('primos', 'u1'),
+    ('moldura', 'u1'),
+    ('consecutivas', 'u1'),
+    ('acertos', '<u2', (len(FAIXAS),)),
+])
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(valores):
+        return np.bitwise_count(valores)
+else:
+    _TABELA_BITS = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+    def _popcount(valores):
+        return _TABELA_BITS[valores & 0xFFFF] + _TABELA_BITS[valores >> 16]
+
+def todas_mascaras():
+    """As 3.268.760 máscaras com 15 bits ligados, em ordem crescente (sem passar por itertools)."""
+    baixos = np.arange(1 << 13, dtype=np.uint32)   # dezenas 1..13
+    altos = np.arange(1 << 12, dtype=np.uint32)    # dezenas 14..25
+    pc_baixos, pc_altos = _popcount(baixos), _popcount(altos)
+    partes = [(altos[pc_altos == 15 - k][:, None] << 13 | baixos[pc_baixos == k][None, :]).ravel() for k in range(3, 14)]
+    mascaras = np.concatenate(partes)
+    mascaras.sort()
+    return mascaras
+
+def _soma_dezenas(mascaras):
+    saida = np.zeros(len(mascaras), dtype=np.uint16)
+    for byte in range(4):
+        tabela = np.array([sum(8 * byte + b + 1 for b in range(8) if v >> b & 1) for v in range(256)], dtype=np.uint16)
+        saida += tabela[(mascaras >> (8 * byte)) & 0xFF]
+    return saida
+
+def _maior_sequencia(mascaras):
+    # Cada "m &= m >> 1" encurta todas as sequências de bits ligados em 1
+    saida = np.zeros(len(mascaras), dtype=np.uint8)
+    m = mascaras.copy()
+    while True:
+        vivos = m != 0
+        if not vivos.any(): return saida
+        saida += vivos
+        m &= m >> 1
+
+def _contar_acertos(acertos, mascaras, sorteio, sinal=1):
+    """Soma (ou subtrai) um sorteio nas colunas 11..15 de todos os jogos."""
+    pontos = _popcount(mascaras & np.uint32(sorteio))
+    linhas = np.flatnonzero(pontos >= FAIXAS[0])
+    if sinal > 0: acertos[linhas, pontos[linhas] - FAIXAS[0]] += 1
+    else: acertos[linhas, pontos[linhas] - FAIXAS[0]] -= 1
+
+def caminhos(pasta):
+    return os.path.join(pasta, 'espaco_total.npy'), os.path.join(pasta, 'espaco_total.json')
+
+def ler_meta(pasta):
+    try:
+        with open(caminhos(pasta)[1], encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _gravar_meta(pasta, concursos, versao=None):
+    destino = caminhos(pasta)[1]
+    meta = {'versao': versao or uuid.uuid4().hex, 'concursos': {str(c): int(m) for c, m in sorted(concursos.items())}}
+    with open(destino + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(destino + '.tmp', destino)
+    return meta
+
+class _Trava:
+    """Trava entre processos por arquivo exclusivo (funciona em qualquer SO). Travas esquecidas expiram."""
+
+    def __init__(self, pasta, expira=600):
+        self.caminho = os.path.join(pasta, 'espaco_total.lock')
+        self.expira = expira
+
+    def __enter__(self):
+        while True:
+            try:
+                os.close(os.open(self.caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)); return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.caminho) > self.expira: os.remove(self.caminho)
+                except FileNotFoundError: pass
+                time.sleep(0.05)
+
+    def __exit__(self, *erro):
+        try: os.remove(self.caminho)
+        except FileNotFoundError: pass
+
+def construir(pasta, pares, progresso=None):
+    """Monta o arquivo completo a partir dos pares (concurso, mascara) do histórico."""
+    npy, _ = caminhos(pasta)
+    mascaras = todas_mascaras()
+    acertos = np.zeros((len(mascaras), len(FAIXAS)), dtype=np.uint16)
+    concursos = dict(pares)
+    for i, sorteio in enumerate(concursos.values(), 1):
+        _contar_acertos(acertos, mascaras, sorteio)
+        if progresso and i % 500 == 0: progresso(i, len(concursos))
+
+    with _Trava(pasta):
+        tabela = np.lib.format.open_memmap(npy + '.tmp', mode='w+', dtype=DTYPE, shape=(len(mascaras),))
+        tabela['mascara'] = mascaras
+        tabela['soma'] = _soma_dezenas(mascaras)
+        tabela['impares'] = _popcount(mascaras & np.uint32(MASCARA_IMPARES))
+        tabela['primos'] = _popcount(mascaras & np.uint32(MASCARA_PRIMOS))
+        tabela['moldura'] = _popcount(mascaras & np.uint32(MASCARA_MOLDURA))
+        tabela['consecutivas'] = _maior_sequencia(mascaras)
+        tabela['acertos'] = acertos
+        tabela.flush(); del tabela
+        os.replace(npy + '.tmp', npy)
+        return _gravar_meta(pasta, concursos)
+
+def atualizar(pasta, pares):
+    """
+    Aplica só a diferença entre o histórico atual e o que já está contado no arquivo
+    (concursos novos somam, removidos ou alterados subtraem). Retorna a meta ou None se não há arquivo.
+    Grava numa cópia e troca o arquivo inteiro, como construir: quem já tem o antigo mapeado
+    continua lendo contagens coerentes com a versão dele até reabrir.
+    """
+    npy, _ = caminhos(pasta)
+    with _Trava(pasta):
+        meta = ler_meta(pasta)
+        if meta is None or not os.path.exists(npy): return None
+        contados = {int(c): m for c, m in meta['concursos'].items()}
+        atuais = dict(pares)
+        sair = [m for c, m in contados.items() if atuais.get(c) != m]
+        entrar = [m for c, m in atuais.items() if contados.get(c) != m]
+        if not sair and not entrar: return meta
+        shutil.copyfile(npy, npy + '.tmp')
+        tabela = np.load(npy + '.tmp', mmap_mode='r+')
+        mascaras = np.array(tabela['mascara'])
+        acertos = np.array(tabela['acertos'])
+        for m in sair: _contar_acertos(acertos, mascaras, m, -1)
+        for m in entrar: _contar_acertos(acertos, mascaras, m)
+        tabela['acertos'] = acertos
+        tabela.flush(); del tabela
+        os.replace(npy + '.tmp', npy)
+        return _gravar_meta(pasta, atuais)
+
+class EspacoTotal:
+    """Leitor do arquivo (somente leitura). Reabre sozinho quando outro processo grava uma versão nova."""
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.tabela = None
+        self.versao = None
+        self.qtd_concursos = 0
+        self._marca = None
+
+    def atual(self):
+        """A versão gravada agora (reabre se o arquivo de meta mudou) ou None se o espaço não foi construído."""
+        try: marca = os.stat(caminhos(self.pasta)[1]).st_mtime_ns
+        except FileNotFoundError: return None
+        if self.tabela is None or marca != self._marca:
+            meta = ler_meta(self.pasta)
+            if meta is None or not os.path.exists(caminhos(self.pasta)[0]): return None
+            self.abrir(meta); self._marca = marca
+        return self
+
+    def abrir(self, meta):
+        if self.tabela is None or self.versao != meta['versao']:
+            self.tabela = np.load(caminhos(self.pasta)[0], mmap_mode='r')
+            self.versao = meta['versao']
+            self.qtd_concursos = len(meta['concursos'])
+        return self
+
+    def linha(self, mascara):
+        """Linha de um jogo específico (ou None se a máscara não tem 15 dezenas)."""
+        pos = int(np.searchsorted(self.tabela['mascara'], mascara))
+        if pos >= len(self.tabela) or int(self.tabela['mascara'][pos]) != mascara: return None
+        return self.tabela[pos]
+
+    def filtrar(self, filtros, faixa=None, vezes_min=1, ultimo_mascara=None):
+        """
+        Posições das linhas que passam nos filtros (mesmo formato de estrategias.ler_filtros)
+        e, se `faixa` for dada, que fizeram essa pontuação pelo menos `vezes_min` vezes.
+        """
+        ok = np.ones(len(self.tabela), dtype=bool)
+        for nome, (lo, hi) in filtros.items():
+            if nome == 'repetidas':
+                valores = _popcount(self.tabela['mascara'] & np.uint32(ultimo_mascara))
+            else:
+                valores = self.tabela[nome]
+            ok &= (valores >= lo) & (valores <= hi)
+        if faixa is not None:
+            ok &= self.tabela['acertos'][:, FAIXAS.index(faixa)] >= vezes_min
+        return np.flatnonzero(ok)
+
+def como_dict(linha):
+    mascara = int(linha['mascara'])
+    return {
+        'dezenas': [n for n in range(1, 26) if mascara >> (n - 1) & 1],
+        'soma': int(linha['soma']), 'impares': int(linha['impares']), 'primos': int(linha['primos']),
+        'moldura': int(linha['moldura']), 'consecutivas': int(linha['consecutivas']),
+        'acertos': {str(f): int(q) for f, q in zip(FAIXAS, linha['acertos'])},
+    }
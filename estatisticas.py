@@ -0,0 +1,54 @@
+# Estatísticas acumuladas por concurso (somas de prefixo).
+# Cada linha guarda os totais desde o primeiro concurso até ela, então qualquer
+# janela "últimos N concursos" sai da diferença entre duas linhas, em O(25).
+
+PRIMOS = frozenset({2, 3, 5, 7, 11, 13, 17, 19, 23})
+# Moldura = borda do volante 5x5
+MOLDURA = frozenset({1, 2, 3, 4, 5, 6, 10, 11, 15, 16, 20, 21, 22, 23, 24, 25})
+
+def _mascara_de(conjunto):
+    return sum(1 << (n - 1) for n in conjunto)
+
+MASCARA_IMPARES = _mascara_de(range(1, 26, 2))
+MASCARA_PRIMOS = _mascara_de(PRIMOS)
+MASCARA_MOLDURA = _mascara_de(MOLDURA)
+
+def linha_vazia():
+    """Linha "posição 0": antes do primeiro concurso."""
+    return {'posicao': 0, 'frequencias': [0] * 25, 'ultima_aparicao': [0] * 25,
+            'soma_impares': 0, 'soma_primos': 0, 'soma_moldura': 0}
+
+def linha_seguinte(anterior, mascara):
+    """Calcula a linha de prefixo de um concurso a partir da linha do concurso anterior."""
+    posicao = anterior['posicao'] + 1
+    frequencias = list(anterior['frequencias'])
+    ultima_aparicao = list(anterior['ultima_aparicao'])
+    for i in range(25):
+        if mascara >> i & 1:
+            frequencias[i] += 1
+            ultima_aparicao[i] = posicao
+    return {
+        'posicao': posicao,
+        'frequencias': frequencias,
+        'ultima_aparicao': ultima_aparicao,
+        'soma_impares': anterior['soma_impares'] + (mascara & MASCARA_IMPARES).bit_count(),
+        'soma_primos': anterior['soma_primos'] + (mascara & MASCARA_PRIMOS).bit_count(),
+        'soma_moldura': anterior['soma_moldura'] + (mascara & MASCARA_MOLDURA).bit_count(),
+    }
+
+def janela(fim, inicio):
+    """
+    Estatísticas dos concursos entre duas linhas de prefixo (inicio exclusivo, fim inclusivo).
+
+    'atraso' é quantos concursos a dezena está sem sair, contando a partir do fim.
+    """
+    qtd = fim['posicao'] - inicio['posicao']
+    media = lambda campo: round((fim[campo] - inicio[campo]) / qtd, 2) if qtd else 0
+    return {
+        'concursos': qtd,
+        'frequencias': [f - i for f, i in zip(fim['frequencias'], inicio['frequencias'])],
+        'atraso': [fim['posicao'] - u for u in fim['ultima_aparicao']],
+        'media_impares': media('soma_impares'),
+        'media_primos': media('soma_primos'),
+        'media_moldura': media('soma_moldura'),
+    }
@@ -0,0 +1,287 @@
+import random
+from functools import lru_cache
+from math import comb
+
+import numpy as np
+
+from estatisticas import PRIMOS, MOLDURA
+
+# Motor das estratégias de geração, sem Flask/banco.
+# Todas recebem um "retrato" das estatísticas (ver montar_snapshot) + parâmetros
+# e devolvem uma lista de jogos no formato (tipo, tipo_limpo, dezenas ordenadas).
+# A formatação para a tela (numeros_str, zap...) fica com quem chama.
+
+TODAS = frozenset(range(1, 26))
+
+def montar_snapshot(concurso, ultimo_mascara, frequencias):
+    """
+    :param concurso: número do último concurso (chave do cache das estratégias determinísticas).
+    :param ultimo_mascara: máscara das dezenas do último concurso.
+    :param frequencias: frequência das dezenas 1..25 na janela usada pela Pura (últimos 10).
+    """
+    return {'concurso': concurso, 'ultimo': ultimo_mascara, 'frequencias': tuple(frequencias)}
+
+@lru_cache(maxsize=32)
+def _pura(concurso, frequencias, ultimo):
+    # 'concurso' entra só na chave: entre dois sorteios o resultado é sempre o mesmo
+    lista_analise = [{'num': n, 'freq': frequencias[n - 1], 'hot': ultimo >> (n - 1) & 1} for n in range(1, 26)]
+    ranking = sorted(lista_analise, key=lambda x: (x['freq'], x['hot'], x['num']), reverse=True)
+    fixas = tuple(sorted(x['num'] for x in ranking[:7]))
+    reservas = [x['num'] for x in ranking[7:]]
+    jogos = (
+        ('Pura - Lógica (Top Reservas) 🧠', 'Pura - Lógica', tuple(sorted(fixas + tuple(reservas[:8])))),
+        ('Pura - Equilíbrio (C/ Zebras) ⚖️', 'Pura - Equilíbrio', tuple(sorted(fixas + tuple(reservas[:5] + reservas[-3:])))),
+        ('Pura - Intermediária (Meio Tabela) 🎯', 'Pura - Intermediária', tuple(sorted(fixas + tuple(reservas[5:13])))),
+    )
+    return fixas, jogos
+
+def gerar_pura(snapshot):
+    """Pura: 7 fixas mais frequentes (desempate: saiu no último) + 3 formas de completar. Memoizada por concurso."""
+    return _pura(snapshot['concurso'], snapshot['frequencias'], snapshot['ultimo'])
+
+def _letra(i):
+    return chr(65 + i) if i < 26 else f"#{i+1}"
+
+def rotular(jogos, nome, emoji=''):
+    """Matriz/lista de dezenas -> jogos (tipo, tipo_limpo, dezenas) com letra sequencial."""
+    return [(f'{nome} {_letra(i)}{" " + emoji if emoji else ""}', f'{nome} {_letra(i)}', tuple(int(n) for n in jogo)) for i, jogo in enumerate(jogos)]
+
+def gerar_padrao(snapshot, fixos, qtd_jogos=4, rnd=random):
+    """Padrão: fixos escolhidos pelo usuário + aleatórios entre as demais dezenas."""
+    set_fixos = set(fixos)
+    if len(set_fixos) < 1 or len(set_fixos) > 14 or not set_fixos <= TODAS:
+        raise ValueError("Verifique os números marcados na aba Estratégia.")
+    disponiveis = sorted(TODAS - set_fixos)
+    restantes = 15 - len(set_fixos)
+    return rotular([sorted(set_fixos | set(rnd.sample(disponiveis, restantes))) for _ in range(qtd_jogos)], 'Estratégia Padrão')
+
+def gerar_metodo_25(snapshot, sorteadas, fixas_sorteadas, fixas_ausentes, rnd=random):
+    """Método 25: 3 fixas das sorteadas + 2 das ausentes; o resto vira 2 grupos de cada lado, cruzados em 4 jogos."""
+    sorteadas = set(sorteadas)
+    if len(sorteadas) != 15: raise ValueError("O último resultado precisa ter 15 números.")
+    if len(set(fixas_sorteadas)) != 3: raise ValueError("Você precisa escolher exatamente 3 Fixas das Sorteadas.")
+    if len(set(fixas_ausentes)) != 2: raise ValueError("Você precisa escolher exatamente 2 Fixas das Ausentes.")
+    ausentes = TODAS - sorteadas
+
+    resto_sorteadas = list(sorteadas - set(fixas_sorteadas)); rnd.shuffle(resto_sorteadas)
+    g_sort = (resto_sorteadas[:6], resto_sorteadas[6:])
+    resto_ausentes = list(ausentes - set(fixas_ausentes)); rnd.shuffle(resto_ausentes)
+    g_aus = (resto_ausentes[:4], resto_ausentes[4:])
+
+    base = set(fixas_sorteadas) | set(fixas_ausentes)
+    jogos = []
+    for n, (i, j) in enumerate(((0, 0), (0, 1), (1, 0), (1, 1)), 1):
+        numeros = tuple(sorted(base | set(g_sort[i]) | set(g_aus[j])))
+        jogos.append((f'M25 - Jogo {n} (G{i+1}+G{j+1}) 🎱', f'M25 - Jogo {n}', numeros))
+    return jogos
+
+def gerar_surpresinha(snapshot, qtd_jogos=1, rnd=random):
+    """Surpresinha: 15 dezenas totalmente aleatórias por jogo."""
+    return rotular([sorted(rnd.sample(range(1, 26), 15)) for _ in range(qtd_jogos)], 'Surpresinha', '🎲')
+
+# --- LOTES GRANDES (API) ---
+# Versões vetorizadas para milhares de jogos: NumPy Generator com semente (reprodutível)
+# e saída em blocos de matrizes (qtd, 15) uint8 com as dezenas ordenadas, sem formatação.
+# A semente + o tamanho fixo do bloco determinam a sequência inteira.
+
+TAMANHO_BLOCO = 65536
+
+def _sortear(rng, disponiveis, k, linhas):
+    """k dezenas distintas de `disponiveis` por linha: chaves aleatórias + argpartition (sem laço Python)."""
+    disponiveis = np.asarray(disponiveis, dtype=np.uint8)
+    if k == 0: return np.empty((linhas, 0), dtype=np.uint8)
+    chaves = rng.random((linhas, len(disponiveis)), dtype=np.float32)
+    if k < len(disponiveis): chaves = np.argpartition(chaves, k - 1, axis=1)[:, :k]
+    else: chaves = np.argsort(chaves, axis=1)
+    return disponiveis[chaves]
+
+def _com_fixos(fixos, sorteados):
+    base = np.broadcast_to(np.asarray(sorted(fixos), dtype=np.uint8), (len(sorteados), len(fixos)))
+    jogos = np.concatenate([base, sorteados], axis=1)
+    jogos.sort(axis=1)
+    return jogos
+
+def _em_blocos(qtd, gerar_bloco, tamanho=TAMANHO_BLOCO):
+    for inicio in range(0, qtd, tamanho):
+        yield gerar_bloco(min(tamanho, qtd - inicio))
+
+def lote_pura(snapshot, qtd=3, rng=None):
+    """A Pura é determinística: sempre os mesmos 3 jogos até o próximo sorteio."""
+    if not snapshot: raise ValueError("Preciso de pelo menos 10 resultados cadastrados para calcular a Estatística Pura.")
+    return iter([np.array([j[2] for j in gerar_pura(snapshot)[1]], dtype=np.uint8)])
+
+def validar_fixos(fixos, minimo=1):
+    """Mesma regra para o Padrão com e sem filtros: de `minimo` (1 no Padrão, 0 na Surpresinha) a 14 fixos entre 1 e 25."""
+    set_fixos = set(fixos)
+    if not minimo <= len(set_fixos) <= 14 or not set_fixos <= TODAS:
+        raise ValueError(f"Escolha de {minimo} a 14 números fixos entre 1 e 25." if minimo else "Escolha até 14 números fixos entre 1 e 25.")
+    return set_fixos
+
+def lote_padrao(snapshot, fixos, qtd=4, rng=None, afinidade=None):
+    set_fixos = validar_fixos(fixos)
+    disponiveis = sorted(TODAS - set_fixos)
+    return _em_blocos(qtd, *_torneio(lambda n: _com_fixos(set_fixos, _sortear(rng, disponiveis, 15 - len(set_fixos), n)), afinidade))
+
+def lote_surpresinha(snapshot, qtd=1, rng=None, afinidade=None):
+    return _em_blocos(qtd, *_torneio(lambda n: _com_fixos((), _sortear(rng, range(1, 26), 15, n)), afinidade))
+
+def lote_metodo_25(snapshot, sorteadas, fixas_sorteadas, fixas_ausentes, qtd=4, rng=None):
+    """Cada rodada embaralha os grupos e rende os 4 cruzamentos do Método 25; `qtd` corta a última rodada."""
+    sorteadas, fixas_sorteadas, fixas_ausentes = set(sorteadas), set(fixas_sorteadas), set(fixas_ausentes)
+    if len(sorteadas) != 15 or not sorteadas <= TODAS: raise ValueError("O último resultado precisa ter 15 números.")
+    if len(fixas_sorteadas) != 3 or not fixas_sorteadas <= sorteadas: raise ValueError("Você precisa escolher exatamente 3 Fixas das Sorteadas.")
+    ausentes = TODAS - sorteadas
+    if len(fixas_ausentes) != 2 or not fixas_ausentes <= ausentes: raise ValueError("Você precisa escolher exatamente 2 Fixas das Ausentes.")
+    resto_sorteadas = sorted(sorteadas - fixas_sorteadas)
+    resto_ausentes = sorted(ausentes - fixas_ausentes)
+    base = fixas_sorteadas | fixas_ausentes
+
+    def bloco(n):
+        rodadas = -(-n // 4)
+        s = _sortear(rng, resto_sorteadas, 12, rodadas)
+        a = _sortear(rng, resto_ausentes, 8, rodadas)
+        cruzados = [np.concatenate([s[:, 6 * i:6 * i + 6], a[:, 4 * j:4 * j + 4]], axis=1) for i, j in ((0, 0), (0, 1), (1, 0), (1, 1))]
+        # Intercala: rodada 1 jogos 1..4, rodada 2 jogos 1..4...
+        return _com_fixos(base, np.stack(cruzados, axis=1).reshape(rodadas * 4, 10)[:n])
+    return _em_blocos(qtd, bloco)
+
+# --- GERAÇÃO COM FILTROS ---
+# Rejeição vetorizada: sorteia blocos de candidatos, calcula as características de
+# todos de uma vez (tabelas de consulta por dezena) e fica só com os que passam.
+# O tamanho do próximo bloco acompanha a taxa de aceitação observada.
+
+_E_IMPAR = np.array([n % 2 for n in range(26)], dtype=np.uint8)
+_E_PRIMO = np.array([n in PRIMOS for n in range(26)], dtype=np.uint8)
+_E_MOLDURA = np.array([n in MOLDURA for n in range(26)], dtype=np.uint8)
+
+# (mínimo, máximo) possíveis para 15 dezenas de 1..25
+LIMITES_FILTROS = {
+    'soma': (120, 270),
+    'impares': (3, 13),
+    'primos': (0, 9),
+    'moldura': (6, 15),
+    'repetidas': (5, 15),
+    'consecutivas': (1, 15),
+}
+
+def ler_filtros(dados):
+    """Lê '<filtro>_min' / '<filtro>_max' (e 'max_consecutivas') de um dict/form. Só devolve os informados."""
+    filtros = {}
+    for nome, (minimo, maximo) in LIMITES_FILTROS.items():
+        chave_min, chave_max = (None, 'max_consecutivas') if nome == 'consecutivas' else (f'{nome}_min', f'{nome}_max')
+        lo = dados.get(chave_min) if chave_min else None
+        hi = dados.get(chave_max)
+        if lo in (None, '') and hi in (None, ''): continue
+        lo = minimo if lo in (None, '') else int(lo)
+        hi = maximo if hi in (None, '') else int(hi)
+        if lo > hi or hi < minimo or lo > maximo: raise ValueError(f"Faixa inválida para '{nome}': {lo}..{hi} (possível: {minimo}..{maximo}).")
+        filtros[nome] = (lo, hi)
+    return filtros
+
+def _maior_sequencia(jogos):
+    seguidos = np.diff(jogos.astype(np.int8), axis=1) == 1
+    atual = np.ones(len(jogos), dtype=np.uint8)
+    maior = atual.copy()
+    for coluna in seguidos.T:
+        atual = np.where(coluna, atual + 1, 1).astype(np.uint8)
+        np.maximum(maior, atual, out=maior)
+    return maior
+
+def caracteristicas(jogos, ultimo_mascara=None):
+    """Soma, ímpares, primos, moldura, repetidas do último e maior sequência de cada linha de uma matriz (n, 15)."""
+    saida = {
+        'soma': jogos.sum(axis=1, dtype=np.int16),
+        'impares': _E_IMPAR[jogos].sum(axis=1, dtype=np.int8),
+        'primos': _E_PRIMO[jogos].sum(axis=1, dtype=np.int8),
+        'moldura': _E_MOLDURA[jogos].sum(axis=1, dtype=np.int8),
+        'consecutivas': _maior_sequencia(jogos),
+    }
+    if ultimo_mascara is not None:
+        no_ultimo = np.array([n > 0 and ultimo_mascara >> (n - 1) & 1 for n in range(26)], dtype=np.uint8)
+        saida['repetidas'] = no_ultimo[jogos].sum(axis=1, dtype=np.int8)
+    return saida
+
+def atende_filtros(jogos, filtros, ultimo_mascara=None):
+    ok = np.ones(len(jogos), dtype=bool)
+    valores = caracteristicas(jogos, ultimo_mascara)
+    for nome, (lo, hi) in filtros.items():
+        ok &= (valores[nome] >= lo) & (valores[nome] <= hi)
+    return ok
+
+def gerar_filtrado(snapshot, fixos=(), qtd=1, filtros=None, rng=None, max_examinados=5_000_000, afinidade=None, minimo_fixos=0):
+    """
+    `qtd` jogos distintos com os `fixos` que passam em todos os `filtros` (e, com `afinidade`,
+    puxados para os pares fortes ou fracos antes de filtrar). O Padrão passa minimo_fixos=1.
+    Retorna {'jogos': matriz (n, 15), 'examinados': candidatos sorteados, 'completo': achou todos?}.
+    """
+    filtros = filtros or {}
+    set_fixos = validar_fixos(fixos, minimo_fixos)
+    if 'repetidas' in filtros and not snapshot: raise ValueError("O filtro de repetidas precisa de pelo menos um resultado cadastrado.")
+    rng = rng or np.random.default_rng()
+    disponiveis = sorted(TODAS - set_fixos)
+    ultimo = snapshot['ultimo'] if snapshot else None
+    pesos = np.int64(1) << np.arange(-1, 25, dtype=np.int64).clip(0)
+    sortear, tamanho = _torneio(lambda n: _com_fixos(set_fixos, _sortear(rng, disponiveis, 15 - len(set_fixos), n)), afinidade)
+    teto = 262144 * tamanho // TAMANHO_BLOCO  # com torneio cada candidato custa `forca` sorteios
+
+    alvo = min(qtd, comb(len(disponiveis), 15 - len(set_fixos)))  # não existem mais jogos distintos que isso
+    aceitos, vistos, examinados, bloco = [], set(), 0, 4096
+    while len(aceitos) < alvo and examinados < max_examinados:
+        n = min(bloco, max_examinados - examinados)
+        candidatos = sortear(n)
+        examinados += n
+        candidatos = candidatos[atende_filtros(candidatos, filtros, ultimo)]
+        for jogo, mascara in zip(candidatos, pesos[candidatos].sum(axis=1).tolist()):
+            if mascara in vistos: continue
+            vistos.add(mascara); aceitos.append(jogo)
+            if len(aceitos) == alvo: break
+        # Próximo bloco dimensionado pela taxa de aceitação até aqui
+        taxa = max(len(aceitos), 1) / examinados
+        bloco = int(min(teto, max(4096, (alvo - len(aceitos)) / taxa * 1.2)))
+
+    jogos = np.array(aceitos, dtype=np.uint8).reshape(-1, 15)
+    return {'jogos': jogos, 'examinados': examinados, 'completo': len(aceitos) == qtd}
+
+# --- AFINIDADE ENTRE DEZENAS (pares fortes, ver coocorrencia.py) ---
+# Torneio: para cada jogo sorteia `forca` candidatos e fica com o de maior (favorecer)
+# ou menor (evitar) soma de pesos dos seus 105 pares. Continua aleatório e reprodutível
+# pela semente; quanto maior a força, mais puxado.
+
+MODOS_AFINIDADE = ('favorecer', 'evitar')
+
+def ler_afinidade(dados):
+    """Lê 'pares' (favorecer/evitar), 'pares_janela' (0 = histórico todo) e 'pares_forca' (2..32). None se não pedido."""
+    modo = (dados.get('pares') or '').strip().lower()
+    if not modo: return None
+    if modo not in MODOS_AFINIDADE: raise ValueError(f"'pares' deve ser {' ou '.join(MODOS_AFINIDADE)}.")
+    janela = int(dados.get('pares_janela') or 0)
+    forca = int(dados.get('pares_forca') or 8)
+    if janela < 0: raise ValueError("'pares_janela' não pode ser negativa.")
+    if not 2 <= forca <= 32: raise ValueError("'pares_forca' deve estar entre 2 e 32.")
+    return {'modo': modo, 'janela': janela, 'forca': forca}
+
+def pontuar_afinidade(jogos, pesos):
+    """Soma dos pesos (matriz 25x25) dos pares de cada linha de uma matriz (n, 15) de dezenas."""
+    presentes = np.zeros((len(jogos), 26), dtype=np.float32)
+    presentes[np.arange(len(jogos))[:, None], jogos] = 1
+    presentes = presentes[:, 1:]
+    return ((presentes @ pesos) * presentes).sum(axis=1) / 2
+
+def _torneio(gerar_bloco, afinidade):
+    """(gerador de bloco, tamanho do bloco) com o viés de `afinidade` ({'modo', 'forca', 'pesos'}) aplicado."""
+    if not afinidade: return gerar_bloco, TAMANHO_BLOCO
+    pesos, forca = np.asarray(afinidade['pesos'], dtype=np.float32), afinidade['forca']
+    escolher = np.argmax if afinidade['modo'] == 'favorecer' else np.argmin
+
+    def bloco(n):
+        candidatos = gerar_bloco(n * forca)
+        escolha = escolher(pontuar_afinidade(candidatos, pesos).reshape(n, forca), axis=1)
+        return candidatos.reshape(n, forca, 15)[np.arange(n), escolha]
+    return bloco, max(TAMANHO_BLOCO // forca, 1)
+
+LOTES = {
+    'pura': lote_pura,
+    'padrao': lote_padrao,
+    'metodo25': lote_metodo_25,
+    'surpresinha': lote_surpresinha,
+}
@@ -0,0 +1,61 @@
+"""
+Exportação dos jogos salvos (csv, excel, pdf) sem carregar a carteira inteira na memória.
+
+Usado pela rota /exportar (carteiras pequenas, direto na resposta) e pela tarefa
+'exportar' da fila (carteiras grandes, em segundo plano). openpyxl e fpdf só são
+importados quando o formato é pedido.
+"""
+import csv
+
+from indice_sorteios import para_mascara, extrair_dezenas
+from modelos import db, JogoSalvo
+
+# O FPDF 1.x guarda o buffer de todas as páginas até o output(): o PDF é o único formato cuja
+# memória cresce com a carteira. Acima disso, só CSV ou Excel (~45 jogos por página, ~450 páginas).
+MAX_JOGOS_PDF = 20_000
+
+FORMATOS = {
+    'csv': ('historico.csv', 'text/csv'),
+    'excel': ('historico.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': ('historico.pdf', 'application/pdf'),
+}
+
+def linhas_exportacao(user_id, alvo=None, lote=1000):
+    """Jogos do usuário lidos do banco em lotes (cursor), já no formato das colunas exportadas."""
+    consulta = (db.select(JogoSalvo.data_criacao, JogoSalvo.tipo, JogoSalvo.numeros, JogoSalvo.mascara)
+                .where(JogoSalvo.user_id == user_id).order_by(JogoSalvo.id).execution_options(yield_per=lote))
+    for data, tipo, numeros, mascara in db.session.execute(consulta):
+        linha = [data.strftime("%d/%m/%Y") if data else '', tipo or '', numeros]
+        if alvo is not None:
+            linha.append(((mascara if mascara is not None else para_mascara(extrair_dezenas(numeros))) & alvo).bit_count())
+        yield linha
+
+def escrever_csv(arquivo, colunas, linhas):
+    """`arquivo` aberto em modo texto (newline='')."""
+    escritor = csv.writer(arquivo, delimiter=';')
+    escritor.writerow(colunas)
+    escritor.writerows(linhas)
+
+def escrever_excel(arquivo, colunas, linhas):
+    from openpyxl import Workbook
+    planilha = Workbook(write_only=True)  # modo write-only do openpyxl: memória constante
+    aba = planilha.create_sheet("Jogos")
+    aba.append(colunas)
+    for linha in linhas: aba.append(linha)
+    planilha.save(arquivo)
+
+def escrever_pdf(arquivo, colunas, linhas):
+    # Cada página é fechada (e comprimida) assim que enche, mas todas ficam na memória até o fim (ver MAX_JOGOS_PDF)
+    from fpdf import FPDF
+    pdf = FPDF(); pdf.set_auto_page_break(True, margin=12); pdf.add_page(); pdf.set_font("Arial", size=9)
+    larguras = [24, 54, 90, 22][:len(colunas)]
+    def cabecalho():
+        pdf.set_font("Arial", 'B', 9)
+        for largura, titulo in zip(larguras, colunas): pdf.cell(largura, 6, titulo.encode('latin1', 'replace').decode('latin1'), 1)
+        pdf.ln(); pdf.set_font("Arial", size=9)
+    cabecalho()
+    for linha in linhas:
+        if pdf.get_y() > pdf.h - 18: pdf.add_page(); cabecalho()
+        for largura, valor in zip(larguras, linha): pdf.cell(largura, 5, str(valor).encode('latin1', 'replace').decode('latin1')[:60], 1)
+        pdf.ln()
+    arquivo.write(pdf.output(dest='S').encode('latin1'))
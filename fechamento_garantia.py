@@ -0,0 +1,125 @@
+import random
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+# Maior quantidade de alvos (subconjuntos de 'condicao' números do pool) que o otimizador aceita.
+# C(25, 15) = 3.268.760 cabe; pools maiores com condição menor que 15 não.
+LIMITE_ALVOS = 3_300_000
+TAMANHO_JOGO = 15
+# Teto de trabalho_estimado: na requisição (medido: < 0,4 s) e na fila de tarefas (~15 min).
+# Acima disso o desenho só sai pela linha de comando (flask --app app desenhar-fechamento).
+LIMITE_TRABALHO_DIRETO = 3_500_000
+LIMITE_TRABALHO_FILA = 10_000_000_000
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(valores):
+        return np.bitwise_count(valores)
+else:
+    _TABELA_BITS = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+    def _popcount(valores):
+        return _TABELA_BITS[valores & 0xFFFF] + _TABELA_BITS[valores >> 16]
+
+def validar_garantia(tamanho_pool, garantia, condicao=TAMANHO_JOGO):
+    """Retorna uma mensagem de erro ou None se os parâmetros fazem sentido."""
+    if tamanho_pool < 16 or tamanho_pool > 25:
+        return "O pool precisa ter entre 16 e 25 números."
+    if condicao < 11 or condicao > TAMANHO_JOGO:
+        return "A condição precisa ser entre 11 e 15 dezenas sorteadas dentro do pool."
+    if garantia < 11 or garantia > condicao:
+        return "A garantia precisa ser entre 11 e a quantidade da condição."
+    if comb(tamanho_pool, condicao) > LIMITE_ALVOS:
+        return f"Combinação grande demais para otimizar ({comb(tamanho_pool, condicao)} cenários)."
+    return None
+
+def trabalho_estimado(tamanho_pool, garantia, condicao=TAMANHO_JOGO):
+    """
+    Custo aproximado do otimizador: cenários x jogos esperados, porque cada passo do guloso
+    percorre os cenários ainda descobertos. Os jogos esperados são o limite inferior
+    cenários / cenários cobertos por um jogo. Pool 23 (14 se 15) dá ~2e9 e levou 166 s.
+    """
+    alvos = comb(tamanho_pool, condicao)
+    por_jogo = sum(comb(TAMANHO_JOGO, k) * comb(tamanho_pool - TAMANHO_JOGO, condicao - k) for k in range(garantia, condicao + 1))
+    return alvos * -(-alvos // por_jogo)
+
+def _alvos(tamanho_pool, condicao):
+    """Todos os cenários possíveis de 'condicao' dezenas sorteadas dentro do pool, como máscaras."""
+    return np.fromiter(
+        (sum(1 << p for p in c) for c in combinations(range(tamanho_pool), condicao)),
+        dtype=np.uint32, count=comb(tamanho_pool, condicao)
+    )
+
+def _candidatos(alvo, tamanho_pool, rnd, quantidade):
+    """Jogos de 15 posições próximos de um alvo: o alvo completado + variações trocando 1 dezena."""
+    dentro = [p for p in range(tamanho_pool) if alvo >> p & 1]
+    fora = [p for p in range(tamanho_pool) if not alvo >> p & 1]
+    base = alvo
+    for p in rnd.sample(fora, TAMANHO_JOGO - len(dentro)):
+        base |= 1 << p
+    candidatos = [base]
+    marcados = [p for p in range(tamanho_pool) if base >> p & 1]
+    livres = [p for p in range(tamanho_pool) if not base >> p & 1]
+    for _ in range(quantidade - 1):
+        candidatos.append(base ^ (1 << rnd.choice(marcados)) ^ (1 << rnd.choice(livres)))
+    return np.array(candidatos, dtype=np.uint32)
+
+def otimizar_fechamento(tamanho_pool, garantia, condicao=TAMANHO_JOGO, amostra=40, semente=0, progresso=None):
+    """
+    Calcula um fechamento com garantia: "garantia" acertos sempre que
+    "condicao" das dezenas sorteadas estiverem no pool.
+
+    Guloso (a cada passo escolhe, entre jogos próximos de um cenário ainda
+    descoberto, o que cobre mais cenários) seguido de busca local que remove
+    jogos redundantes. Trabalha com posições 0..tamanho_pool-1, então o
+    resultado serve para qualquer pool do mesmo tamanho.
+
+    progresso(cobertos, total) é chamado a cada jogo escolhido (e pode interromper levantando uma exceção).
+    :return: lista de máscaras (bits = posições no pool) dos jogos.
+    """
+    erro = validar_garantia(tamanho_pool, garantia, condicao)
+    if erro: raise ValueError(erro)
+
+    rnd = random.Random(semente)
+    alvos = _alvos(tamanho_pool, condicao)
+    descobertos = np.arange(len(alvos))
+    jogos = []
+
+    while len(descobertos):
+        alvo = int(alvos[descobertos[rnd.randrange(len(descobertos))]])
+        candidatos = _candidatos(alvo, tamanho_pool, rnd, amostra)
+        restantes = alvos[descobertos]
+        melhor, melhor_cobre, melhor_ganho = None, None, -1
+        # Um candidato por vez para a memória ficar no tamanho de 'restantes'
+        for candidato in candidatos:
+            cobre = _popcount(restantes & candidato) >= garantia
+            ganho = int(cobre.sum())
+            if ganho > melhor_ganho:
+                melhor, melhor_cobre, melhor_ganho = int(candidato), cobre, ganho
+        jogos.append(melhor)
+        descobertos = descobertos[~melhor_cobre]
+        if progresso: progresso(len(alvos) - len(descobertos), len(alvos))
+
+    return _remover_redundantes(jogos, alvos, garantia, rnd)
+
+def _remover_redundantes(jogos, alvos, garantia, rnd):
+    """Busca local: tira jogos cujos cenários já estão todos cobertos pelos outros."""
+    # A cobertura de cada jogo é recalculada em vez de guardada (economiza memória com pools grandes)
+    contagem = np.zeros(len(alvos), dtype=np.int32)
+    for j in jogos:
+        contagem += _popcount(alvos & np.uint32(j)) >= garantia
+    ordem = list(range(len(jogos)))
+    rnd.shuffle(ordem)
+    manter = set(ordem)
+    for i in ordem:
+        cobre = _popcount(alvos & np.uint32(jogos[i])) >= garantia
+        if (contagem[cobre] > 1).all():
+            contagem[cobre] -= 1
+            manter.discard(i)
+    return [jogos[i] for i in sorted(manter)]
+
+def aplicar_desenho(pool, mascaras):
+    """Troca as posições do desenho pelas dezenas reais do pool."""
+    pool = sorted(set(pool))
+    return [[pool[p] for p in range(len(pool)) if m >> p & 1] for m in mascaras]
@@ -1,75 +1,105 @@
-import pandas as pd
-from app import app, db, ResultadoLotofacil
+import time
+import numpy as np
+from modelos import criar_app_dados, db, inserir_ignorando, ResultadoLotofacil, sincronizar_estatisticas, conferir_carteiras, atualizar_espaco_total, reabrir_conferencia, incrementar_versao
+
+# Só o banco: não precisa subir as rotas, a IA nem as exportações do app web
+app = criar_app_dados()
+
+COLUNAS_BOLAS = [f'Bola{i}' for i in range(1, 16)]
+COLUNAS_NECESSARIAS = ['Concurso', 'Data'] + COLUNAS_BOLAS
+
+def preparar_planilha(df):
+    """
+    Normaliza a planilha inteira de uma vez (sem iterrows):
+    descarta linhas incompletas/inválidas, ordena e formata as dezenas e padroniza a data.
+    Retorna (DataFrame com concurso/data_sorteio/dezenas/mascara/data, quantidade de linhas inválidas).
+    """
+    import pandas as pd  # o pandas só carrega quando há planilha para ler
+    total = len(df)
+    df = df.dropna(subset=COLUNAS_NECESSARIAS)
+    bolas = df[COLUNAS_BOLAS].apply(pd.to_numeric, errors='coerce')
+    concursos = pd.to_numeric(df['Concurso'], errors='coerce')
+    validas = bolas.notna().all(axis=1) & concursos.notna()
+    df, bolas, concursos = df[validas], bolas[validas].astype(int).to_numpy(), concursos[validas].astype(int)
+
+    # 15 dezenas distintas entre 1 e 25
+    bolas = np.sort(bolas, axis=1)
+    validas = ((bolas >= 1) & (bolas <= 25)).all(axis=1) & (np.diff(bolas, axis=1) > 0).all(axis=1)
+    df, bolas, concursos = df[validas], bolas[validas], concursos[validas]
+
+    dezenas = pd.DataFrame(bolas).apply(lambda col: col.map('{:02d}'.format)).agg(', '.join, axis=1)
+
+    # Data: aceita datetime do Excel, '2024-01-01 00:00:00' ou já no formato BR
+    texto = df['Data'].astype(str).str.strip()
+    iso = texto.str.match(r'^\d{4}-\d{2}-\d{2}')
+    datas = pd.to_datetime(texto.str[:10].where(iso), format='%Y-%m-%d', errors='coerce').fillna(
+        pd.to_datetime(texto.where(~iso), format='%d/%m/%Y', errors='coerce'))
+    data_sorteio = datas.dt.strftime('%d/%m/%Y').where(datas.notna(), texto)
+
+    saida = pd.DataFrame({
+        'concurso': concursos.to_numpy(),
+        'data_sorteio': data_sorteio.to_numpy(),
+        'dezenas': dezenas.to_numpy(),
+        'mascara': (np.int64(1) << (bolas - 1)).sum(axis=1),
+        'data': datas.dt.date.astype(object).where(datas.notna(), None).to_numpy(),
+    }).drop_duplicates(subset='concurso')
+    return saida, total - len(saida)
+
+def importar_do_excel(arquivo='resultados.xlsx', tamanho_lote=1000, progresso=None):
+    """Importa a planilha em lotes. Devolve quantos concursos entraram (None se falhou); progresso(i, total) a cada lote."""
+    print(f"📂 Lendo o arquivo '{arquivo}'...")
+    inicio = time.perf_counter()
 
-def importar_do_excel():
-    print("📂 Lendo o arquivo 'resultados.xlsx'...")
-    
     try:
-        # Lê o Excel
-        df = pd.read_excel('resultados.xlsx')
-        
+        import pandas as pd
+        # Lê só as colunas usadas
+        df = pd.read_excel(arquivo, usecols=lambda c: c in COLUNAS_NECESSARIAS)
+
         # Garante que as colunas existem
-        colunas_necessarias = ['Concurso', 'Data'] + [f'Bola{i}' for i in range(1, 16)]
-        for col in colunas_necessarias:
-            if col not in df.columns:
-                print(f"❌ Erro: Coluna '{col}' não encontrada no Excel.")
-                print("Certifique-se que o cabeçalho está: Concurso, Data, Bola1, Bola2... Bola15")
-                return
-
-        total_importado = 0
-        
+        faltando = [col for col in COLUNAS_NECESSARIAS if col not in df.columns]
+        if faltando:
+            print(f"❌ Erro: Coluna(s) {', '.join(faltando)} não encontrada(s) no Excel.")
+            print("Certifique-se que o cabeçalho está: Concurso, Data, Bola1, Bola2... Bola15")
+            return
+
+        linhas, invalidas = preparar_planilha(df)
+
         with app.app_context():
-            # Percorre cada linha do Excel
-            for index, row in df.iterrows():
-                try:
-                    num_concurso = int(row['Concurso'])
-                    
-                    # Verifica se já existe no banco
-                    if ResultadoLotofacil.query.filter_by(concurso=num_concurso).first():
-                        print(f"⏩ Concurso {num_concurso} já existe. Pulando.")
-                        continue
-                    
-                    # Pega as 15 dezenas
-                    dezenas_lista = []
-                    for i in range(1, 16):
-                        bola = int(row[f'Bola{i}'])
-                        dezenas_lista.append(bola)
-                    
-                    # Ordena e Formata (01, 02, 03...)
-                    dezenas_lista.sort()
-                    dezenas_str = ", ".join([f"{n:02d}" for n in dezenas_lista])
-                    
-                    # Formata a data (se vier como datetime do Excel)
-                    data_str = str(row['Data'])
-                    if " " in data_str: # Remove hora se tiver (2024-01-01 00:00:00 -> 2024-01-01)
-                        data_str = data_str.split(" ")[0]
-                        # Tenta converter para BR se estiver em formato americano
-                        try:
-                            partes = data_str.split("-")
-                            if len(partes) == 3: # ano-mes-dia
-                                data_str = f"{partes[2]}/{partes[1]}/{partes[0]}"
-                        except: pass
-
-                    # Salva
-                    novo = ResultadoLotofacil(
-                        concurso=num_concurso,
-                        data_sorteio=data_str,
-                        dezenas=dezenas_str
-                    )
-                    db.session.add(novo)
-                    total_importado += 1
-                    print(f"✅ Concurso {num_concurso} importado!")
-                    
-                except Exception as e:
-                    print(f"⚠️ Erro na linha {index}: {e}")
-
-            db.session.commit()
-            print(f"\n🎉 Sucesso! {total_importado} novos resultados importados.")
+            # Uma consulta só para saber o que já existe no banco
+            existentes = {c for (c,) in db.session.query(ResultadoLotofacil.concurso)}
+            novos = linhas[~linhas['concurso'].isin(existentes)]
+            registros = novos.to_dict('records')
+
+            # INSERT em lote (executemany); ON CONFLICT protege contra outro processo importando junto
+            comando = inserir_ignorando(ResultadoLotofacil.__table__, ['concurso'])
+            total_importado = 0
+            try:
+                for i in range(0, len(registros), tamanho_lote):
+                    lote = registros[i:i + tamanho_lote]
+                    total_importado += db.session.execute(comando, lote).rowcount
+                    db.session.commit()
+                    if progresso: progresso(i + len(lote), len(registros))
+            finally:
+                db.session.rollback()  # descarta um lote que tenha falhado no meio
+                # Atualiza as estatísticas acumuladas e a conferência das carteiras de uma vez só (também se interrompido)
+                if total_importado:
+                    reabrir_conferencia(int(novos['concurso'].min())); incrementar_versao(); db.session.commit()
+                    sincronizar_estatisticas(); conferir_carteiras(); atualizar_espaco_total()
+
+        duracao = time.perf_counter() - inicio
+        print("\n📊 Resumo da importação")
+        print(f"   Linhas lidas:      {len(df)}")
+        print(f"   Linhas inválidas:  {invalidas}")
+        print(f"   Já existentes:     {len(linhas) - len(novos)}")
+        print(f"   Importadas:        {total_importado}")
+        print(f"   Tempo:             {duracao:.2f}s ({len(df) / duracao if duracao else 0:.0f} linhas/s)")
+        print(f"\n🎉 Sucesso! {total_importado} novos resultados importados.")
+        return total_importado
 
     except FileNotFoundError:
-        print("❌ Arquivo 'resultados.xlsx' não encontrado na pasta.")
+        print(f"❌ Arquivo '{arquivo}' não encontrado na pasta.")
     except Exception as e:
         print(f"❌ Erro grave: {e}")
 
 if __name__ == "__main__":
-    importar_do_excel()
\ No newline at end of file
+    importar_do_excel()
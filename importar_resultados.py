@@ -1,72 +1,212 @@
-import requests
+import argparse
+import json
+import os
+import random
+import threading
 import time
-from app import app, db, ResultadoLotofacil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# URL da API Gratuita (Loterias API)
-URL_BASE = "https://loteriascaixa-api.herokuapp.com/api/lotofacil"
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.exc import SQLAlchemyError
+from modelos import criar_app_dados, db, inserir_ignorando, ResultadoLotofacil, sincronizar_estatisticas, conferir_carteiras, atualizar_espaco_total, reabrir_conferencia, incrementar_versao, data_do_sorteio
+from indice_sorteios import para_mascara
 
-def importar_jogos(quantidade=50):
-    print(f"🤖 Iniciando o robô... Buscando os últimos {quantidade} resultados.")
-    
-    with app.app_context():
-        # 1. Descobre qual é o último concurso disponível na API
+# URL da API Gratuita (Loterias API) - pode apontar para um servidor local nos testes
+URL_BASE = os.getenv('LOTERIAS_API_URL', "https://loteriascaixa-api.herokuapp.com/api/lotofacil")
+ARQUIVO_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.importacao_checkpoint.json')
+
+# Só o banco: não precisa subir as rotas, a IA nem as exportações do app web
+app = criar_app_dados()
+
+class LimiteTaxa:
+    """Token bucket: no máximo `taxa` requisições por segundo (com rajada de até `capacidade`)."""
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or max(1, taxa))
+        self.tokens = self.capacidade
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.taxa
+            time.sleep(espera)
+
+def criar_sessao(conexoes):
+    """Sessão HTTP com pool de conexões reaproveitadas entre as threads."""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    return sessao
+
+def baixar_concurso(sessao, limite, concurso, url_base=URL_BASE, tentativas=4):
+    """Baixa um concurso com retry e backoff exponencial. Retorna o registro pronto para o banco."""
+    for tentativa in range(tentativas):
+        limite.aguardar()
         try:
-            resp = requests.get(URL_BASE, timeout=10)
-            if resp.status_code != 200:
-                print("❌ Erro ao conectar na API. Tente mais tarde.")
+            r = sessao.get(f"{url_base}/{concurso}", timeout=10)
+            if r.status_code == 200:
+                dados = r.json()
+                # Formata as dezenas (Vêm como lista, transformamos em string "01, 02...")
+                lista_dezenas = sorted(int(d) for d in dados['dezenas'])
+                return {
+                    'concurso': int(dados['concurso']),
+                    'data_sorteio': dados['data'],
+                    'dezenas': ", ".join([f"{n:02d}" for n in lista_dezenas]),
+                    'mascara': para_mascara(lista_dezenas),
+                    'data': data_do_sorteio(dados['data']),
+                }
+            if r.status_code == 404:
                 return
-            
-            dados_recente = resp.json()
-            ultimo_concurso = int(dados_recente['concurso'])
-            print(f"🔥 Último concurso oficial: {ultimo_concurso}")
-            
-        except Exception as e:
-            print(f"❌ Erro de conexão: {e}")
-            return
-
-        # 2. Faz um loop do último para trás (para pegar os anteriores)
-        contador = 0
-        for i in range(ultimo_concurso, ultimo_concurso - quantidade, -1):
-            
-            # Verifica se já temos esse concurso no banco (para não duplicar)
-            existe = ResultadoLotofacil.query.filter_by(concurso=i).first()
-            if existe:
-                print(f"✅ Concurso {i} já existe no banco. Pulando...")
-                continue
-
-            # Se não existe, busca na API
-            print(f"🔄 Baixando concurso {i}...")
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+        # Backoff: 0.5s, 1s, 2s... com um pouco de aleatoriedade
+        time.sleep(0.5 * (2 ** tentativa) + random.uniform(0, 0.25))
+    raise RuntimeError(f"Falha ao baixar concurso {concurso} após {tentativas} tentativas")
+
+def concursos_faltando(primeiro, ultimo):
+    """Detector de lacunas: números entre primeiro e ultimo que ainda não estão no banco."""
+    existentes = {c for (c,) in db.session.query(ResultadoLotofacil.concurso).filter(ResultadoLotofacil.concurso.between(primeiro, ultimo))}
+    return [c for c in range(ultimo, primeiro - 1, -1) if c not in existentes]
+
+def ler_checkpoint():
+    try:
+        with open(ARQUIVO_CHECKPOINT, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+
+def gravar_checkpoint(dados):
+    temporario = ARQUIVO_CHECKPOINT + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+    os.replace(temporario, ARQUIVO_CHECKPOINT)
+
+def guardar_sem_mascarar(passo, erro):
+    """Roda `passo` enquanto `erro` está subindo: se o banco falhar aqui, avisa e deixa o erro original subir."""
+    try: passo()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"❌ Não gravei depois de {type(erro).__name__}: {e}")
+
+def gravar_lote(registros):
+    if not registros: return 0
+    comando = inserir_ignorando(ResultadoLotofacil.__table__, ['concurso'])
+    gravados = db.session.execute(comando, registros).rowcount
+    db.session.commit()
+    return gravados
+
+def importar_jogos(quantidade=50, workers=8, taxa=5.0, tamanho_lote=100, url_base=URL_BASE, progresso=None):
+    """
+    Busca os últimos `quantidade` concursos (0 = histórico completo) em paralelo.
+
+    Só pede à API os concursos que faltam no banco, grava em lotes e guarda um
+    checkpoint: se a execução for interrompida, a próxima continua de onde parou.
+    Devolve quantos concursos entraram (None sem conexão com a API); progresso(i, total)
+    é chamado a cada concurso baixado e pode interromper levantando uma exceção.
+    """
+    print(f"🤖 Iniciando o robô... ({workers} conexões, até {taxa:g} req/s)")
+    inicio = time.perf_counter()
+    sessao = criar_sessao(workers)
+    limite = LimiteTaxa(taxa)
+
+    with app.app_context():
+        checkpoint = ler_checkpoint()
+        if checkpoint and checkpoint.get('url') == url_base and checkpoint.get('quantidade') == quantidade:
+            # Retoma a execução anterior sem consultar o último concurso de novo
+            ultimo_concurso = checkpoint['ultimo']
+            print(f"♻️ Retomando importação interrompida (último oficial: {ultimo_concurso})")
+        else:
+            # 1. Descobre qual é o último concurso disponível na API
             try:
-                # Chama a API específica do concurso
-                r = requests.get(f"{URL_BASE}/{i}", timeout=5)
-                if r.status_code == 200:
-                    dados = r.json()
-                    
-                    # Formata as dezenas (Vêm como lista, transformamos em string "01, 02...")
-                    lista_dezenas = [int(d) for d in dados['dezenas']]
-                    dezenas_str = ", ".join([f"{n:02d}" for n in sorted(lista_dezenas)])
-                    
-                    # Salva no Banco
-                    novo_res = ResultadoLotofacil(
-                        concurso=dados['concurso'],
-                        data_sorteio=dados['data'],
-                        dezenas=dezenas_str
-                    )
-                    db.session.add(novo_res)
-                    db.session.commit()
-                    contador += 1
-                    
-                    # Pausa de 1 segundo para não bloquear a API (importante!)
-                    time.sleep(1)
-                else:
-                    print(f"⚠️ Erro ao baixar concurso {i}")
-            
+                limite.aguardar()
+                resp = sessao.get(url_base, timeout=10)
+                if resp.status_code != 200:
+                    print("❌ Erro ao conectar na API. Tente mais tarde.")
+                    return
+                ultimo_concurso = int(resp.json()['concurso'])
+                print(f"🔥 Último concurso oficial: {ultimo_concurso}")
             except Exception as e:
-                print(f"❌ Erro no concurso {i}: {e}")
+                print(f"❌ Erro de conexão: {e}")
+                return
+            gravar_checkpoint({'url': url_base, 'quantidade': quantidade, 'ultimo': ultimo_concurso})
+
+        # 2. Só o que falta no banco
+        primeiro = 1 if quantidade <= 0 else max(1, ultimo_concurso - quantidade + 1)
+        faltando = concursos_faltando(primeiro, ultimo_concurso)
+        print(f"🔎 {ultimo_concurso - primeiro + 1 - len(faltando)} já no banco, {len(faltando)} para baixar.")
+
+        contador, falhas, pendentes = 0, [], []
+        def gravar_pendentes():
+            # Tira da lista antes de gravar: um lote que falhou não volta a ser tentado
+            nonlocal contador, pendentes
+            lote, pendentes = pendentes, []
+            contador += gravar_lote(lote)
+
+        erro = None
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futuros = {executor.submit(baixar_concurso, sessao, limite, c, url_base): c for c in faltando}
+                try:
+                    for i, futuro in enumerate(as_completed(futuros), 1):
+                        try:
+                            registro = futuro.result()
+                            if registro: pendentes.append(registro)
+                            else: print(f"⚠️ Concurso {futuros[futuro]} não encontrado na API")
+                        except Exception as e:
+                            falhas.append(futuros[futuro])
+                            print(f"❌ {e}")
+                        # 3. Commit em lotes (a thread principal é a única que mexe no banco)
+                        if len(pendentes) >= tamanho_lote:
+                            gravar_pendentes()
+                            print(f"💾 {contador} gravados até agora...")
+                        if progresso: progresso(i, len(faltando))
+                except BaseException:
+                    # Interrompido (cancelamento, Ctrl+C): não pede o resto; o checkpoint permite retomar depois
+                    for futuro in futuros: futuro.cancel()
+                    raise
+            gravar_pendentes()
+        except BaseException as e:
+            erro = e
+            db.session.rollback()  # descarta um lote que tenha falhado no meio
+            # Interrompido sem erro do banco: o que já foi baixado entra. Erro do banco: nada é regravado.
+            if not isinstance(e, SQLAlchemyError): guardar_sem_mascarar(gravar_pendentes, e)
+            raise
+        finally:
+            # 4. Atualiza as estatísticas acumuladas e a conferência das carteiras de uma vez só (também se interrompido)
+            def finalizar():
+                reabrir_conferencia(min(faltando)); incrementar_versao(); db.session.commit()
+                sincronizar_estatisticas(); conferir_carteiras(); atualizar_espaco_total()
+            if contador:
+                if erro is None: finalizar()
+                else: guardar_sem_mascarar(finalizar, erro)
+
+        if not falhas:
+            try: os.remove(ARQUIVO_CHECKPOINT)
+            except FileNotFoundError: pass
 
-        print(f"\n🎉 Pronto! {contador} novos resultados importados com sucesso.")
+        duracao = time.perf_counter() - inicio
+        print(f"\n🎉 Pronto! {contador} novos resultados importados em {duracao:.1f}s.")
+        if falhas:
+            print(f"⚠️ {len(falhas)} concursos falharam; rode de novo para retomar: {sorted(falhas)[:20]}")
+        return contador
 
 # Executa a função
 if __name__ == "__main__":
-    # Você pode mudar o número 50 para 100, 200, etc.
-    importar_jogos(quantidade=50)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Importa resultados da Lotofácil pela API.")
+    parser.add_argument('quantidade', nargs='?', type=int, default=50, help="últimos N concursos (0 = histórico completo)")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('IMPORTACAO_WORKERS', 8)))
+    parser.add_argument('--taxa', type=float, default=float(os.getenv('IMPORTACAO_TAXA', 5)), help="requisições por segundo")
+    parser.add_argument('--url', default=URL_BASE)
+    args = parser.parse_args()
+    importar_jogos(quantidade=args.quantidade, workers=args.workers, taxa=args.taxa, url_base=args.url)
@@ -0,0 +1,122 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+# Cada concurso vira um inteiro de 25 bits: o bit (n - 1) ligado indica que a dezena n saiu.
+TODAS_DEZENAS = (1 << 25) - 1
+
+def extrair_dezenas(texto):
+    """Lê as dezenas de um texto tipo '01, 02, 03...'."""
+    return [int(n) for n in re.findall(r'\d+', texto or '')]
+
+def para_mascara(numeros):
+    """Converte uma lista de dezenas (1 a 25) em máscara de bits."""
+    mascara = 0
+    for n in numeros:
+        if 1 <= n <= 25:
+            mascara |= 1 << (n - 1)
+    return mascara
+
+def de_mascara(mascara):
+    """Converte a máscara de volta para a lista ordenada de dezenas."""
+    return [n for n in range(1, 26) if mascara >> (n - 1) & 1]
+
+def contar_acertos(jogo, sorteio):
+    """Acertos entre duas máscaras (popcount do AND)."""
+    return (jogo & sorteio).bit_count()
+
+
+class IndiceSorteios:
+    """
+    Índice em memória de todos os concursos, ordenado por número do concurso.
+
+    Fica em dois arrays paralelos (concursos e máscaras) para ocupar pouco espaço
+    e evitar reler/parsear a tabela ResultadoLotofacil a cada requisição.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.concursos = array('i')
+        self.mascaras = array('I')
+        self.versao = None
+        self.carregado = False
+
+    def __len__(self):
+        return len(self.concursos)
+
+    def carregar(self, linhas, versao=None):
+        """Recarrega tudo a partir de pares (concurso, máscara); `versao` é a versão dos dados lidos (VersaoDados)."""
+        pares = sorted((int(c), int(m)) for c, m in linhas)
+        with self._lock:
+            self.concursos = array('i', [c for c, _ in pares])
+            self.mascaras = array('I', [m for _, m in pares])
+            self.versao = versao
+            self.carregado = True
+
+    def adicionar(self, concurso, mascara):
+        """Insere (ou substitui) um concurso mantendo a ordenação."""
+        concurso = int(concurso)
+        with self._lock:
+            pos = bisect_left(self.concursos, concurso)
+            if pos < len(self.concursos) and self.concursos[pos] == concurso:
+                self.mascaras[pos] = mascara
+            else:
+                self.concursos.insert(pos, concurso)
+                self.mascaras.insert(pos, mascara)
+
+    def remover(self, concurso):
+        concurso = int(concurso)
+        with self._lock:
+            pos = bisect_left(self.concursos, concurso)
+            if pos < len(self.concursos) and self.concursos[pos] == concurso:
+                del self.concursos[pos]
+                del self.mascaras[pos]
+
+    def assinatura(self):
+        """(quantidade, último concurso, versão) - usado para detectar escrita de outro processo."""
+        with self._lock:
+            return (len(self.concursos), self.concursos[-1] if self.concursos else None, self.versao)
+
+    def ultimos(self, limite=0):
+        """Máscaras dos últimos `limite` concursos, do mais novo para o mais antigo (0 = todos)."""
+        with self._lock:
+            fatia = self.mascaras if limite <= 0 else self.mascaras[-limite:]
+            return fatia[::-1]
+
+    def janela(self, limite=0):
+        """Máscaras dos últimos `limite` concursos em ordem cronológica (0 = todos)."""
+        with self._lock:
+            return self.mascaras[-limite:] if limite > 0 else self.mascaras[:]
+
+    def ultimo(self):
+        """(concurso, máscara) mais recente ou None."""
+        with self._lock:
+            if not self.concursos: return None
+            return self.concursos[-1], self.mascaras[-1]
+
+    def frequencias(self, limite=0):
+        """Lista com a frequência de cada dezena (índice 0 = dezena 1) nos últimos concursos."""
+        contagem = [0] * 25
+        for m in self.ultimos(limite):
+            while m:
+                bit = m & -m
+                contagem[bit.bit_length() - 1] += 1
+                m ^= bit
+        return contagem
+
+    def contendo(self, alvo):
+        """Concursos (em ordem crescente) cujo sorteio tem todas as dezenas da máscara `alvo`."""
+        with self._lock:
+            return [c for c, m in zip(self.concursos, self.mascaras) if m & alvo == alvo]
+
+    def distribuicao_acertos(self, jogo, limite=0):
+        """Quantas vezes o jogo (máscara) fez 0..15 pontos nos últimos concursos."""
+        faixas = [0] * 16
+        for m in self.ultimos(limite):
+            faixas[(jogo & m).bit_count()] += 1
+        return faixas
+
+
+# Instância única do processo
+indice = IndiceSorteios()
@@ -1,5 +1,6 @@
 import random
-from itertools import combinations
+from itertools import islice
+from math import comb
 
 # Regras da Lotofácil
 TOTAL_NUMEROS = 25
@@ -17,75 +18,116 @@ def validar_volante(numeros):
             
     return True, "Números válidos."
 
-def gerar_fechamento(total_numeros_jogados, numeros_fixos, completar_aleatorio=False):
+# --- SISTEMA NUMÉRICO COMBINATÓRIO ---
+# As combinações de 15 dentro de um pool seguem a mesma ordem de itertools.combinations,
+# mas qualquer posição pode ser calculada direto pelo índice (sem gerar as anteriores).
+
+def total_combinacoes(tamanho_pool, k=MIN_APOSTA):
+    """Quantidade exata de jogos de k números dentro de um pool."""
+    return comb(tamanho_pool, k)
+
+def unrank_combinacao(indice, n, k=MIN_APOSTA):
+    """Devolve as posições (0..n-1) da combinação de número `indice` em ordem lexicográfica."""
+    if indice < 0 or indice >= comb(n, k):
+        raise IndexError("Índice fora do total de combinações.")
+    posicoes = []
+    atual = 0
+    for restantes in range(k, 0, -1):
+        # Pula blocos inteiros de combinações que começam com 'atual'
+        while True:
+            bloco = comb(n - atual - 1, restantes - 1)
+            if indice < bloco: break
+            indice -= bloco
+            atual += 1
+        posicoes.append(atual)
+        atual += 1
+    return posicoes
+
+def rank_combinacao(posicoes, n):
+    """Inverso de unrank_combinacao: posição lexicográfica de uma combinação."""
+    k = len(posicoes)
+    indice = 0
+    anterior = -1
+    for i, p in enumerate(posicoes):
+        for pulado in range(anterior + 1, p):
+            indice += comb(n - pulado - 1, k - i - 1)
+        anterior = p
+    return indice
+
+def iterar_fechamento(pool, inicio=0, fim=None, k=MIN_APOSTA):
+    """
+    Gerador dos jogos do fechamento, do índice `inicio` até `fim` (exclusivo).
+
+    Nada é guardado em memória: começa direto no índice pedido e avança
+    para a próxima combinação a cada jogo.
+    """
+    pool = sorted(set(pool))
+    n = len(pool)
+    total = comb(n, k)
+    fim = total if fim is None else min(fim, total)
+    if inicio >= fim:
+        return
+    posicoes = unrank_combinacao(inicio, n, k)
+    for _ in range(fim - inicio):
+        yield [pool[p] for p in posicoes]
+        # Próxima combinação: acha a posição mais à direita que ainda pode andar
+        i = k - 1
+        while i >= 0 and posicoes[i] == n - k + i:
+            i -= 1
+        if i < 0: break
+        posicoes[i] += 1
+        for j in range(i + 1, k):
+            posicoes[j] = posicoes[j - 1] + 1
+
+def pagina_fechamento(pool, pagina=1, por_pagina=100):
+    """Lista com os jogos de uma página do fechamento (página começa em 1)."""
+    inicio = (max(pagina, 1) - 1) * por_pagina
+    return list(iterar_fechamento(pool, inicio, inicio + por_pagina))
+
+def gerar_fechamento(total_numeros_jogados, numeros_fixos, completar_aleatorio=False, numeros_variaveis=None):
     """
     Gera jogos baseados em fechamento simples (combinatória).
-    
-    :param total_numeros_jogados: Quantos números queremos cercar (ex: 17, 18).
+
+    Os jogos vêm num gerador (não ficam em memória) e o total exato já é informado,
+    então dá para paginar ou mandar direto para uma resposta/exportação.
+
+    :param total_numeros_jogados: Quantos números queremos cercar (ex: 17, 18... até 25).
     :param numeros_fixos: Lista de números que devem aparecer em todos os jogos.
     :param completar_aleatorio: Se True, o sistema escolhe o restante dos números.
+    :param numeros_variaveis: Restante do pool escolhido pelo usuário (quando não é aleatório).
     """
     
     # Validações básicas
     if len(numeros_fixos) > 15:
         return {"erro": "Você não pode fixar mais de 15 números."}
     
-    if total_numeros_jogados < 15 or total_numeros_jogados > 20:
-        return {"erro": "A aposta deve ter entre 15 e 20 números."}
+    if total_numeros_jogados < 15 or total_numeros_jogados > TOTAL_NUMEROS:
+        return {"erro": f"O fechamento deve ter entre 15 e {TOTAL_NUMEROS} números."}
 
-    # Se o usuário quiser gerar aleatório (sem escolher números)
-    numeros_para_escolher = []
+    numeros_para_escolher = list(numeros_variaveis or [])
     
     if completar_aleatorio:
         # Pega números que NÃO são fixos para preencher
         disponiveis = [n for n in range(1, 26) if n not in numeros_fixos]
         # Quantos faltam para chegar no total desejado
         qtd_faltante = total_numeros_jogados - len(numeros_fixos)
-        numeros_aleatorios = random.sample(disponiveis, qtd_faltante)
-        numeros_para_escolher = numeros_aleatorios
-    else:
-        # Aqui assumimos que o usuário passaria o restante, 
-        # mas para este exemplo, vamos focar na lógica de gerar os jogos finais
-        pass
-
-    # LÓGICA DO FECHAMENTO MATEMÁTICO
-    # Exemplo: O usuário quer jogar com 17 números no total.
-    # Ele fixou 13 números. Faltam 2 vagas em cada jogo de 15.
-    # Mas ele escolheu mais 4 números variáveis para rodar nessas 2 vagas.
-    
-    # Para simplificar este primeiro passo, faremos um gerador de combinações puras
-    # Se o usuário escolheu um 'pool' de 18 números, vamos gerar todas as combinações
-    # possíveis de 15 números dentro desse pool.
-    
-    # NOTA: Em um app real, o usuário fornece o 'pool' completo (fixos + variáveis).
-    # Abaixo, simulo um pool para teste se não for fornecido.
-    
-    pool = numeros_fixos + numeros_para_escolher
-    pool = sorted(list(set(pool))) # Remove duplicatas e ordena
-    
-    jogos_gerados = []
-    
-    # Fórmula de Combinação: C(n, k) -> Combinar 'pool' em grupos de 15
-    # Cuidado: Se o pool for muito grande (ex: 25), gera milhões de jogos.
-    # Limitamos ao tamanho do 'pool' escolhido pelo usuário.
+        numeros_para_escolher = random.sample(disponiveis, qtd_faltante)
+
+    pool = sorted(set(numeros_fixos + numeros_para_escolher)) # Remove duplicatas e ordena
+
+    valido, mensagem = validar_volante(pool)
+    if not valido:
+        return {"erro": mensagem}
     
     if len(pool) < 15:
         return {"erro": f"Faltam números. Você tem apenas {len(pool)} selecionados."}
     
-    # Gera todas as combinações de 15 números possíveis dentro do pool escolhido
-    comb = combinations(pool, 15)
-    
-    for c in comb:
-        jogos_gerados.append(list(c))
-        
-        # Limite de segurança para não travar o servidor em testes
-        if len(jogos_gerados) > 1000:
-            break
-            
+    # Fórmula de Combinação: C(n, 15). Com 25 números são 3.268.760 jogos,
+    # por isso só o total é calculado aqui; os jogos saem sob demanda.
     return {
-        "total_jogos": len(jogos_gerados),
+        "total_jogos": total_combinacoes(len(pool)),
         "numeros_base": pool,
-        "jogos": jogos_gerados
+        "jogos": iterar_fechamento(pool)
     }
 
 # --- TESTE RÁPIDO NO CONSOLE ---
@@ -101,5 +143,5 @@ if __name__ == "__main__":
         print(f"Números Base ({len(resultado['numeros_base'])}): {resultado['numeros_base']}")
         print(f"Total de jogos gerados de 15 números: {resultado['total_jogos']}")
         print("Exemplo dos 5 primeiros jogos:")
-        for jogo in resultado['jogos'][:5]:
+        for jogo in islice(resultado['jogos'], 5):
             print(jogo)
\ No newline at end of file
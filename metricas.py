@@ -0,0 +1,119 @@
+"""
+Métricas no formato texto do Prometheus e perfilador opcional para requisições lentas.
+
+Tudo fica em memória, por processo: com vários workers, cada um responde pelo que
+atendeu (o Prometheus soma as séries de cada alvo).
+"""
+import cProfile
+import glob
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_QUANTIDADE = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+def _rotulos(rotulos):
+    if not rotulos: return ''
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in rotulos) + '}'
+
+class Registro:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tipos = {}  # nome -> (tipo, ajuda, buckets)
+        self._contadores = defaultdict(float)  # (nome, rótulos) -> valor
+        self._histogramas = {}  # (nome, rótulos) -> [contagens por bucket..., soma, total]
+        self._coletores = []  # funções chamadas na hora da leitura (gauges de outros módulos)
+
+    def contador(self, nome, ajuda):
+        self._tipos[nome] = ('counter', ajuda, None)
+
+    def histograma(self, nome, ajuda, buckets=BUCKETS_SEGUNDOS):
+        self._tipos[nome] = ('histogram', ajuda, buckets)
+
+    def coletor(self, funcao):
+        """`funcao()` devolve [(nome, tipo, ajuda, [(rótulos dict, valor), ...]), ...]."""
+        self._coletores.append(funcao)
+        return funcao
+
+    def inc(self, nome, valor=1, **rotulos):
+        with self._lock:
+            self._contadores[(nome, tuple(sorted(rotulos.items())))] += valor
+
+    def observar(self, nome, valor, **rotulos):
+        buckets = self._tipos[nome][2]
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            serie = self._histogramas.get(chave)
+            if serie is None: serie = self._histogramas[chave] = [0] * (len(buckets) + 2)
+            for i, limite in enumerate(buckets):
+                if valor <= limite: serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def texto(self):
+        linhas = []
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {k: list(v) for k, v in self._histogramas.items()}
+        for nome, (tipo, ajuda, buckets) in sorted(self._tipos.items()):
+            linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+            if tipo == 'counter':
+                linhas += [f'{nome}{_rotulos(r)} {v:g}' for (n, r), v in sorted(contadores.items()) if n == nome]
+                continue
+            for (n, r), serie in sorted(histogramas.items()):
+                if n != nome: continue
+                for limite, qtd in zip(buckets, serie):
+                    linhas.append(f'{nome}_bucket{_rotulos(r + (("le", f"{limite:g}"),))} {qtd}')
+                linhas.append(f'{nome}_bucket{_rotulos(r + (("le", "+Inf"),))} {serie[-1]}')
+                linhas.append(f'{nome}_sum{_rotulos(r)} {serie[-2]:.6f}')
+                linhas.append(f'{nome}_count{_rotulos(r)} {serie[-1]}')
+        for funcao in self._coletores:
+            for nome, tipo, ajuda, amostras in funcao():
+                linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+                linhas += [f'{nome}{_rotulos(tuple(sorted(r.items())))} {v:g}' for r, v in amostras]
+        return '\n'.join(linhas) + '\n'
+
+class Perfilador:
+    """
+    Perfila uma fração das requisições (amostra) com cProfile e grava o .prof das que
+    passarem de `limite_ms`. Fica desligado até ligar por env (PERFIL_AMOSTRA) ou pelo admin.
+    """
+
+    def __init__(self, pasta, amostra=0.0, limite_ms=500, maximo_arquivos=50):
+        self.pasta = pasta
+        self.amostra = amostra
+        self.limite_ms = limite_ms
+        self.maximo_arquivos = maximo_arquivos
+
+    @property
+    def ativo(self):
+        return self.amostra > 0
+
+    def iniciar(self):
+        """Um cProfile.Profile já ligado, ou None se esta requisição não foi sorteada."""
+        if not self.ativo or random.random() >= self.amostra: return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except (ValueError, RuntimeError):
+            return None  # outro perfilador já ativo nesta thread
+        return perfil
+
+    def finalizar(self, perfil, rota, duracao_ms):
+        """Desliga e, se foi lenta, grava perfis/<hora>_<rota>_<ms>.prof (mantendo só os mais recentes)."""
+        perfil.disable()
+        if duracao_ms < self.limite_ms: return None
+        os.makedirs(self.pasta, exist_ok=True)
+        nome = "".join(c if c.isalnum() else '_' for c in rota).strip('_') or 'raiz'
+        caminho = os.path.join(self.pasta, f"{time.strftime('%Y%m%d-%H%M%S')}_{nome}_{int(duracao_ms)}ms.prof")
+        perfil.dump_stats(caminho)
+        antigos = sorted(glob.glob(os.path.join(self.pasta, '*.prof')), key=os.path.getmtime)
+        for arquivo in antigos[:-self.maximo_arquivos]:
+            try: os.remove(arquivo)
+            except OSError: pass
+        return caminho
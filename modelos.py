@@ -0,0 +1,433 @@
+"""
+Modelos e manutenção do banco: migrações, índice de sorteios em memória, estatísticas
+acumuladas e conferência das carteiras. Sem rotas e sem dependências pesadas.
+
+O app (criar_app em app.py) e os importadores usam este módulo; os importadores só
+precisam de criar_app_dados(), um Flask mínimo com o banco configurado.
+"""
+import os
+import sqlite3
+from datetime import datetime, date, timezone
+from functools import partial
+
+import numpy as np
+from dotenv import load_dotenv
+from flask import Flask, g, has_request_context
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, func, event, inspect, text, bindparam, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import espaco_total
+import estatisticas as est
+from backtest import acertos_premiados, FAIXAS_PREMIO
+from indice_sorteios import indice, para_mascara, extrair_dezenas
+
+load_dotenv()
+PASTA_BASE = os.path.abspath(os.path.dirname(__file__))
+
+class SessaoRoteada(Session):
+    """
+    Nas requisições marcadas como somente leitura (g.banco_leitura, ver app.somente_leitura),
+    os SELECTs vão para o bind 'leitura' enquanto a transação não escreveu nada. A primeira
+    escrita (flush, INSERT/UPDATE/DELETE, SQL textual) prende o resto da transação no banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        principal = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not (has_request_context() and g.get('banco_leitura')): return principal
+        if self._flushing or not isinstance(clause, Select): self.info['escreveu'] = True
+        if self.info.get('escreveu'): return principal
+        return self._db.engines.get('leitura', principal)
+
+@event.listens_for(SessaoRoteada, 'after_transaction_end')
+def liberar_leitura(sessao, transacao):
+    if transacao.parent is None: sessao.info.pop('escreveu', None)
+
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
+
+# --- CONFIGURAÇÃO DO BANCO ---
+# Tudo pelo .env (ver .env.example). BANCO_MODO=producao liga o WAL e o pool de leitura no SQLite.
+PADROES_BANCO = {'BANCO_MODO': 'simples', 'BANCO_BUSY_TIMEOUT_MS': 5000, 'BANCO_CACHE_MB': 64, 'BANCO_MMAP_MB': 256, 'BANCO_POOL_LEITURA': 8}
+
+def _url(valor):
+    # Heroku/Render ainda entregam postgres://, que o SQLAlchemy 2 não aceita
+    return 'postgresql://' + valor[len('postgres://'):] if valor and valor.startswith('postgres://') else valor
+
+def pragmas_sqlite(config, dbapi_connection, connection_record, leitura=False):
+    """
+    Cada conexão nova: espera até busy_timeout por uma trava em vez de falhar com
+    "database is locked", cache de páginas e mmap maiores. O WAL deixa os leitores
+    lendo enquanto um importador grava; as conexões do pool de leitura ficam query_only.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(config['BANCO_BUSY_TIMEOUT_MS'])}")
+    cursor.execute(f"PRAGMA cache_size = -{int(config['BANCO_CACHE_MB']) * 1024}")
+    cursor.execute(f"PRAGMA mmap_size = {int(config['BANCO_MMAP_MB']) * 1024 * 1024}")
+    if leitura:
+        cursor.execute('PRAGMA query_only = ON')
+    else:
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA synchronous = NORMAL')  # seguro com WAL: só o último commit pode se perder numa queda de energia
+    cursor.close()
+
+def configurar_banco(app):
+    """
+    DATABASE_URL do .env (padrão: database.db ao lado do código; aceita Postgres) + db.init_app.
+
+    Bind 'leitura' (usado pela SessaoRoteada): DATABASE_URL_LEITURA se houver (réplica),
+    senão, no SQLite em modo produção, um segundo pool no mesmo arquivo.
+    """
+    for chave, padrao in PADROES_BANCO.items(): app.config.setdefault(chave, os.getenv(chave, padrao))
+    url = _url(app.config.setdefault('SQLALCHEMY_DATABASE_URI', os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(PASTA_BASE, 'database.db'))))
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    sqlite = url.startswith('sqlite')
+    producao = app.config['BANCO_MODO'] == 'producao'
+    url_leitura = _url(os.getenv('DATABASE_URL_LEITURA')) or (url if sqlite and producao and ':memory:' not in url else None)
+
+    if not sqlite:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {'pool_pre_ping': True, 'pool_recycle': 1800})
+    if url_leitura and 'leitura' not in app.config.get('SQLALCHEMY_BINDS', {}):
+        leitura = {'url': url_leitura, 'pool_size': int(app.config['BANCO_POOL_LEITURA'])}
+        # No Postgres a garantia de "só leitura" vem do próprio servidor
+        if url_leitura.startswith('postgresql'): leitura['connect_args'] = {'options': '-c default_transaction_read_only=on'}
+        app.config.setdefault('SQLALCHEMY_BINDS', {})['leitura'] = leitura
+    db.init_app(app)
+
+    if sqlite and producao:
+        with app.app_context():
+            for chave, engine in db.engines.items():
+                event.listen(engine, 'connect', partial(pragmas_sqlite, app.config, leitura=chave == 'leitura'))
+    return app
+
+def criar_app_dados():
+    """Flask mínimo (sem rotas, templates nem IA) para scripts que só mexem no banco."""
+    return configurar_banco(Flask(__name__))
+
+def inserir_ignorando(tabela, colunas):
+    """INSERT ... ON CONFLICT (colunas) DO NOTHING no dialeto do banco configurado (SQLite ou Postgres)."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(tabela).on_conflict_do_nothing(index_elements=colunas)
+    return sqlite_insert(tabela).on_conflict_do_nothing(index_elements=colunas)
+
+# --- MODELOS ---
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100))
+    email = db.Column(db.String(100), unique=True)
+    telefone = db.Column(db.String(20))
+    senha = db.Column(db.String(100))
+    foto_perfil = db.Column(db.String(120), default='default.png')
+    is_admin = db.Column(db.Boolean, default=False)
+    jogos = db.relationship('JogoSalvo', backref='dono', lazy=True)
+
+class JogoSalvo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    numeros = db.Column(db.String(100))
+    # bit (n - 1) = dezena n; preenchida a partir de 'numeros'. Sem índice só dela: os filtros são bit a bit (& / popcount)
+    mascara = db.Column(db.Integer)
+    conferido_ate = db.Column(db.Integer)  # último concurso já conferido na carteira (ver conferir_carteiras)
+    tipo = db.Column(db.String(50))
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Chave do jogo dentro da carteira: "esse usuário já tem essa máscara?" sai direto do índice
+    __table_args__ = (db.Index('ix_jogo_salvo_user_mascara', 'user_id', 'mascara'),)
+
+class ResultadoLotofacil(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    concurso = db.Column(db.Integer, unique=True, nullable=False)
+    data_sorteio = db.Column(db.String(20))
+    dezenas = db.Column(db.String(100))
+    mascara = db.Column(db.Integer)  # bit (n - 1) = dezena n; preenchida a partir de 'dezenas' (consultas vão pelo IndiceSorteios)
+    data = db.Column(db.Date, index=True)  # 'data_sorteio' convertida, para busca por dia/mês/ano com índice
+
+class AcertoJogo(db.Model):
+    # Conferência materializada da carteira: só os pares (jogo, concurso) premiados (11+)
+    id = db.Column(db.Integer, primary_key=True)
+    jogo_id = db.Column(db.Integer, db.ForeignKey('jogo_salvo.id'), nullable=False, index=True)
+    concurso = db.Column(db.Integer, nullable=False, index=True)
+    acertos = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.UniqueConstraint('jogo_id', 'concurso'),)
+
+class DesenhoFechamento(db.Model):
+    # Cache dos fechamentos com garantia: o desenho (posições 0..N-1) vale para qualquer pool de tamanho N
+    id = db.Column(db.Integer, primary_key=True)
+    tamanho_pool = db.Column(db.Integer, nullable=False)
+    garantia = db.Column(db.Integer, nullable=False)
+    condicao = db.Column(db.Integer, nullable=False)
+    qtd_jogos = db.Column(db.Integer)
+    mascaras = db.Column(db.Text)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('tamanho_pool', 'garantia', 'condicao'),)
+
+class EstatisticaConcurso(db.Model):
+    # Somas de prefixo por concurso (ver estatisticas.py), mantidas por sincronizar_estatisticas()
+    id = db.Column(db.Integer, primary_key=True)
+    concurso = db.Column(db.Integer, unique=True, nullable=False)
+    posicao = db.Column(db.Integer, unique=True, nullable=False)
+    frequencias = db.Column(db.String(200))
+    ultima_aparicao = db.Column(db.String(200))
+    soma_impares = db.Column(db.Integer)
+    soma_primos = db.Column(db.Integer)
+    soma_moldura = db.Column(db.Integer)
+
+    def como_linha(self):
+        return {'posicao': self.posicao,
+                'frequencias': [int(n) for n in self.frequencias.split(',')],
+                'ultima_aparicao': [int(n) for n in self.ultima_aparicao.split(',')],
+                'soma_impares': self.soma_impares, 'soma_primos': self.soma_primos, 'soma_moldura': self.soma_moldura}
+
+class VersaoDados(db.Model):
+    # Linha única: sobe a cada mudança em ResultadoLotofacil (chave dos caches e ETags)
+    id = db.Column(db.Integer, primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=1)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# --- MÁSCARAS NO BANCO ---
+@event.listens_for(Engine, 'connect')
+def registrar_popcount(dbapi_connection, connection_record):
+    # SQLite não tem popcount nativo: acertos = popcount(mascara & :sorteio) direto no SQL
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('popcount', 1, lambda x: int(x or 0).bit_count(), deterministic=True)
+
+@event.listens_for(JogoSalvo, 'before_insert')
+@event.listens_for(JogoSalvo, 'before_update')
+def mascara_do_jogo(mapper, connection, target):
+    target.mascara = para_mascara(extrair_dezenas(target.numeros))
+
+@event.listens_for(ResultadoLotofacil, 'before_insert')
+@event.listens_for(ResultadoLotofacil, 'before_update')
+def mascara_do_resultado(mapper, connection, target):
+    target.mascara = para_mascara(extrair_dezenas(target.dezenas))
+    target.data = data_do_sorteio(target.data_sorteio)
+
+def contem_dezenas(coluna, numeros):
+    """Filtro SQL: a máscara contém todas as dezenas informadas."""
+    alvo = para_mascara(numeros)
+    return coluna.op('&')(alvo) == alvo
+
+def adicionar_coluna_se_faltar(tabela, coluna, tipo, com_indice=False):
+    """Migração simples para bancos antigos (create_all não altera tabelas que já existem)."""
+    if coluna not in [c['name'] for c in inspect(db.engine).get_columns(tabela)]:
+        db.session.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}'))
+        if com_indice: db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna} ON {tabela} ({coluna})'))
+        db.session.commit()
+
+def migrar_mascaras():
+    """Adiciona a coluna 'mascara' em bancos antigos e preenche as linhas que ainda não têm."""
+    for modelo, campo in ((JogoSalvo, 'numeros'), (ResultadoLotofacil, 'dezenas')):
+        adicionar_coluna_se_faltar(modelo.__tablename__, 'mascara', 'INTEGER')
+        pendentes = db.session.query(modelo.id, getattr(modelo, campo)).filter(modelo.mascara.is_(None)).all()
+        if pendentes:
+            db.session.execute(modelo.__table__.update().where(modelo.__table__.c.id == bindparam('b_id')).values(mascara=bindparam('b_mascara')),
+                               [{'b_id': i, 'b_mascara': para_mascara(extrair_dezenas(t))} for i, t in pendentes])
+        db.session.commit()
+
+def migrar_datas():
+    """Coluna 'data' (Date indexada) em bancos antigos, preenchida a partir de 'data_sorteio'."""
+    adicionar_coluna_se_faltar('resultado_lotofacil', 'data', 'DATE', com_indice=True)
+    pendentes = db.session.query(ResultadoLotofacil.id, ResultadoLotofacil.data_sorteio).filter(ResultadoLotofacil.data.is_(None)).all()
+    tabela = ResultadoLotofacil.__table__
+    valores = [{'b_id': i, 'b_data': data_do_sorteio(t)} for i, t in pendentes if data_do_sorteio(t)]
+    if valores: db.session.execute(tabela.update().where(tabela.c.id == bindparam('b_id')).values(data=bindparam('b_data')), valores)
+    db.session.commit()
+
+POPCOUNT_POSTGRES = ("CREATE OR REPLACE FUNCTION popcount(x bigint) RETURNS integer LANGUAGE sql IMMUTABLE "
+                     "AS $$ SELECT length(replace(x::bit(32)::text, '0', '')) $$")
+
+def preparar_banco():
+    # No SQLite o popcount é registrado a cada conexão (registrar_popcount); no Postgres vira função do banco
+    if db.engine.dialect.name == 'postgresql': db.session.execute(text(POPCOUNT_POSTGRES)); db.session.commit()
+    # Só o bind principal: os binds ficam no `db` (do processo) e o 'leitura' de outro app pode não existir neste
+    db.create_all(bind_key=None); migrar_mascaras(); migrar_datas(); adicionar_coluna_se_faltar('jogo_salvo', 'conferido_ate', 'INTEGER')
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_jogo_salvo_user_mascara ON jogo_salvo (user_id, mascara)'))
+    # Índices só de 'mascara' de versões anteriores: nenhuma consulta usa, só pesavam nos INSERTs
+    for tabela in ('jogo_salvo', 'resultado_lotofacil'): db.session.execute(text(f'DROP INDEX IF EXISTS ix_{tabela}_mascara'))
+    db.session.commit()
+    sincronizar_estatisticas(); conferir_carteiras()
+
+def guardar_desenho(tamanho_pool, garantia, condicao, mascaras):
+    """Grava o desenho de um fechamento com garantia; se outro processo gravou o mesmo antes, fica o dele."""
+    db.session.add(DesenhoFechamento(tamanho_pool=tamanho_pool, garantia=garantia, condicao=condicao,
+                                     qtd_jogos=len(mascaras), mascaras=",".join(str(m) for m in mascaras)))
+    try: db.session.commit()
+    except IntegrityError: db.session.rollback()
+
+# --- ÍNDICE DE SORTEIOS (MEMÓRIA) ---
+def obter_indice():
+    """
+    Carrega o índice de máscaras uma vez e só recarrega se a tabela mudou: por outro processo
+    (quantidade, último concurso ou VersaoDados, que pega edições de um concurso existente) ou
+    por um commit deste (recarregar_indice).
+    """
+    versao = db.session.query(VersaoDados.valor).filter(VersaoDados.id == 1).scalar_subquery()
+    assinatura = tuple(db.session.query(func.count(ResultadoLotofacil.id), func.max(ResultadoLotofacil.concurso), versao).one())
+    if not indice.carregado or indice.assinatura() != assinatura:
+        linhas = db.session.query(ResultadoLotofacil.concurso, ResultadoLotofacil.mascara, ResultadoLotofacil.dezenas).all()
+        indice.carregar(((c, m if m is not None else para_mascara(extrair_dezenas(d))) for c, m, d in linhas), versao=assinatura[2])
+    return indice
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def marcar_resultados(sessao, contexto):
+    if any(isinstance(o, ResultadoLotofacil) for o in (*sessao.new, *sessao.dirty, *sessao.deleted)): sessao.info['resultados_mudaram'] = True
+
+@event.listens_for(SessaoRoteada, 'after_commit')
+@event.listens_for(SessaoRoteada, 'after_rollback')
+def recarregar_indice(sessao):
+    # O índice do processo só acompanha o que foi confirmado: um INSERT desfeito não deixa concurso fantasma
+    if sessao.info.pop('resultados_mudaram', False): indice.carregado = False
+
+# --- VERSÃO DOS RESULTADOS ---
+def incrementar_versao(conexao=None):
+    """Marca que os resultados mudaram. Os INSERTs em lote (importadores) chamam direto; o ORM chama pelos eventos."""
+    tabela = VersaoDados.__table__
+    (conexao or db.session).execute(tabela.update().where(tabela.c.id == 1).values(valor=tabela.c.valor + 1, atualizado_em=datetime.utcnow()))
+
+@event.listens_for(ResultadoLotofacil, 'after_insert')
+@event.listens_for(ResultadoLotofacil, 'after_update')
+@event.listens_for(ResultadoLotofacil, 'after_delete')
+def versao_ao_mudar(mapper, connection, target):
+    incrementar_versao(connection)
+
+def versao_resultados():
+    """(versão, data da última mudança em UTC) - cria a linha na primeira vez."""
+    linha = db.session.query(VersaoDados.valor, VersaoDados.atualizado_em).filter_by(id=1).first()
+    if not linha:
+        db.session.add(VersaoDados(id=1, valor=1, atualizado_em=datetime.utcnow()))
+        try: db.session.commit()
+        except IntegrityError: db.session.rollback()
+        linha = db.session.query(VersaoDados.valor, VersaoDados.atualizado_em).filter_by(id=1).first()
+    return linha[0], linha[1].replace(microsecond=0, tzinfo=timezone.utc)
+
+# --- ESTATÍSTICAS ---
+_assinatura_estatisticas = None
+
+def sincronizar_estatisticas(idx=None):
+    """
+    Deixa a tabela de prefixos igual ao índice de sorteios. Só recalcula a partir do
+    primeiro concurso diferente: um resultado novo no fim custa uma linha.
+    """
+    global _assinatura_estatisticas
+    idx = idx or obter_indice()
+    concursos = list(idx.concursos)
+    mascaras = idx.janela()
+    gravados = [c for (c,) in db.session.query(EstatisticaConcurso.concurso).order_by(EstatisticaConcurso.posicao)]
+    iguais = 0
+    while iguais < min(len(gravados), len(concursos)) and gravados[iguais] == concursos[iguais]: iguais += 1
+
+    if iguais < len(gravados) or iguais < len(concursos):
+        EstatisticaConcurso.query.filter(EstatisticaConcurso.posicao > iguais).delete()
+        anterior = EstatisticaConcurso.query.filter_by(posicao=iguais).first()
+        linha = anterior.como_linha() if anterior else est.linha_vazia()
+        novas = []
+        for concurso, mascara in zip(concursos[iguais:], mascaras[iguais:]):
+            linha = est.linha_seguinte(linha, mascara)
+            novas.append({'concurso': concurso, 'posicao': linha['posicao'],
+                          'frequencias': ",".join(map(str, linha['frequencias'])),
+                          'ultima_aparicao': ",".join(map(str, linha['ultima_aparicao'])),
+                          'soma_impares': linha['soma_impares'], 'soma_primos': linha['soma_primos'], 'soma_moldura': linha['soma_moldura']})
+        try:
+            if novas: db.session.execute(EstatisticaConcurso.__table__.insert(), novas)
+            # Respostas guardadas entre o commit dos resultados e esta sincronização têm a janela antiga: nova versão
+            incrementar_versao()
+            db.session.commit()
+        except IntegrityError: db.session.rollback()  # outro worker sincronizou ao mesmo tempo
+    _assinatura_estatisticas = idx.assinatura()
+
+_cache_janelas = {}
+_ultimas_janelas = {}  # limite -> última janela servida, para quando a tabela ainda não foi sincronizada
+
+def itens_cache_janelas():
+    return len(_cache_janelas)
+
+def estatisticas_janela(limite=10):
+    """
+    Frequência, atraso e médias (ímpares, primos, moldura) dos últimos `limite` concursos (0 = todos).
+    Só lê: quem grava resultados (admin, importadores) sincroniza a tabela. Enquanto ela está
+    atrasada em relação ao índice, vale a última janela calculada.
+    """
+    global _assinatura_estatisticas
+    idx = obter_indice()
+    assinatura = idx.assinatura()
+    # Entre dois sorteios a resposta não muda: guarda por (assinatura do índice, limite)
+    chave = (assinatura, limite)
+    if chave in _cache_janelas: return _cache_janelas[chave]
+    fim = EstatisticaConcurso.query.order_by(EstatisticaConcurso.posicao.desc()).first()
+    em_dia = (fim.posicao, fim.concurso) == assinatura[:2] if fim else not len(idx.concursos)
+    if not em_dia and limite in _ultimas_janelas: return _ultimas_janelas[limite]
+    if not fim: janela = est.janela(est.linha_vazia(), est.linha_vazia())
+    else:
+        inicio = EstatisticaConcurso.query.filter_by(posicao=fim.posicao - limite).first() if 0 < limite < fim.posicao else None
+        janela = est.janela(fim.como_linha(), inicio.como_linha() if inicio else est.linha_vazia())
+    if em_dia:
+        if _assinatura_estatisticas != assinatura or len(_cache_janelas) > 256: _cache_janelas.clear()
+        _assinatura_estatisticas = assinatura
+        _cache_janelas[chave] = janela
+    _ultimas_janelas[limite] = janela
+    return janela
+
+# --- CONFERÊNCIA DA CARTEIRA ---
+def data_do_sorteio(texto):
+    try: return datetime.strptime((texto or '').strip(), '%d/%m/%Y').date()
+    except ValueError: return None
+
+def conferir_carteiras(user_id=None):
+    """
+    Confere os jogos salvos contra todos os concursos desde a criação de cada jogo e
+    grava os premiados em AcertoJogo. Cada jogo guarda até onde já foi conferido, então
+    um concurso novo só custa conferir esse concurso. Chamada pelas escritas (jogos
+    salvos, resultados incluídos/excluídos/importados), nunca por uma tela de leitura.
+    """
+    ultimo = db.session.query(func.max(ResultadoLotofacil.concurso)).scalar()
+    if ultimo is None: return 0
+    query = db.session.query(JogoSalvo.id, JogoSalvo.mascara, JogoSalvo.data_criacao, JogoSalvo.conferido_ate).filter(or_(JogoSalvo.conferido_ate.is_(None), JogoSalvo.conferido_ate < ultimo))
+    if user_id: query = query.filter(JogoSalvo.user_id == user_id)
+    jogos = query.all()
+    if not jogos: return 0
+
+    # Por grupo de jogos com o mesmo conferido_ate: cada um lê só os concursos que ainda não viu, e só a
+    # partir da criação do jogo mais antigo dele (um jogo novo não faz a carteira inteira reler o histórico)
+    grupos = {}
+    for j in jogos: grupos.setdefault(j.conferido_ate or 0, []).append(j)
+    novos = []
+    for desde, grupo in grupos.items():
+        criado = min((j.data_criacao or datetime.min).date() for j in grupo)
+        sorteios = db.session.query(ResultadoLotofacil.concurso, ResultadoLotofacil.mascara, ResultadoLotofacil.data_sorteio).filter(
+            ResultadoLotofacil.concurso > desde, or_(ResultadoLotofacil.data.is_(None), ResultadoLotofacil.data >= criado)).order_by(ResultadoLotofacil.concurso).all()
+        if not sorteios: continue
+        concursos = np.array([s.concurso for s in sorteios], dtype=np.int64)
+        # Data ilegível conta como "depois de qualquer jogo"
+        datas = np.array([(data_do_sorteio(s.data_sorteio) or date.max).toordinal() for s in sorteios], dtype=np.int64)
+        criacao = np.array([(j.data_criacao or datetime.min).date().toordinal() for j in grupo], dtype=np.int64)
+        conferido = np.full(len(grupo), desde, dtype=np.int64)
+        idx_j, idx_s, acertos = acertos_premiados([j.mascara or 0 for j in grupo], [s.mascara or 0 for s in sorteios], conferido, criacao, concursos, datas)
+        novos += [{'jogo_id': grupo[j].id, 'concurso': int(concursos[s]), 'acertos': int(a)} for j, s, a in zip(idx_j, idx_s, acertos)]
+    if novos:
+        db.session.execute(inserir_ignorando(AcertoJogo.__table__, ['jogo_id', 'concurso']), novos)
+    db.session.execute(JogoSalvo.__table__.update().where(JogoSalvo.__table__.c.id == bindparam('b_id')).values(conferido_ate=ultimo),
+                       [{'b_id': j.id} for j in jogos])
+    db.session.commit()
+    return len(novos)
+
+def reabrir_conferencia(concurso):
+    """Faz os jogos voltarem a ser conferidos a partir de `concurso` (inclusão fora de ordem ou exclusão)."""
+    JogoSalvo.query.filter(JogoSalvo.conferido_ate >= concurso).update({JogoSalvo.conferido_ate: concurso - 1}, synchronize_session=False)
+
+def desempenho_carteira(user_id):
+    """Resumo para o perfil: total por faixa e, por jogo, (melhor pontuação, vezes premiado)."""
+    base = db.session.query(AcertoJogo).join(JogoSalvo, AcertoJogo.jogo_id == JogoSalvo.id).filter(JogoSalvo.user_id == user_id)
+    por_faixa = dict(base.with_entities(AcertoJogo.acertos, func.count()).group_by(AcertoJogo.acertos).all())
+    por_jogo = {j: (melhor, qtd) for j, melhor, qtd in base.with_entities(AcertoJogo.jogo_id, func.max(AcertoJogo.acertos), func.count()).group_by(AcertoJogo.jogo_id).all()}
+    return {'faixas': {f: por_faixa.get(f, 0) for f in FAIXAS_PREMIO}, 'por_jogo': por_jogo}
+
+# --- ESPAÇO TOTAL (ver espaco_total.py) ---
+PASTA_ESPACO = os.getenv('ESPACO_TOTAL_DIR', PASTA_BASE)
+
+def atualizar_espaco_total(idx=None):
+    """Aplica no arquivo do espaço total (se já foi construído) o delta dos resultados. Chamada por quem grava resultados, nunca por uma leitura."""
+    idx = idx or obter_indice()
+    return espaco_total.atualizar(PASTA_ESPACO, zip(idx.concursos, idx.mascaras))
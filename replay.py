@@ -0,0 +1,181 @@
+"""
+Replay histórico (walk-forward) das estratégias: "como a Pura / Padrão / Método 25 teriam ido?"
+
+Para cada concurso do histórico, monta o retrato que o app teria naquele dia (último
+sorteio + frequências dos 10 anteriores, como snapshot_estrategias), gera os jogos com
+o mesmo motor de estrategias.py e confere contra o sorteio seguinte.
+
+Os concursos são repartidos em trechos e cada trecho roda num processo do pool. Os
+jogos aleatórios usam uma semente por (semente, concurso): o resultado não depende de
+quantos processos ou trechos houve, só da estratégia, dos parâmetros e do histórico.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from math import comb
+
+import numpy as np
+
+import estrategias
+
+JANELA_PURA = 10  # concursos das frequências usadas pela Pura (e pela escolha das fixas do Método 25)
+TRECHO = 512  # concursos por tarefa do pool
+MINIMO_PARA_POOL = 1024  # abaixo disso mandar para os processos custa mais que calcular aqui
+MAX_JOGOS_POR_CONCURSO = 50
+MAX_SEMENTE = 999
+PASSO_JANELA = 50  # janelas arredondadas para cima: menos variações de chave no cache
+JOGOS_PADRAO = {'pura': 3, 'padrao': 4, 'metodo25': 4, 'surpresinha': 1}
+ESCOLHAS_M25 = ('frequentes', 'aleatorias')
+
+# Chance de um jogo aleatório de 15 dezenas fazer k pontos: C(15, k) * C(10, 15 - k) / C(25, 15)
+CHANCE_PONTOS = [comb(15, k) * comb(10, 15 - k) / comb(25, 15) for k in range(16)]
+
+def ler_parametros(estrategia, dados, fixos=(), total=None):
+    """
+    Parâmetros normalizados (entram na chave do cache): 'qtd' jogos por concurso, 'janela'
+    (replay só dos últimos N concursos, 0 = todos; múltiplo de PASSO_JANELA), 'semente'
+    (0..MAX_SEMENTE), os `fixos` (padrao) e a 'escolha' das fixas do Método 25 (frequentes =
+    as que mais saíram nos 10 anteriores). Com `total` (resultados cadastrados), janela que
+    cobre o histórico inteiro vira 0.
+    """
+    if estrategia not in estrategias.LOTES: raise ValueError(f"Estratégia desconhecida: {estrategia}")
+    janela = int(dados.get('janela') or 0)
+    if janela < 0: raise ValueError("'janela' não pode ser negativa.")
+    janela = -(-janela // PASSO_JANELA) * PASSO_JANELA
+    parametros = {'janela': 0 if total is not None and janela >= total - JANELA_PURA else janela}
+    if estrategia != 'pura':  # a Pura sempre gera os mesmos 3 jogos e não sorteia nada
+        parametros['qtd'] = int(dados.get('qtd') or JOGOS_PADRAO[estrategia])
+        parametros['semente'] = int(dados.get('semente') or 0)
+        if not 1 <= parametros['qtd'] <= MAX_JOGOS_POR_CONCURSO: raise ValueError(f"'qtd' deve estar entre 1 e {MAX_JOGOS_POR_CONCURSO}.")
+        if not 0 <= parametros['semente'] <= MAX_SEMENTE: raise ValueError(f"'semente' deve estar entre 0 e {MAX_SEMENTE}.")
+    if estrategia == 'padrao':
+        parametros['fixos'] = sorted({int(n) for n in fixos})
+        if not 1 <= len(parametros['fixos']) <= 14 or not set(parametros['fixos']) <= estrategias.TODAS:
+            raise ValueError("Escolha de 1 a 14 números fixos entre 1 e 25.")
+    if estrategia == 'metodo25':
+        parametros['escolha'] = (dados.get('escolha') or ESCOLHAS_M25[0]).strip().lower()
+        if parametros['escolha'] not in ESCOLHAS_M25: raise ValueError(f"'escolha' deve ser {' ou '.join(ESCOLHAS_M25)}.")
+    return parametros
+
+def jogos_estimados(parametros, total):
+    """Quantos jogos o replay vai gerar com `total` resultados cadastrados (para decidir entre calcular na hora ou na fila)."""
+    posicoes = max(total - JANELA_PURA, 0)
+    if parametros.get('janela'): posicoes = min(posicoes, parametros['janela'])
+    return posicoes * parametros.get('qtd', JOGOS_PADRAO['pura'])
+
+def _fixas_metodo_25(sorteadas, frequencias, escolha, rng):
+    """3 fixas entre as sorteadas e 2 entre as ausentes: as mais frequentes na janela (desempate: maior dezena, como a Pura) ou sorteadas."""
+    ausentes = sorted(estrategias.TODAS - set(sorteadas))
+    if escolha == 'aleatorias':
+        return rng.choice(sorteadas, 3, replace=False).tolist(), rng.choice(ausentes, 2, replace=False).tolist()
+    ranking = lambda grupo: sorted(grupo, key=lambda n: (frequencias[n - 1], n), reverse=True)
+    return ranking(sorteadas)[:3], ranking(ausentes)[:2]
+
+def _jogos_do_concurso(estrategia, parametros, concurso, mascara, frequencias):
+    """Os jogos que a estratégia daria logo depois de `concurso` (matriz (n, 15) de dezenas)."""
+    snapshot = estrategias.montar_snapshot(concurso, mascara, frequencias)
+    if estrategia == 'pura': return next(estrategias.lote_pura(snapshot))
+    rng = np.random.default_rng([parametros['semente'], concurso])
+    extras = {}
+    if estrategia == 'padrao':
+        extras['fixos'] = parametros['fixos']
+    elif estrategia == 'metodo25':
+        sorteadas = [n for n in range(1, 26) if mascara >> (n - 1) & 1]
+        fixas_sorteadas, fixas_ausentes = _fixas_metodo_25(sorteadas, frequencias, parametros['escolha'], rng)
+        extras = {'sorteadas': sorteadas, 'fixas_sorteadas': fixas_sorteadas, 'fixas_ausentes': fixas_ausentes}
+    return np.concatenate(list(estrategias.LOTES[estrategia](snapshot, qtd=parametros['qtd'], rng=rng, **extras)))
+
+def replay_trecho(estrategia, parametros, concursos, mascaras, primeiro):
+    """
+    Joga as posições primeiro..len-2 de `concursos`/`mascaras` (a fatia traz antes os
+    JANELA_PURA - 1 concursos de contexto e termina no último sorteio conferido).
+    Devolve somas parciais: pontos de todos os jogos e melhor jogo de cada concurso (0..15).
+    """
+    presencas = ((np.asarray(mascaras, dtype=np.uint32)[:, None] >> np.arange(25, dtype=np.uint32)) & 1).astype(np.int32)
+    acumulado = np.vstack([np.zeros((1, 25), dtype=np.int32), np.cumsum(presencas, axis=0, dtype=np.int32)])
+    pontos, melhores = np.zeros(16, dtype=np.int64), np.zeros(16, dtype=np.int64)
+    for i in range(primeiro, len(concursos) - 1):
+        frequencias = (acumulado[i + 1] - acumulado[max(0, i + 1 - JANELA_PURA)]).tolist()
+        jogos = _jogos_do_concurso(estrategia, parametros, int(concursos[i]), int(mascaras[i]), frequencias)
+        acertos = presencas[i + 1][jogos.astype(np.intp) - 1].sum(axis=1)
+        pontos += np.bincount(acertos, minlength=16)
+        melhores[acertos.max()] += 1
+    return pontos, melhores
+
+class ReplayEstrategias:
+    """Roda o replay em trechos num pool de processos (criado na primeira vez). processos <= 1 calcula tudo no próprio processo."""
+
+    def __init__(self, processos=1, trecho=TRECHO):
+        self.processos = processos
+        self.trecho = trecho
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: os filhos não herdam threads nem conexões do worker web
+                self._executor = ProcessPoolExecutor(max_workers=self.processos, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _descartar_pool(self):
+        with self._lock:
+            if self._executor: self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def rodar(self, estrategia, parametros, concursos, mascaras, progresso=None):
+        """
+        Replay de `parametros` (ver ler_parametros) sobre o histórico em ordem cronológica.
+        Só entram concursos com JANELA_PURA anteriores (mesmo conjunto para todas as estratégias).
+        progresso(trechos feitos, total) é chamado a cada trecho terminado.
+        """
+        concursos, mascaras = np.asarray(concursos, dtype=np.int64), np.asarray(mascaras, dtype=np.uint32)
+        inicio = JANELA_PURA - 1
+        if parametros.get('janela'): inicio = max(inicio, len(concursos) - 1 - parametros['janela'])
+        posicoes = range(inicio, len(concursos) - 1)
+        if not posicoes: raise ValueError(f"Preciso de pelo menos {JANELA_PURA + 1} resultados cadastrados para o replay.")
+
+        def fatia(a, b):
+            # contexto das frequências antes de `a` + o sorteio que confere a posição b - 1
+            c = a - (JANELA_PURA - 1)
+            return estrategia, parametros, concursos[c:b + 1], mascaras[c:b + 1], a - c
+        trechos = [fatia(a, min(a + self.trecho, posicoes.stop)) for a in range(posicoes.start, posicoes.stop, self.trecho)]
+
+        def acompanhar(resultados):
+            partes = []
+            for parte in resultados:
+                partes.append(parte)
+                if progresso: progresso(len(partes), len(trechos))
+            return partes
+
+        usados = 1
+        if self.processos > 1 and len(posicoes) >= MINIMO_PARA_POOL:
+            try:
+                partes = acompanhar(self._pool().map(replay_trecho, *zip(*trechos)))
+                usados = min(self.processos, len(trechos))
+            except BrokenProcessPool:
+                self._descartar_pool()
+                partes = acompanhar(replay_trecho(*t) for t in trechos)
+        else:
+            partes = acompanhar(replay_trecho(*t) for t in trechos)
+        pontos = sum(p for p, _ in partes)
+        melhores = sum(m for _, m in partes)
+        return self._resumo(estrategia, parametros, pontos, melhores, int(concursos[posicoes.start + 1]), int(concursos[-1]), usados)
+
+    @staticmethod
+    def _resumo(estrategia, parametros, pontos, melhores, primeiro, ultimo, processos):
+        jogos, qtd_concursos = int(pontos.sum()), int(melhores.sum())
+        faixas = range(11, 16)
+        return {
+            'estrategia': estrategia, 'parametros': parametros, 'processos': processos,
+            'concursos': qtd_concursos, 'primeiro_concurso': primeiro, 'ultimo_concurso': ultimo,
+            'jogos': jogos, 'jogos_por_concurso': round(jogos / qtd_concursos, 2),
+            'media_pontos': round(float((pontos * np.arange(16)).sum()) / jogos, 3),
+            'distribuicao': {str(k): int(pontos[k]) for k in range(16)},
+            'premios': {str(k): int(pontos[k]) for k in faixas},
+            # O mesmo número de jogos feitos totalmente ao acaso (referência para comparar)
+            'esperado_aleatorio': {str(k): round(jogos * CHANCE_PONTOS[k], 2) for k in faixas},
+            'concursos_premiados': int(melhores[11:].sum()),
+            'melhor_por_concurso': {str(k): int(melhores[k]) for k in range(16) if melhores[k]},
+        }
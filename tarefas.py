@@ -0,0 +1,336 @@
+"""
+Fila de tarefas em segundo plano para o que não cabe numa requisição: fechamentos
+completos, importações (planilha ou API) e exportações de carteiras grandes.
+
+A rota só enfileira e devolve o id. Um pool de processos (`flask --app app tarefas`)
+pega as tarefas por ordem de chegada, grava progresso e batimento e deixa o resultado
+(ou o log) num arquivo da pasta da tarefa, baixado depois pela rota. A fila é um SQLite
+próprio, separado do banco principal (que pode ser Postgres), e o cancelamento é
+cooperativo: a tarefa confere o pedido a cada chamada de progresso.
+"""
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+SITUACOES = ('fila', 'rodando', 'concluida', 'erro', 'cancelada')
+INTERVALO_PROGRESSO = 0.5  # segundos entre gravações de progresso (e conferências de cancelamento)
+INTERVALO_BATIMENTO = 10
+TEMPO_ORFA = 120  # tarefa 'rodando' sem batimento há mais que isso: o processo morreu
+DIAS_GUARDADAS = 7
+
+class Cancelada(BaseException):
+    """Pedido de cancelamento. BaseException para atravessar os `except Exception` dos importadores."""
+
+class LimiteTarefas(Exception):
+    """O usuário já tem o máximo de tarefas na fila ou rodando."""
+
+# nome -> função(execucao) que devolve {'arquivo', 'nome', 'mime', 'mensagem'} (tudo opcional)
+TIPOS = {}
+
+def tipo_tarefa(nome):
+    def registrar(funcao):
+        TIPOS[nome] = funcao
+        return funcao
+    return registrar
+
+class Execucao:
+    """O que a função da tarefa recebe: parâmetros, dono, pasta própria e o relatório de progresso (que também cancela)."""
+
+    def __init__(self, fila, tarefa):
+        self.fila, self.id = fila, tarefa['id']
+        self.parametros, self.user_id = tarefa['parametros'], tarefa['user_id']
+        self.saida = io.StringIO()  # o que a tarefa imprimir (os importadores falam pelo print)
+        self._ultimo = 0.0
+
+    def caminho(self, nome):
+        return os.path.join(self.fila.pasta_da(self.id), nome)
+
+    def progresso(self, feitos, total=None, mensagem=None):
+        """Mesma assinatura dos callbacks progresso(i, total) do repositório. Levanta Cancelada se pediram para parar."""
+        agora = time.monotonic()
+        if agora - self._ultimo < INTERVALO_PROGRESSO and not (total and feitos >= total): return
+        self._ultimo = agora
+        if self.fila.progresso(self.id, feitos, total, mensagem): raise Cancelada()
+
+    def ultima_linha(self):
+        linhas = [l.strip() for l in self.saida.getvalue().splitlines() if l.strip()]
+        return linhas[-1] if linhas else None
+
+class FilaTarefas:
+
+    def __init__(self, arquivo, pasta):
+        self.arquivo, self.pasta = arquivo, pasta
+        self._pronta = False
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        con = sqlite3.connect(self.arquivo, timeout=30, isolation_level=None)  # autocommit; transações só com BEGIN explícito
+        con.row_factory = sqlite3.Row
+        if not self._pronta:
+            with self._lock:
+                if not self._pronta:
+                    os.makedirs(self.pasta, exist_ok=True)
+                    con.execute('PRAGMA journal_mode = WAL')
+                    con.execute("""CREATE TABLE IF NOT EXISTS tarefas (
+                        id TEXT PRIMARY KEY, tipo TEXT NOT NULL, user_id INTEGER, parametros TEXT NOT NULL,
+                        situacao TEXT NOT NULL DEFAULT 'fila', feitos INTEGER NOT NULL DEFAULT 0, total INTEGER, mensagem TEXT,
+                        criada_em REAL NOT NULL, iniciada_em REAL, terminada_em REAL, batimento REAL,
+                        cancelar INTEGER NOT NULL DEFAULT 0, arquivo TEXT, nome_arquivo TEXT, mime TEXT)""")
+                    con.execute('CREATE INDEX IF NOT EXISTS ix_tarefas_situacao ON tarefas (situacao, criada_em)')
+                    con.execute('CREATE INDEX IF NOT EXISTS ix_tarefas_usuario ON tarefas (user_id, criada_em)')
+                    con.execute('CREATE INDEX IF NOT EXISTS ix_tarefas_tipo ON tarefas (tipo, parametros)')
+                    self._pronta = True
+        return contextlib.closing(con)
+
+    def pasta_da(self, id):
+        return os.path.join(self.pasta, id)
+
+    @staticmethod
+    def _como_dict(linha):
+        if linha is None: return None
+        tarefa = dict(linha)
+        tarefa['parametros'] = json.loads(tarefa['parametros'])
+        return tarefa
+
+    def enfileirar(self, tipo, parametros, user_id=None, anexos=None, maximo_ativas=None, reaproveitar=False):
+        """
+        Põe a tarefa na fila e devolve o id. `anexos` ({nome: função(caminho)}) grava os
+        arquivos de entrada (ex.: a planilha enviada) na pasta da tarefa antes de ela ficar visível.
+        Com `reaproveitar`, devolve o id de uma tarefa igual (tipo e parâmetros) na fila, rodando ou
+        concluída com arquivo. Com `maximo_ativas`, levanta LimiteTarefas se o usuário já tem essa
+        quantidade na fila ou rodando.
+        """
+        if tipo not in TIPOS: raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+        id, texto = uuid.uuid4().hex, json.dumps(parametros, sort_keys=True)
+        with self._conectar() as con:
+            con.execute('BEGIN IMMEDIATE')  # busca, contagem e INSERT juntos: pedidos simultâneos não duplicam nem furam o limite
+            try:
+                igual = reaproveitar and con.execute("SELECT id FROM tarefas WHERE tipo = ? AND parametros = ? AND (situacao IN ('fila', 'rodando') "
+                                                     "OR situacao = 'concluida' AND arquivo IS NOT NULL) ORDER BY criada_em DESC LIMIT 1", (tipo, texto)).fetchone()
+                if igual: con.execute('COMMIT'); return igual[0]
+                if maximo_ativas is not None:
+                    ativas = con.execute("SELECT COUNT(*) FROM tarefas WHERE user_id = ? AND situacao IN ('fila', 'rodando')", (user_id,)).fetchone()[0]
+                    if ativas >= maximo_ativas: raise LimiteTarefas(f"Você já tem {ativas} tarefas em andamento. Espere alguma terminar (ou cancele).")
+                os.makedirs(self.pasta_da(id), exist_ok=True)
+                for nome, gravar in (anexos or {}).items(): gravar(os.path.join(self.pasta_da(id), nome))
+                con.execute('INSERT INTO tarefas (id, tipo, user_id, parametros, criada_em) VALUES (?, ?, ?, ?, ?)',
+                            (id, tipo, user_id, texto, time.time()))
+                con.execute('COMMIT')
+            except BaseException:
+                con.execute('ROLLBACK'); shutil.rmtree(self.pasta_da(id), ignore_errors=True); raise
+        return id
+
+    def obter(self, id):
+        with self._conectar() as con:
+            return self._como_dict(con.execute('SELECT * FROM tarefas WHERE id = ?', (id,)).fetchone())
+
+    def listar(self, user_id=None, limite=20):
+        """Mais recentes primeiro; user_id=None traz as de todos (painel do admin)."""
+        with self._conectar() as con:
+            if user_id is None: linhas = con.execute('SELECT * FROM tarefas ORDER BY criada_em DESC LIMIT ?', (limite,))
+            else: linhas = con.execute('SELECT * FROM tarefas WHERE user_id = ? ORDER BY criada_em DESC LIMIT ?', (user_id, limite))
+            return [self._como_dict(l) for l in linhas]
+
+    def contagem(self):
+        if not os.path.exists(self.arquivo): return {}  # o /metrics não cria a fila de quem não usa
+        with self._conectar() as con:
+            return dict(con.execute('SELECT situacao, COUNT(*) FROM tarefas GROUP BY situacao').fetchall())
+
+    def cancelar(self, id):
+        """Na fila: cancela na hora. Rodando: marca o pedido (a tarefa para na próxima chamada de progresso). False se já terminou."""
+        agora = time.time()
+        with self._conectar() as con:
+            if con.execute("UPDATE tarefas SET situacao = 'cancelada', terminada_em = ?, mensagem = 'Cancelada antes de começar.' "
+                           "WHERE id = ? AND situacao = 'fila'", (agora, id)).rowcount: return True
+            return bool(con.execute("UPDATE tarefas SET cancelar = 1 WHERE id = ? AND situacao = 'rodando'", (id,)).rowcount)
+
+    def pegar_proxima(self):
+        """Tira a tarefa mais antiga da fila. BEGIN IMMEDIATE: dois processos nunca pegam a mesma."""
+        agora = time.time()
+        with self._conectar() as con:
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                linha = con.execute("SELECT id FROM tarefas WHERE situacao = 'fila' ORDER BY criada_em LIMIT 1").fetchone()
+                if linha: con.execute("UPDATE tarefas SET situacao = 'rodando', iniciada_em = ?, batimento = ?, mensagem = NULL WHERE id = ?",
+                                      (agora, agora, linha['id']))
+                con.execute('COMMIT')
+            except BaseException:
+                con.execute('ROLLBACK'); raise
+        return self.obter(linha['id']) if linha else None
+
+    def progresso(self, id, feitos, total=None, mensagem=None):
+        """Grava o andamento e devolve True se pediram o cancelamento."""
+        with self._conectar() as con:
+            con.execute('UPDATE tarefas SET feitos = ?, total = COALESCE(?, total), mensagem = COALESCE(?, mensagem), batimento = ? WHERE id = ?',
+                        (feitos, total, mensagem, time.time(), id))
+            return bool(con.execute('SELECT cancelar FROM tarefas WHERE id = ?', (id,)).fetchone()[0])
+
+    def bater(self, id):
+        with self._conectar() as con:
+            con.execute('UPDATE tarefas SET batimento = ? WHERE id = ?', (time.time(), id))
+
+    def terminar(self, id, situacao, mensagem=None, arquivo=None, nome_arquivo=None, mime=None):
+        with self._conectar() as con:
+            con.execute('UPDATE tarefas SET situacao = ?, mensagem = ?, arquivo = ?, nome_arquivo = ?, mime = ?, terminada_em = ? WHERE id = ?',
+                        (situacao, mensagem, arquivo, nome_arquivo, mime, time.time(), id))
+
+    def recuperar_orfas(self, tempo=TEMPO_ORFA):
+        """Tarefas 'rodando' cujo processo morreu (sem batimento) viram erro."""
+        with self._conectar() as con:
+            return con.execute("UPDATE tarefas SET situacao = 'erro', mensagem = 'O processo da tarefa parou no meio.', terminada_em = ? "
+                               "WHERE situacao = 'rodando' AND batimento < ?", (time.time(), time.time() - tempo)).rowcount
+
+    def limpar_antigas(self, dias=DIAS_GUARDADAS):
+        """Apaga as tarefas terminadas há mais de `dias` dias, com os arquivos delas."""
+        limite = time.time() - dias * 86400
+        with self._conectar() as con:
+            ids = [id for (id,) in con.execute("SELECT id FROM tarefas WHERE situacao IN ('concluida', 'erro', 'cancelada') AND terminada_em < ?", (limite,))]
+            for id in ids: shutil.rmtree(self.pasta_da(id), ignore_errors=True)
+            con.executemany('DELETE FROM tarefas WHERE id = ?', [(id,) for id in ids])
+        return len(ids)
+
+    def executar(self, tarefa, app):
+        """Roda uma tarefa já marcada como 'rodando' e grava como terminou. O batimento corre numa thread à parte."""
+        execucao = Execucao(self, tarefa)
+        parar = threading.Event()
+        def batimento():
+            while not parar.wait(INTERVALO_BATIMENTO): self.bater(tarefa['id'])
+        threading.Thread(target=batimento, daemon=True).start()
+        situacao, mensagem, resultado = 'concluida', None, {}
+        try:
+            with app.app_context(), contextlib.redirect_stdout(execucao.saida):
+                resultado = TIPOS[tarefa['tipo']](execucao) or {}
+            mensagem = resultado.get('mensagem') or execucao.ultima_linha()
+        except Cancelada:
+            situacao, mensagem = 'cancelada', 'Cancelada.'
+        except KeyboardInterrupt:
+            self.terminar(tarefa['id'], 'erro', 'Interrompida: o worker foi desligado.'); raise
+        except Exception as e:
+            situacao, mensagem = 'erro', str(e) or type(e).__name__
+        finally:
+            parar.set()
+        if not resultado.get('arquivo') and execucao.saida.getvalue():
+            # Sem arquivo de resultado (importações, erros): o log vira o download
+            with open(execucao.caminho('log.txt'), 'w', encoding='utf-8') as f: f.write(execucao.saida.getvalue())
+            resultado = {'arquivo': 'log.txt', 'nome': f"tarefa-{tarefa['id'][:8]}.log", 'mime': 'text/plain'}
+        self.terminar(tarefa['id'], situacao, mensagem, resultado.get('arquivo'), resultado.get('nome'), resultado.get('mime'))
+
+# --- POOL DE PROCESSOS ---
+def trabalhar(arquivo, pasta, parar, intervalo=1.0):
+    """Laço de um processo do pool: pega a próxima tarefa, executa, repete até `parar`."""
+    from modelos import criar_app_dados
+    fila, app = FilaTarefas(arquivo, pasta), criar_app_dados()
+    try:
+        while not parar.is_set():
+            tarefa = fila.pegar_proxima()
+            if tarefa is None: parar.wait(intervalo)
+            else: fila.executar(tarefa, app)
+    except KeyboardInterrupt:
+        pass
+
+def rodar_pool(arquivo, pasta, processos=2, parar=None):
+    """
+    Mantém `processos` trabalhadores vivos (reinicia quem morrer) até `parar` (Event) ou
+    Ctrl+C. De minuto em minuto recupera tarefas órfãs e apaga as antigas.
+    """
+    # spawn: os filhos não herdam threads nem conexões do processo que os criou
+    ctx = multiprocessing.get_context('spawn')
+    parar_filhos, fila, vivos, ultima_limpeza = ctx.Event(), FilaTarefas(arquivo, pasta), [], 0.0
+    try:
+        while not (parar and parar.is_set()):
+            vivos = [p for p in vivos if p.is_alive()]
+            while len(vivos) < processos:
+                p = ctx.Process(target=trabalhar, args=(arquivo, pasta, parar_filhos), name='tarefas')
+                p.start(); vivos.append(p)
+            if time.monotonic() - ultima_limpeza > 60:
+                fila.recuperar_orfas(); fila.limpar_antigas(); ultima_limpeza = time.monotonic()
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parar_filhos.set()
+        for p in vivos: p.join(timeout=30)
+
+# --- TIPOS DE TAREFA ---
+# Importações pesadas na hora: o processo web só precisa deste módulo para enfileirar
+
+@tipo_tarefa('fechamento')
+def tarefa_fechamento(execucao):
+    from loto_logic import gerar_fechamento
+    pool, fixos = execucao.parametros['pool'], execucao.parametros['fixos']
+    resultado = gerar_fechamento(len(set(pool) | set(fixos)), fixos, numeros_variaveis=pool)
+    if 'erro' in resultado: raise ValueError(resultado['erro'])
+    total = resultado['total_jogos']
+    with open(execucao.caminho('fechamento.csv'), 'w', encoding='utf-8', newline='') as f:
+        f.write("jogo;dezenas\n")
+        for i, jogo in enumerate(resultado['jogos'], 1):
+            f.write(f"{i};{' '.join(f'{n:02d}' for n in jogo)}\n")
+            if i % 5000 == 0: execucao.progresso(i, total)
+    execucao.progresso(total, total)
+    return {'arquivo': 'fechamento.csv', 'nome': 'fechamento.csv', 'mime': 'text/csv', 'mensagem': f"{total} jogos gerados."}
+
+@tipo_tarefa('fechamento-garantia')
+def tarefa_fechamento_garantia(execucao):
+    """Calcula e grava o desenho (DesenhoFechamento); a rota /fechamento-garantia passa a responder do cache."""
+    from fechamento_garantia import otimizar_fechamento
+    from modelos import guardar_desenho
+    p = execucao.parametros
+    mascaras = otimizar_fechamento(p['tamanho_pool'], p['garantia'], p['condicao'], progresso=execucao.progresso)
+    guardar_desenho(p['tamanho_pool'], p['garantia'], p['condicao'], mascaras)
+    return {'mensagem': f"Desenho pronto: {len(mascaras)} jogos."}
+
+@tipo_tarefa('replay')
+def tarefa_replay(execucao):
+    """Replay histórico (ver replay.py) num JSON; a rota /api/v1/replay devolve (e guarda no cache) quando fica pronto."""
+    from replay import ReplayEstrategias
+    from modelos import obter_indice
+    p, idx = execucao.parametros, obter_indice()
+    inicio = time.perf_counter()
+    resultado = ReplayEstrategias(processos=int(os.getenv('REPLAY_PROCESSOS', 1))).rodar(
+        p['estrategia'], p['parametros'], idx.concursos, idx.janela(0), progresso=execucao.progresso)
+    resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+    with open(execucao.caminho('replay.json'), 'w', encoding='utf-8') as f: json.dump(resultado, f)
+    return {'arquivo': 'replay.json', 'nome': f"replay-{p['estrategia']}.json", 'mime': 'application/json',
+            'mensagem': f"{resultado['concursos']} concursos, {resultado['jogos']} jogos."}
+
+@tipo_tarefa('exportar')
+def tarefa_exportar(execucao):
+    import exportacao
+    from modelos import db, JogoSalvo
+    formato, colunas, alvo = execucao.parametros['formato'], execucao.parametros['colunas'], execucao.parametros.get('alvo')
+    total = db.session.query(JogoSalvo.id).filter_by(user_id=execucao.user_id).count()
+    if formato == 'pdf' and total > exportacao.MAX_JOGOS_PDF: raise ValueError(f"PDF vai até {exportacao.MAX_JOGOS_PDF} jogos; use Excel ou CSV.")
+    def linhas():
+        for i, linha in enumerate(exportacao.linhas_exportacao(execucao.user_id, alvo), 1):
+            if i % 500 == 0: execucao.progresso(i, total)
+            yield linha
+    nome, mime = exportacao.FORMATOS[formato]
+    if formato == 'csv':
+        with open(execucao.caminho(nome), 'w', encoding='utf-8', newline='') as f: exportacao.escrever_csv(f, colunas, linhas())
+    else:
+        escrever = exportacao.escrever_excel if formato == 'excel' else exportacao.escrever_pdf
+        with open(execucao.caminho(nome), 'wb') as f: escrever(f, colunas, linhas())
+    execucao.progresso(total, total)
+    return {'arquivo': nome, 'nome': nome, 'mime': mime, 'mensagem': f"{total} jogos exportados."}
+
+@tipo_tarefa('importar-excel')
+def tarefa_importar_excel(execucao):
+    from importar_excel import importar_do_excel
+    importados = importar_do_excel(execucao.caminho(execucao.parametros['arquivo']), progresso=execucao.progresso)
+    if importados is None: raise RuntimeError(execucao.ultima_linha() or "A importação falhou.")
+    return {'mensagem': f"{importados} novos resultados importados."}
+
+@tipo_tarefa('importar-api')
+def tarefa_importar_api(execucao):
+    from importar_resultados import importar_jogos
+    importados = importar_jogos(quantidade=execucao.parametros.get('quantidade', 50), workers=int(os.getenv('IMPORTACAO_WORKERS', 8)),
+                                taxa=float(os.getenv('IMPORTACAO_TAXA', 5)), progresso=execucao.progresso)
+    if importados is None: raise RuntimeError(execucao.ultima_linha() or "A importação falhou.")
+    return {'mensagem': f"{importados} novos resultados importados."}
@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+
+import pytest
+
+# Os módulos do app ficam na raiz do repositório (sem pacote)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def sorteios(quantidade, semente=1):
+    """`quantidade` sorteios aleatórios (listas ordenadas de 15 dezenas), sempre os mesmos para a mesma semente."""
+    rnd = random.Random(semente)
+    return [sorted(rnd.sample(range(1, 26), 15)) for _ in range(quantidade)]
+
+@pytest.fixture(autouse=True)
+def estado_limpo():
+    """O índice de sorteios e os caches de estatísticas são do processo: cada teste começa do zero."""
+    import modelos
+    from indice_sorteios import indice
+    indice.carregado = False
+    modelos._assinatura_estatisticas = None
+    modelos._cache_janelas.clear()
+    modelos._ultimas_janelas.clear()
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    App com banco e fila de tarefas temporários, 60 concursos cadastrados e um admin (admin@teste / senha).
+    Sem app_context aberto: com um aberto, as requisições do test_client dividiriam o `g` (e o usuário logado).
+    """
+    import app as modulo
+    import espaco_total
+    import modelos
+    from werkzeug.security import generate_password_hash
+    from modelos import db, User, ResultadoLotofacil
+    from tarefas import FilaTarefas
+
+    aplicacao = modulo.criar_app({'TESTING': True, 'WTF_CSRF_ENABLED': False, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}"})
+    monkeypatch.setattr(modulo, 'fila', FilaTarefas(str(tmp_path / 'tarefas.db'), str(tmp_path / 'tarefas')))
+    monkeypatch.setattr(modelos, 'PASTA_ESPACO', str(tmp_path))
+    monkeypatch.setattr(modulo, 'espaco', espaco_total.EspacoTotal(str(tmp_path)))
+    modulo.cache.limpar()
+    with aplicacao.app_context():
+        db.create_all(bind_key=None)
+        for concurso, dezenas in enumerate(sorteios(60), 1):
+            db.session.add(ResultadoLotofacil(concurso=concurso, data_sorteio=f"{concurso % 28 + 1:02d}/01/2020", dezenas=", ".join(f"{n:02d}" for n in dezenas)))
+        db.session.add(User(nome='Admin', email='admin@teste', senha=generate_password_hash('senha'), is_admin=True))
+        db.session.commit()
+        modelos.sincronizar_estatisticas()  # como o admin e os importadores fazem depois de gravar resultados
+    yield aplicacao
+
+@pytest.fixture
+def cliente(app):
+    """Cliente já logado como o admin da fixture `app`."""
+    cliente = app.test_client()
+    cliente.post('/login', data={'email': 'admin@teste', 'senha': 'senha'})
+    return cliente
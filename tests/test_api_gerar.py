@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pytest
+
+import estrategias as est
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+ULTIMO = sorteios(60)[-1]
+
+def matriz(blocos):
+    return np.concatenate(list(blocos))
+
+def linhas_validas(jogos):
+    ordenadas = (np.diff(jogos.astype(int), axis=1) > 0).all()
+    return jogos.shape[1] == 15 and ordenadas and jogos.min() >= 1 and jogos.max() <= 25
+
+def test_lotes_em_varios_blocos_reproduziveis(monkeypatch):
+    monkeypatch.setattr(est, 'TAMANHO_BLOCO', 1000)
+    snapshot = est.montar_snapshot(60, para_mascara(ULTIMO), [1] * 25)
+    padrao = matriz(est.lote_padrao(snapshot, [3, 11, 20], qtd=2500, rng=np.random.default_rng(7)))
+    assert padrao.shape == (2500, 15) and linhas_validas(padrao)
+    assert (np.isin(padrao, [3, 11, 20]).sum(axis=1) == 3).all()
+    assert (padrao == matriz(est.lote_padrao(snapshot, [3, 11, 20], qtd=2500, rng=np.random.default_rng(7)))).all()
+    assert not (padrao == matriz(est.lote_padrao(snapshot, [3, 11, 20], qtd=2500, rng=np.random.default_rng(8)))).all()
+
+    ausentes = sorted(est.TODAS - set(ULTIMO))
+    m25 = matriz(est.lote_metodo_25(snapshot, ULTIMO, ULTIMO[:3], ausentes[:2], qtd=1003, rng=np.random.default_rng(1)))
+    assert m25.shape == (1003, 15) and linhas_validas(m25)
+    assert all(len(set(j) & set(ULTIMO)) == 9 and set(ULTIMO[:3] + ausentes[:2]) <= set(j) for j in m25.tolist())
+
+def test_lote_pura_precisa_de_historico():
+    with pytest.raises(ValueError):
+        est.lote_pura(None)
+
+def test_api_json_e_ndjson(app):
+    cliente = app.test_client()
+    resposta = cliente.get('/api/v1/gerar/surpresinha?qtd=70000&semente=42')
+    corpo = json.loads(resposta.get_data())
+    jogos = np.array(corpo['jogos'], dtype=np.uint8)
+    assert corpo['semente'] == 42 and corpo['concurso_base'] == 60 and jogos.shape == (70000, 15) and linhas_validas(jogos)
+
+    linhas = cliente.get('/api/v1/gerar/surpresinha?qtd=70000&semente=42&formato=ndjson').get_data(as_text=True).splitlines()
+    assert json.loads(linhas[0])['semente'] == 42
+    assert [json.loads(l) for l in linhas[1:]] == corpo['jogos']  # mesma semente, mesmos jogos
+
+    padrao = cliente.post('/api/v1/gerar/padrao', json={'qtd': 10, 'semente': 1, 'fixos': [1, 2, 3]}).json
+    assert len(padrao['jogos']) == 10 and all({1, 2, 3} <= set(j) for j in padrao['jogos'])
+    for consulta in ('fixos=4&fixos=17', 'fixos=4,17'):  # parâmetro repetido ou uma lista só
+        jogos = cliente.get(f'/api/v1/gerar/padrao?qtd=10&semente=1&{consulta}').json['jogos']
+        assert all({4, 17} <= set(j) for j in jogos)
+
+def test_api_valida(app):
+    cliente = app.test_client()
+    assert cliente.get('/api/v1/gerar/nenhuma').status_code == 404
+    assert cliente.get('/api/v1/gerar/surpresinha?qtd=0').status_code == 400
+    assert cliente.get('/api/v1/gerar/surpresinha?qtd=600000').status_code == 400
+    assert cliente.get('/api/v1/gerar/padrao?qtd=5').status_code == 400  # sem fixos
+    assert cliente.get('/api/v1/gerar/metodo25?qtd=4&soma_min=150').status_code == 400  # filtros só no padrao/surpresinha
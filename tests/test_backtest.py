@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+import backtest as bt
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+SORTEIOS = [para_mascara(d) for d in sorteios(300)]
+JOGOS = [para_mascara(d) for d in sorteios(37, semente=2)] + [SORTEIOS[10], SORTEIOS[11]]  # dois que já fizeram 15
+
+def maior_sequencia(pontos):
+    maior = atual = 0
+    for p in pontos:
+        atual = atual + 1 if p >= 11 else 0
+        maior = max(maior, atual)
+    return maior
+
+@pytest.mark.parametrize('bloco', [bt.TAMANHO_BLOCO, 5])
+def test_backtest_igual_a_forca_bruta(monkeypatch, bloco):
+    monkeypatch.setattr(bt, 'TAMANHO_BLOCO', bloco)
+    res = bt.backtest(JOGOS, SORTEIOS)
+    assert res['total_concursos'] == len(SORTEIOS)
+    for i, jogo in enumerate(JOGOS):
+        pontos = [(jogo & s).bit_count() for s in SORTEIOS]
+        assert res['histograma'][i].tolist() == [pontos.count(k) for k in range(16)]
+        assert res['premios'][i].tolist() == [pontos.count(k) for k in bt.FAIXAS_PREMIO]
+        assert res['melhor_sequencia'][i] == maior_sequencia(pontos)
+    assert res['histograma'][-2][15] >= 1
+
+def test_maior_sequencia_nao_passa_de_uma_linha_para_outra():
+    premiado = np.array([[0, 1, 1, 1], [1, 1, 0, 1], [0, 0, 0, 0]], dtype=bool)
+    assert bt._maior_sequencia(premiado).tolist() == [3, 2, 0]
+
+def test_sequencias_aleatorias():
+    rnd = random.Random(3)
+    premiado = np.array([[rnd.random() < 0.4 for _ in range(50)] for _ in range(20)])
+    assert bt._maior_sequencia(premiado).tolist() == [maior_sequencia([11 if p else 0 for p in linha]) for linha in premiado]
+
+def test_rota_simular_lote(app, cliente):
+    import app as modulo
+    jogos = [" ".join(map(str, d)) for d in sorteios(3, semente=5)]
+    r = cliente.post('/simular-lote', json={'jogos': jogos})
+    assert r.status_code == 200 and r.json['success'] and r.json['total_concursos'] == 60 and len(r.json['jogos']) == 3
+
+    muitos = jogos * (modulo.MAX_JOGOS_SIMULACAO // 3 + 1)
+    r = cliente.post('/simular-lote', json={'jogos': muitos})
+    assert r.status_code == 400 and not r.json['success']
+    assert cliente.post('/simular-lote', json={'jogos': 'tudo'}).status_code == 400
+
+    anonimo = app.test_client()
+    assert anonimo.post('/simular-lote', json={'jogos': jogos}).json['success']
+    r = anonimo.post('/simular-lote', json={'jogos': jogos * modulo.MAX_JOGOS_SIMULACAO_ANONIMO})
+    assert r.status_code == 401 and not r.json['success']
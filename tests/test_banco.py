@@ -0,0 +1,62 @@
+from flask import g
+from werkzeug.security import generate_password_hash
+
+import app as modulo
+import modelos
+from modelos import db, User, ResultadoLotofacil
+
+def app_producao(tmp_path, **config):
+    aplicacao = modulo.criar_app(dict({'TESTING': True, 'WTF_CSRF_ENABLED': False, 'BANCO_MODO': 'producao',
+                                       'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'producao.db'}"}, **config))
+    with aplicacao.app_context():
+        modelos.preparar_banco()
+        db.session.add(ResultadoLotofacil(concurso=1, data_sorteio='01/01/2020', dezenas=", ".join(f"{n:02d}" for n in range(1, 16))))
+        db.session.add(User(nome='Admin', email='admin@teste', senha=generate_password_hash('senha'), is_admin=True))
+        db.session.commit()
+    return aplicacao
+
+def pragmas(conexao, *nomes):
+    return [conexao.exec_driver_sql(f'PRAGMA {nome}').scalar() for nome in nomes]
+
+def test_pragmas_em_producao(tmp_path):
+    aplicacao = app_producao(tmp_path, BANCO_BUSY_TIMEOUT_MS=1234, BANCO_CACHE_MB=8)
+    with aplicacao.app_context():
+        with db.engine.connect() as con:
+            assert pragmas(con, 'journal_mode', 'busy_timeout', 'cache_size', 'synchronous', 'query_only') == ['wal', 1234, -8192, 1, 0]
+        with db.engines['leitura'].connect() as con:
+            assert pragmas(con, 'busy_timeout', 'query_only') == [1234, 1]
+
+def test_modo_simples_sem_pool_de_leitura(app, tmp_path):
+    app_producao(tmp_path)  # deixa o bind 'leitura' registrado no `db` do processo
+    assert 'leitura' not in app.config.get('SQLALCHEMY_BINDS', {})
+    with app.app_context():
+        modelos.preparar_banco()
+        with db.engine.connect() as con:
+            assert pragmas(con, 'journal_mode') == ['delete']
+
+def test_leituras_vao_para_o_pool_de_leitura(tmp_path):
+    aplicacao = app_producao(tmp_path)
+    with aplicacao.test_request_context('/'), aplicacao.app_context():
+        g.banco_leitura = True
+        leitura, principal = db.engines['leitura'], db.engine
+        consulta = db.select(ResultadoLotofacil)
+        assert db.session.get_bind(clause=consulta) is leitura
+        db.session.add(ResultadoLotofacil(concurso=2, data_sorteio='02/01/2020', dezenas=", ".join(f"{n:02d}" for n in range(2, 17))))
+        db.session.flush()  # escreveu: o resto da transação fica no principal (e enxerga o que escreveu)
+        assert db.session.get_bind(clause=consulta) is principal
+        assert db.session.execute(db.select(db.func.count()).select_from(ResultadoLotofacil)).scalar() == 2
+        db.session.commit()
+        assert db.session.get_bind(clause=consulta) is leitura  # transação nova volta para a leitura
+        g.banco_leitura = False
+        assert db.session.get_bind(clause=consulta) is principal
+
+def test_rotas_em_producao(tmp_path):
+    aplicacao = app_producao(tmp_path)
+    cliente = aplicacao.test_client()
+    assert cliente.get('/resultados').status_code == 200
+    cliente.post('/login', data={'email': 'admin@teste', 'senha': 'senha'})
+    assert cliente.post('/salvar-multiplos', json={'jogos': [list(range(1, 16))]}).get_json()['novos'] == 1
+
+def test_url_do_postgres():
+    assert modelos._url('postgres://u:s@h/b') == 'postgresql://u:s@h/b'
+    assert modelos._url('postgresql://u:s@h/b') == 'postgresql://u:s@h/b' and modelos._url(None) is None
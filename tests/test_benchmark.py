@@ -0,0 +1,18 @@
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_benchmark_roda_e_grava_todas_as_medidas(tmp_path):
+    saida = tmp_path / 'bench.json'
+    processo = subprocess.run([sys.executable, os.path.join(RAIZ, 'benchmark.py'), '--tamanhos', '40', '--jogos', '10', '--repeticoes', '1', '--saida', str(saida)],
+                              capture_output=True, text=True, cwd=tmp_path, timeout=300)
+    assert processo.returncode == 0, processo.stderr
+    resultado = json.loads(saida.read_text())
+    assert resultado['jogos_salvos'] == 10 and list(resultado['tamanhos']) == ['40']
+    medidas = resultado['tamanhos']['40']
+    assert {'rota_index', 'rota_gerar_pura', 'rota_api_replay_pura', 'fn_backtest_carteira', 'fn_otimizar_fechamento_18_14'} <= set(medidas)
+    for nome, medida in medidas.items():
+        if nome != 'preparo_s': assert 0 <= medida['p50_ms'] <= medida['p95_ms'], nome
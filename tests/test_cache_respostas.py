@@ -0,0 +1,76 @@
+import cache_respostas
+from cache_respostas import CacheRespostas
+import modelos
+from modelos import db, ResultadoLotofacil
+
+class Relogio:
+    def __init__(self): self.agora = 1000.0
+    def time(self): return self.agora
+
+def test_lru_e_ttl(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache_respostas, 'time', relogio)
+    cache = CacheRespostas(maximo=2, ttl=10)
+    cache.guardar('a', 1); cache.guardar('b', 2)
+    assert cache.obter('a') == 1  # 'a' passa a ser o mais recente
+    cache.guardar('c', 3)
+    assert len(cache) == 2 and cache.obter('b') is None and cache.obter('c') == 3
+    relogio.agora += 10
+    assert cache.obter('a') is None and len(cache) == 1
+    cache.guardar('d', 4, ttl=60); relogio.agora += 30
+    assert cache.obter('d') == 4
+    assert cache.consultas == {'memoria': 3, 'arquivo': 0, 'falta': 2}
+
+def test_obter_ou_calcular():
+    cache, chamadas = CacheRespostas(), []
+    calcular = lambda: chamadas.append(1) or {'x': 1}
+    assert cache.obter_ou_calcular('k', calcular) == cache.obter_ou_calcular('k', calcular) == {'x': 1}
+    assert len(chamadas) == 1
+
+def test_segundo_nivel_entre_processos(tmp_path, monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache_respostas, 'time', relogio)
+    arquivo = str(tmp_path / 'cache.db')
+    um, outro = CacheRespostas(ttl=10, arquivo=arquivo), CacheRespostas(ttl=10, arquivo=arquivo)
+    um.guardar('k', [1, 2, 3])
+    assert outro.obter('k') == [1, 2, 3] and outro.consultas['arquivo'] == 1
+    assert outro.obter('k') == [1, 2, 3] and outro.consultas['memoria'] == 1  # já subiu para a memória
+    relogio.agora += 10
+    assert CacheRespostas(arquivo=arquivo).obter('k') is None  # expirado também no arquivo
+    um.guardar('j', 1); um.limpar()
+    assert len(um) == 0 and outro.obter('j') is None
+
+def test_arquivo_com_problema_nao_derruba(tmp_path):
+    cache = CacheRespostas(arquivo=str(tmp_path / 'cache.db'))
+    cache.arquivo = str(tmp_path / 'nao' / 'existe.db')
+    cache.guardar('k', 1)
+    assert cache.obter('k') == 1
+
+def test_etag_e_versao_dos_resultados(app):
+    cliente = app.test_client()
+    primeira = cliente.get('/api/estatisticas/10')
+    etag = primeira.headers['ETag']
+    assert primeira.status_code == 200 and 'public' in primeira.headers['Cache-Control']
+    assert cliente.get('/api/estatisticas/10', headers={'If-None-Match': etag}).status_code == 304
+    assert cliente.get('/api/estatisticas/10').get_data() == primeira.get_data()
+    outra = cliente.get('/api/estatisticas/20')
+    assert outra.headers['ETag'] != etag
+
+    with app.app_context():
+        db.session.add(ResultadoLotofacil(concurso=61, data_sorteio='01/02/2020', dezenas=", ".join(f"{n:02d}" for n in range(1, 16))))
+        db.session.commit()
+    # antes da sincronização a janela é a antiga; a sincronização muda a versão de novo
+    intermediaria = cliente.get('/api/estatisticas/10', headers={'If-None-Match': etag})
+    assert intermediaria.status_code == 200 and intermediaria.get_json()['data'] == primeira.get_json()['data']
+    with app.app_context(): modelos.sincronizar_estatisticas()
+    nova = cliente.get('/api/estatisticas/10', headers={'If-None-Match': intermediaria.headers['ETag']})
+    assert nova.status_code == 200 and nova.headers['ETag'] != etag
+    assert nova.get_json()['data'] != primeira.get_json()['data']
+
+def test_pagina_privada_por_usuario(app, cliente):
+    cliente.get('/')  # a primeira visita cria o token CSRF da sessão, que entra na chave
+    logado = cliente.get('/')
+    assert 'private' in logado.headers['Cache-Control']
+    assert cliente.get('/', headers={'If-None-Match': logado.headers['ETag']}).status_code == 304
+    anonimo = app.test_client().get('/', headers={'If-None-Match': logado.headers['ETag']})
+    assert anonimo.status_code != 304
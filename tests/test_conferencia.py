@@ -0,0 +1,87 @@
+import random
+from datetime import datetime
+
+import numpy as np
+
+import backtest as bt
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+def test_acertos_premiados_igual_a_forca_bruta(monkeypatch):
+    monkeypatch.setattr(bt, 'TAMANHO_BLOCO', 7)
+    rnd = random.Random(4)
+    sorteados = [para_mascara(d) for d in sorteios(200)]
+    jogos = [para_mascara(d) for d in sorteios(30, semente=8)] + sorteados[50:60]
+    concursos, datas = list(range(1, 201)), [700_000 + c // 2 for c in range(1, 201)]
+    conferido = [rnd.randrange(0, 200) for _ in jogos]
+    criacao = [700_000 + rnd.randrange(0, 100) for _ in jogos]
+
+    j, s, a = bt.acertos_premiados(jogos, sorteados, conferido, criacao, concursos, datas)
+    obtidos = set(zip(j.tolist(), s.tolist(), a.tolist()))
+    esperados = {(i, k, (jogo & sorteados[k]).bit_count()) for i, jogo in enumerate(jogos) for k in range(200)
+                 if (jogo & sorteados[k]).bit_count() >= 11 and concursos[k] > conferido[i] and datas[k] >= criacao[i]}
+    assert obtidos == esperados and len(obtidos) == len(j)
+
+def test_acertos_premiados_sem_jogos():
+    j, s, a = bt.acertos_premiados([], [1, 2], [], [], [1, 2], [0, 0])
+    assert len(j) == len(s) == len(a) == 0
+
+def premiados_esperados(jogos, todos):
+    return {(i, c, len(set(jogo) & set(d))) for i, jogo in enumerate(jogos, 1) for c, d in enumerate(todos, 1) if len(set(jogo) & set(d)) >= 11}
+
+def test_conferencia_incremental(app, cliente):
+    import modelos
+    from modelos import db, JogoSalvo, AcertoJogo, ResultadoLotofacil
+    todos = sorteios(60)
+    jogos = [todos[0], todos[9], todos[20][:14] + [n for n in range(1, 26) if n not in todos[20]][:1]]
+    corpo = {'jogos': [", ".join(f"{n:02d}" for n in j) for j in jogos]}
+    assert cliente.post('/salvar-multiplos', json=corpo).json['novos'] == 3
+    with app.app_context():
+        assert {j.conferido_ate for j in JogoSalvo.query} == {60}  # salvar já confere
+        # como se os jogos fossem anteriores a todos os concursos (as datas da fixture são de 2020)
+        JogoSalvo.query.update({JogoSalvo.data_criacao: datetime(2019, 1, 1), JogoSalvo.conferido_ate: None}); db.session.commit()
+        modelos.conferir_carteiras()
+        gravados = lambda: {(a.jogo_id, a.concurso, a.acertos) for a in AcertoJogo.query}
+        assert gravados() == premiados_esperados(jogos, todos)
+        assert {j.conferido_ate for j in JogoSalvo.query} == {60}
+
+        # concurso novo: só ele é conferido
+        db.session.add(ResultadoLotofacil(concurso=61, data_sorteio='01/02/2020', dezenas=", ".join(f"{n:02d}" for n in jogos[1])))
+        db.session.commit()
+        assert modelos.conferir_carteiras() == 1
+        assert gravados() == premiados_esperados(jogos, todos + [jogos[1]])
+        assert modelos.conferir_carteiras() == 0
+
+    # ler a carteira não confere nada (só as escritas conferem)
+    with app.app_context():
+        db.session.add(ResultadoLotofacil(concurso=62, data_sorteio='02/02/2020', dezenas=", ".join(f"{n:02d}" for n in jogos[0])))
+        db.session.commit()
+    assert cliente.get('/meus-jogos').status_code == 200
+    with app.app_context():
+        assert {j.conferido_ate for j in JogoSalvo.query} == {61}
+
+def test_cada_grupo_so_le_o_que_nao_viu(app, cliente, monkeypatch):
+    import modelos
+    from modelos import db, JogoSalvo, AcertoJogo, ResultadoLotofacil
+    todos = sorteios(60)
+    jogos = [todos[3], todos[30], todos[59]]
+    assert cliente.post('/salvar-multiplos', json={'jogos': [", ".join(f"{n:02d}" for n in j) for j in jogos]}).json['novos'] == 3
+    with app.app_context():
+        JogoSalvo.query.update({JogoSalvo.data_criacao: datetime(2019, 1, 1)}); db.session.commit()
+        db.session.add(ResultadoLotofacil(concurso=61, data_sorteio='01/02/2020', dezenas=", ".join(f"{n:02d}" for n in jogos[0])))
+        # jogo ainda não conferido, de antes de todo o histórico
+        db.session.add(JogoSalvo(numeros=", ".join(f"{n:02d}" for n in todos[10]), tipo='Manual', user_id=1, data_criacao=datetime(2019, 1, 1)))
+        db.session.commit()
+
+        chamadas, original = [], modelos.acertos_premiados
+        def contar(jogos_, sorteios_, *resto):
+            chamadas.append((len(jogos_), len(sorteios_)))
+            return original(jogos_, sorteios_, *resto)
+        monkeypatch.setattr(modelos, 'acertos_premiados', contar)
+        modelos.conferir_carteiras()
+        # os 3 já conferidos leem só o 61; só o jogo novo lê o histórico inteiro
+        assert sorted(chamadas) == [(1, 61), (3, 1)]
+        # os 3 primeiros foram salvos (e conferidos) hoje: só o 61 conta para eles
+        esperados = {p for p in premiados_esperados(jogos + [todos[10]], todos + [jogos[0]]) if p[0] == 4 or p[1] == 61}
+        assert {(a.jogo_id, a.concurso, a.acertos) for a in AcertoJogo.query} == esperados
+        assert {j.conferido_ate for j in JogoSalvo.query} == {61}
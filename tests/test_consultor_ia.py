@@ -0,0 +1,65 @@
+import pytest
+
+from consultor_ia import ConsultorIA, ClienteFalso, Ocupado, normalizar_pergunta
+
+def texto(pedacos):
+    return "".join(pedacos)
+
+def test_normalizar_pergunta():
+    assert normalizar_pergunta("Qual a MELHOR dezena?") == normalizar_pergunta("qual   a melhor dezena") == "qual a melhor dezena"
+    assert normalizar_pergunta("Ímpares, primos...") == "impares primos"
+
+def test_responde_em_pedacos_e_guarda_no_cache():
+    cliente = ClienteFalso()
+    consultor = ConsultorIA(cliente)
+    pedacos = list(consultor.perguntar("Qual a melhor dezena?", "contexto", "v1", "ana"))
+    assert len(pedacos) > 1 and texto(pedacos).startswith("Resposta de teste para: Qual a melhor dezena?")
+    # mesma pergunta normalizada e mesmo contexto: sai do cache, sem chamar o modelo
+    assert texto(consultor.perguntar("qual a MELHOR dezena", "contexto", "v1", "bia")) == texto(pedacos)
+    assert cliente.chamadas == 1
+    # concurso novo (outra chave de contexto): pergunta de novo
+    list(consultor.perguntar("Qual a melhor dezena?", "contexto", "v2", "ana"))
+    assert cliente.chamadas == 2
+
+def test_limite_por_usuario():
+    consultor = ConsultorIA(ClienteFalso(atraso=0.05), por_usuario=1)
+    primeira = consultor.perguntar("uma pergunta longa de várias palavras", "", "v1", "ana")
+    with pytest.raises(Ocupado, match="anterior"):
+        consultor.perguntar("outra", "", "v1", "ana")
+    outra = consultor.perguntar("outra", "", "v1", "bia")  # outro usuário tem a própria vaga
+    texto(primeira); texto(outra)
+    list(consultor.perguntar("mais uma", "", "v1", "ana"))  # a vaga volta quando a chamada termina
+
+def test_pool_cheio():
+    consultor = ConsultorIA(ClienteFalso(atraso=0.05), workers=1, fila=0, por_usuario=5)
+    primeira = consultor.perguntar("uma pergunta longa de várias palavras", "", "v1", "ana")
+    with pytest.raises(Ocupado, match="ocupado"):
+        consultor.perguntar("outra", "", "v1", "bia")
+    texto(primeira)
+
+def test_tempo_esgotado_nao_vai_para_o_cache():
+    situacoes = []
+    cliente = ClienteFalso(atraso=0.2)
+    consultor = ConsultorIA(cliente, timeout=0.3, ao_terminar=lambda segundos, situacao: situacoes.append(situacao))
+    resposta = texto(consultor.perguntar("uma pergunta longa de várias palavras", "", "v1", "ana"))
+    assert resposta.endswith("(Tempo esgotado. Tente perguntar de novo.)")
+    consultor._executor.shutdown(wait=True)  # a chamada abandonada termina no próximo pedaço
+    assert situacoes == ['cancelada']
+    assert len(consultor.cache) == 0
+
+def test_erro_do_modelo():
+    class ClienteQuebrado(ClienteFalso):
+        def generate_content_stream(self, model, contents):
+            raise RuntimeError("fora do ar")
+    consultor = ConsultorIA(ClienteQuebrado())
+    assert texto(consultor.perguntar("oi", "", "v1", "ana")) == "Erro na IA. Tente novamente."
+    list(consultor.perguntar("oi", "", "v1", "ana"))  # a vaga foi devolvida
+
+def test_rota_com_cliente_falso(app, cliente, monkeypatch):
+    import app as modulo
+    monkeypatch.setenv('IA_CLIENTE_FALSO', '1')
+    monkeypatch.setattr(modulo, '_consultor', {})
+    resposta = cliente.post('/ia-chat', json={'msg': 'Quais as mais atrasadas?'})
+    assert resposta.status_code == 200 and resposta.mimetype == 'text/plain'
+    assert resposta.get_data(as_text=True).startswith("Resposta de teste para: Quais as mais atrasadas?")
+    assert cliente.post('/ia-chat', json={'msg': '  '}).json == {'resposta': "Digite uma pergunta."}
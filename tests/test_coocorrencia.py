@@ -0,0 +1,71 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from coocorrencia import Coocorrencia, contar, posicoes_trios, TRIPLAS, PASSO_MARCOS
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+SORTEIOS = sorteios(300, semente=12)
+MASCARAS = [para_mascara(s) for s in SORTEIOS]
+
+def test_contar_igual_a_contagem_direta():
+    pares, trios = contar(MASCARAS[:50])
+    for a in range(1, 26):
+        for b in range(1, 26):
+            assert pares[a - 1, b - 1] == sum(a in s and b in s for s in SORTEIOS[:50])
+    for i in (0, 777, 2299):
+        assert trios[i] == sum(set(TRIPLAS[i] + 1) <= set(s) for s in SORTEIOS[:50])
+
+def test_posicoes_trios():
+    dezenas = [3, 9, 17, 25]
+    assert [tuple(TRIPLAS[i] + 1) for i in posicoes_trios(dezenas)] == list(combinations(dezenas, 3))
+
+@pytest.mark.parametrize('janela', [0, 1, 5, PASSO_MARCOS - 1, PASSO_MARCOS, PASSO_MARCOS + 1, 2 * PASSO_MARCOS, 199, 299, 300, 1000])
+def test_contagens_da_janela_igual_a_recontar(janela):
+    cooc = Coocorrencia()
+    cooc.sincronizar(MASCARAS)
+    qtd, pares, trios = cooc.contagens(janela)
+    fatia = MASCARAS[-janela:] if 0 < janela < len(MASCARAS) else MASCARAS
+    esperado_pares, esperado_trios = contar(fatia)
+    assert qtd == len(fatia)
+    assert np.array_equal(pares, esperado_pares) and np.array_equal(trios, esperado_trios)
+
+def test_incremental_igual_a_carga_completa():
+    aos_poucos, de_uma_vez = Coocorrencia(), Coocorrencia()
+    for n in range(1, len(MASCARAS) + 1, 7): aos_poucos.sincronizar(MASCARAS[:n])  # fim a fim, sempre pelo caminho O(1)
+    aos_poucos.sincronizar(MASCARAS)
+    de_uma_vez.sincronizar(MASCARAS)
+    for janela in (0, 10, 64, 150):
+        assert all(np.array_equal(a, b) for a, b in zip(aos_poucos.contagens(janela), de_uma_vez.contagens(janela)))
+    assert len(aos_poucos.marcos) == len(de_uma_vez.marcos) == len(MASCARAS) // PASSO_MARCOS + 1
+
+def test_mudanca_no_meio_reconta():
+    cooc = Coocorrencia()
+    cooc.sincronizar(MASCARAS)
+    corrigidas = MASCARAS[:100] + MASCARAS[101:]  # um concurso excluído
+    cooc.sincronizar(corrigidas)
+    assert np.array_equal(cooc.contagens(120)[1], contar(corrigidas[-120:])[0])
+    cooc.sincronizar([])
+    assert len(cooc) == 0 and cooc.contagens(10)[0] == 0
+
+def test_pesos_e_resumo():
+    cooc = Coocorrencia()
+    cooc.sincronizar(MASCARAS)
+    pesos = cooc.pesos(100)
+    assert np.allclose(pesos, pesos.T) and not np.diag(pesos).any()
+    resumo = cooc.resumo(janela=100, top=3, trios=2, dezena=7, matriz=True)
+    pares = contar(MASCARAS[-100:])[0]
+    assert resumo['concursos'] == 100 and resumo['matriz'] == pares.tolist()
+    forte = resumo['pares_fortes'][0]
+    assert forte['vezes'] == max(pares[a, b] for a in range(25) for b in range(a + 1, 25))
+    assert resumo['parceiras']['aparicoes'] == sum(7 in s for s in SORTEIOS[-100:])
+    assert [p['vezes'] for p in resumo['parceiras']['lista']] == sorted((p['vezes'] for p in resumo['parceiras']['lista']), reverse=True)
+
+def test_rota(app):
+    resposta = app.test_client().get('/api/v1/coocorrencia?janela=20&dezena=5&top=2')
+    dados = resposta.get_json()
+    historico = [set(s) for s in sorteios(60)][-20:]  # os da fixture `app`
+    assert resposta.status_code == 200 and dados['concursos'] == 20
+    assert dados['parceiras']['aparicoes'] == sum(5 in s for s in historico)
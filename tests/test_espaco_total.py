@@ -0,0 +1,100 @@
+from math import comb
+
+import numpy as np
+import pytest
+
+import espaco_total
+from estatisticas import PRIMOS, MOLDURA
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+def dezenas(mascara):
+    return [n for n in range(1, 26) if mascara >> (n - 1) & 1]
+
+@pytest.fixture(scope='module')
+def pasta(tmp_path_factory):
+    destino = tmp_path_factory.mktemp('espaco')
+    pares = [(c, para_mascara(s)) for c, s in enumerate(sorteios(30, semente=4), 1)]
+    espaco_total.construir(str(destino), pares)
+    return str(destino), pares
+
+def test_todas_mascaras():
+    mascaras = espaco_total.todas_mascaras()
+    assert len(mascaras) == comb(25, 15) == espaco_total.TOTAL_JOGOS
+    assert (np.diff(mascaras.astype(np.int64)) > 0).all()
+    assert set(np.unique(espaco_total._popcount(mascaras)).tolist()) == {15}
+
+def test_linhas_iguais_ao_calculo_direto(pasta):
+    caminho, pares = pasta
+    et = espaco_total.EspacoTotal(caminho).abrir(espaco_total.ler_meta(caminho))
+    jogos = sorteios(200, semente=9) + [sorteios(1, semente=4)[0]]
+    for jogo in jogos:
+        linha = espaco_total.como_dict(et.linha(para_mascara(jogo)))
+        acertos = [len(set(jogo) & set(dezenas(m))) for _, m in pares]
+        maior = max(len(bloco) for bloco in ''.join('1' if n in jogo else ' ' for n in range(1, 26)).split())
+        assert linha == {'dezenas': sorted(jogo), 'soma': sum(jogo), 'impares': sum(n % 2 for n in jogo),
+                         'primos': len(set(jogo) & PRIMOS), 'moldura': len(set(jogo) & MOLDURA), 'consecutivas': maior,
+                         'acertos': {str(f): acertos.count(f) for f in espaco_total.FAIXAS}}
+    assert et.linha(para_mascara(list(range(1, 15)))) is None
+
+def test_filtrar(pasta):
+    caminho, pares = pasta
+    et = espaco_total.EspacoTotal(caminho).abrir(espaco_total.ler_meta(caminho))
+    ultimo = pares[-1][1]
+    posicoes = et.filtrar({'soma': (150, 160), 'repetidas': (9, 9)}, faixa=11, vezes_min=2, ultimo_mascara=ultimo)
+    assert len(posicoes)
+    for linha in et.tabela[posicoes[::max(1, len(posicoes) // 200)]]:
+        jogo = dezenas(int(linha['mascara']))
+        assert 150 <= sum(jogo) <= 160 and len(set(jogo) & set(dezenas(ultimo))) == 9
+        assert sum(len(set(jogo) & set(dezenas(m))) == 11 for _, m in pares) >= 2
+    assert len(et.filtrar({'soma': (120, 120)})) == 1  # só 1..15
+
+def test_atualizar_igual_a_construir_de_novo(tmp_path, pasta):
+    caminho, pares = pasta
+    # sai o concurso 1, o 2 muda de resultado e entra o 31
+    novo_2, novo_31 = (para_mascara(s) for s in sorteios(2, semente=77))
+    alterados = [(c, m) for c, m in pares if c > 2] + [(2, novo_2), (31, novo_31)]
+    espaco_total.construir(str(tmp_path), pares[:5])  # versão antiga, bem diferente
+    meta = espaco_total.atualizar(str(tmp_path), alterados)
+    assert sorted(map(int, meta['concursos'])) == sorted(c for c, _ in alterados)
+    referencia = tmp_path / 'referencia'; referencia.mkdir()
+    espaco_total.construir(str(referencia), alterados)
+    atualizado = np.load(espaco_total.caminhos(str(tmp_path))[0])
+    assert np.array_equal(atualizado, np.load(espaco_total.caminhos(str(referencia))[0]))
+    assert espaco_total.atualizar(str(tmp_path), alterados)['versao'] == meta['versao']  # nada a fazer
+
+def test_atualizar_sem_arquivo(tmp_path):
+    assert espaco_total.atualizar(str(tmp_path), [(1, para_mascara(list(range(1, 16))))]) is None
+
+def test_leitor_reabre_versao_nova(tmp_path):
+    pares = [(1, para_mascara(list(range(1, 16))))]
+    meta = espaco_total.construir(str(tmp_path), pares)
+    et = espaco_total.EspacoTotal(str(tmp_path)).abrir(meta)
+    assert et.qtd_concursos == 1
+    meta = espaco_total.atualizar(str(tmp_path), pares + [(2, para_mascara(list(range(11, 26))))])
+    assert et.abrir(meta).qtd_concursos == 2 and et.versao == meta['versao']
+    assert et.linha(para_mascara(list(range(11, 26))))['acertos'][-1] == 1
+
+def test_quem_ja_abriu_continua_na_versao_dele(tmp_path):
+    jogo = list(range(1, 16))
+    meta = espaco_total.construir(str(tmp_path), [(1, para_mascara(jogo))])
+    et = espaco_total.EspacoTotal(str(tmp_path)).abrir(meta)
+    espaco_total.atualizar(str(tmp_path), [(1, para_mascara(jogo)), (2, para_mascara(jogo))])
+    # o arquivo novo entra por troca: o mapa antigo não vê contagens pela metade
+    assert et.linha(para_mascara(jogo))['acertos'][-1] == 1
+    assert et.atual().linha(para_mascara(jogo))['acertos'][-1] == 2 and et.qtd_concursos == 2
+
+def test_consulta_nao_aplica_o_delta_e_o_admin_aplica(app, cliente):
+    import modelos
+    from modelos import db, ResultadoLotofacil
+    assert cliente.get('/api/v1/espaco?dezenas=' + ','.join(map(str, range(1, 16)))).status_code == 503
+    with app.app_context():
+        idx = modelos.obter_indice()
+        espaco_total.construir(modelos.PASTA_ESPACO, list(zip(idx.concursos, idx.mascaras)))
+        db.session.add(ResultadoLotofacil(concurso=61, data_sorteio='01/02/2020', dezenas=', '.join(f'{n:02d}' for n in range(1, 16))))
+        db.session.commit()
+    url = '/api/v1/espaco?dezenas=' + ','.join(map(str, range(1, 16)))
+    assert cliente.get(url).json['concursos'] == 60  # a leitura não grava
+    cliente.post('/admin/novo-resultado', data={'concurso': 62, 'data': '02/02/2020', 'dezenas': ' '.join(map(str, range(1, 16)))})
+    resposta = cliente.get(url).json
+    assert resposta['concursos'] == 62 and resposta['jogo']['acertos']['15'] >= 2
@@ -0,0 +1,60 @@
+import random
+
+import estatisticas as est
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+SORTEIOS = sorteios(120)
+
+def prefixos(lista):
+    linhas = [est.linha_vazia()]
+    for dezenas in lista: linhas.append(est.linha_seguinte(linhas[-1], para_mascara(dezenas)))
+    return linhas
+
+def direto(lista):
+    """A mesma janela contada concurso a concurso."""
+    frequencias = [sum(n in d for d in lista) for n in range(1, 26)]
+    atraso = [next((i for i, d in enumerate(reversed(lista)) if n in d), None) for n in range(1, 26)]
+    media = lambda conjunto: round(sum(len(set(d) & conjunto) for d in lista) / len(lista), 2)
+    return frequencias, atraso, media(set(range(1, 26, 2))), media(est.PRIMOS), media(est.MOLDURA)
+
+def test_janela_igual_a_contagem_direta():
+    linhas, rnd = prefixos(SORTEIOS), random.Random(5)
+    for _ in range(30):
+        inicio = rnd.randrange(0, 119); fim = rnd.randrange(inicio + 1, 121)
+        janela, trecho = est.janela(linhas[fim], linhas[inicio]), SORTEIOS[inicio:fim]
+        frequencias, atraso, impares, primos, moldura = direto(trecho)
+        assert janela['concursos'] == fim - inicio
+        assert janela['frequencias'] == frequencias
+        assert (janela['media_impares'], janela['media_primos'], janela['media_moldura']) == (impares, primos, moldura)
+        # o atraso conta do fim da janela para trás em todo o histórico (dezena que nunca saiu: desde o início)
+        assert janela['atraso'] == [fim if a is None else a for a in direto(SORTEIOS[:fim])[1]]
+
+def test_janela_vazia():
+    vazia = est.janela(est.linha_vazia(), est.linha_vazia())
+    assert vazia['concursos'] == 0 and vazia['media_impares'] == 0 and vazia['frequencias'] == [0] * 25
+
+def test_estatisticas_do_banco(app):
+    import modelos
+    from modelos import db, ResultadoLotofacil
+    todos = sorteios(60)
+    with app.app_context():
+        for limite in (10, 25, 0, 500):
+            janela = modelos.estatisticas_janela(limite)
+            trecho = todos[-limite:] if limite else todos
+            assert janela['concursos'] == len(trecho)
+            assert janela['frequencias'] == direto(trecho)[0]
+        # concurso novo: a tabela de prefixos ganha uma linha e a janela anda
+        novo = sorteios(1, semente=9)[0]
+        db.session.add(ResultadoLotofacil(concurso=61, data_sorteio='01/01/2021', dezenas=", ".join(f"{n:02d}" for n in novo)))
+        db.session.commit()
+        # a leitura não sincroniza: até quem grava resultados sincronizar, vale a última janela
+        linhas = modelos.EstatisticaConcurso.query.count()
+        assert modelos.estatisticas_janela(10)['frequencias'] == direto(todos[-10:])[0]
+        assert modelos.EstatisticaConcurso.query.count() == linhas
+        modelos.sincronizar_estatisticas()
+        assert modelos.estatisticas_janela(10)['frequencias'] == direto(todos[-9:] + [novo])[0]
+        # concurso do meio apagado: recalcula dali em diante
+        db.session.delete(ResultadoLotofacil.query.filter_by(concurso=30).one()); db.session.commit()
+        modelos.sincronizar_estatisticas()
+        assert modelos.estatisticas_janela(0)['frequencias'] == direto(todos[:29] + todos[30:] + [novo])[0]
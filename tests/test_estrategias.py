@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+import estrategias as est
+from indice_sorteios import para_mascara, de_mascara
+
+ULTIMO = [1, 2, 3, 5, 7, 8, 10, 12, 14, 15, 17, 19, 21, 23, 25]
+FREQUENCIAS = [(n * 7) % 11 for n in range(1, 26)]
+
+def snapshot():
+    return est.montar_snapshot(100, para_mascara(ULTIMO), FREQUENCIAS)
+
+def valido(dezenas):
+    return len(dezenas) == 15 and len(set(dezenas)) == 15 and set(dezenas) <= est.TODAS and list(dezenas) == sorted(dezenas)
+
+def test_pura_deterministica():
+    fixas, jogos = est.gerar_pura(snapshot())
+    ranking = sorted(range(1, 26), key=lambda n: (FREQUENCIAS[n - 1], n in ULTIMO, n), reverse=True)
+    assert fixas == tuple(sorted(ranking[:7]))
+    assert len(jogos) == 3 and all(valido(d) and set(fixas) <= set(d) for _, _, d in jogos)
+    assert est.gerar_pura(snapshot()) == (fixas, jogos)
+
+def test_padrao():
+    jogos = est.gerar_padrao(snapshot(), [4, 9, 16], qtd_jogos=6, rnd=random.Random(1))
+    assert len(jogos) == 6 and [t for _, t, _ in jogos] == [f'Estratégia Padrão {l}' for l in 'ABCDEF']
+    assert all(valido(d) and {4, 9, 16} <= set(d) for _, _, d in jogos)
+    assert jogos == est.gerar_padrao(snapshot(), [4, 9, 16], qtd_jogos=6, rnd=random.Random(1))
+    for fixos in ([], list(range(1, 16)), [0, 3]):
+        with pytest.raises(ValueError):
+            est.gerar_padrao(snapshot(), fixos)
+
+def test_metodo_25():
+    ausentes = sorted(est.TODAS - set(ULTIMO))
+    jogos = est.gerar_metodo_25(snapshot(), ULTIMO, ULTIMO[:3], ausentes[:2], rnd=random.Random(2))
+    assert len(jogos) == 4
+    for _, _, d in jogos:
+        assert valido(d) and set(ULTIMO[:3] + ausentes[:2]) <= set(d)
+        assert len(set(d) & set(ULTIMO)) == 9 and len(set(d) - set(ULTIMO)) == 6
+    # os 4 jogos cruzam dois grupos de cada lado: cada dezena variável aparece em exatamente 2
+    contagem = {n: sum(n in d for _, _, d in jogos) for n in est.TODAS - set(ULTIMO[:3] + ausentes[:2])}
+    assert set(contagem.values()) == {2}
+    with pytest.raises(ValueError):
+        est.gerar_metodo_25(snapshot(), ULTIMO, ULTIMO[:2], ausentes[:2])
+
+def test_surpresinha_e_rotulos():
+    jogos = est.gerar_surpresinha(snapshot(), qtd_jogos=28, rnd=random.Random(3))
+    assert all(valido(d) for _, _, d in jogos)
+    assert jogos[0][0] == 'Surpresinha A 🎲' and jogos[26][1] == 'Surpresinha #27'
+
+def test_snapshot_volta_para_as_dezenas():
+    assert de_mascara(snapshot()['ultimo']) == ULTIMO and snapshot()['frequencias'] == tuple(FREQUENCIAS)
@@ -0,0 +1,64 @@
+import csv
+import io
+import os
+
+import app as modulo
+import exportacao
+from modelos import db, User, JogoSalvo, ResultadoLotofacil
+from conftest import sorteios
+
+JOGOS = sorteios(1203, semente=5)  # passa de dois lotes de 500 linhas do CSV
+
+def salvar_carteira(app, jogos=JOGOS):
+    with app.app_context():
+        admin = User.query.filter_by(email='admin@teste').one()
+        db.session.add_all(JogoSalvo(numeros=", ".join(f"{n:02d}" for n in j), tipo='Teste', user_id=admin.id) for j in jogos)
+        db.session.commit()
+        ultimo = ResultadoLotofacil.query.filter_by(concurso=60).one()
+        return admin.id, {int(n) for n in ultimo.dezenas.split(', ')}
+
+def test_csv_em_streaming_com_acertos(app, cliente):
+    _, ultimo = salvar_carteira(app)
+    resposta = cliente.get('/exportar/csv?concurso=ultimo')
+    assert resposta.is_streamed and resposta.mimetype == 'text/csv'
+    linhas = list(csv.reader(io.StringIO(resposta.get_data(as_text=True)), delimiter=';'))
+    assert linhas[0] == ["Data", "Estratégia", "Dezenas", "Acertos 60"]
+    assert [l[2] for l in linhas[1:]] == [", ".join(f"{n:02d}" for n in j) for j in JOGOS]
+    assert [int(l[3]) for l in linhas[1:]] == [len(set(j) & ultimo) for j in JOGOS]
+
+def test_mascara_vazia_cai_no_texto(app):
+    user_id, ultimo = salvar_carteira(app, JOGOS[:5])
+    with app.app_context():
+        db.session.execute(JogoSalvo.__table__.update().values(mascara=None)); db.session.commit()
+        alvo = sum(1 << (n - 1) for n in ultimo)
+        assert [l[3] for l in exportacao.linhas_exportacao(user_id, alvo, lote=2)] == [len(set(j) & ultimo) for j in JOGOS[:5]]
+
+def test_excel_direto(app, cliente):
+    from openpyxl import load_workbook
+    salvar_carteira(app, JOGOS[:30])
+    resposta = cliente.get('/exportar/excel')
+    aba = load_workbook(io.BytesIO(resposta.get_data())).active
+    linhas = list(aba.values)
+    assert linhas[0] == ("Data", "Estratégia", "Dezenas") and len(linhas) == 31
+    assert linhas[1][2] == ", ".join(f"{n:02d}" for n in JOGOS[0])
+
+def test_pdf_limitado(app, cliente, monkeypatch):
+    salvar_carteira(app, JOGOS[:10])
+    assert cliente.get('/exportar/pdf').data.startswith(b'%PDF')
+    monkeypatch.setattr(exportacao, 'MAX_JOGOS_PDF', 9)
+    resposta = cliente.get('/exportar/pdf', follow_redirects=True)
+    assert 'PDF vai até 9 jogos' in resposta.get_data(as_text=True)
+
+def test_carteira_grande_vai_para_a_fila(app, cliente, monkeypatch):
+    from openpyxl import load_workbook
+    salvar_carteira(app, JOGOS[:40])
+    monkeypatch.setattr(modulo, 'EXPORTACAO_DIRETA', 20)
+    resposta = cliente.get('/exportar/excel?concurso=60', follow_redirects=True)
+    assert 'segundo plano' in resposta.get_data(as_text=True)
+    tarefa = modulo.fila.pegar_proxima()
+    assert tarefa['tipo'] == 'exportar' and tarefa['parametros']['colunas'][-1] == 'Acertos 60'
+    modulo.fila.executar(tarefa, app)
+    pronta = modulo.fila.obter(tarefa['id'])
+    assert pronta['situacao'] == 'concluida', pronta['mensagem']
+    aba = load_workbook(os.path.join(modulo.fila.pasta_da(tarefa['id']), pronta['arquivo'])).active
+    assert len(list(aba.values)) == 41
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+from werkzeug.security import generate_password_hash
+
+import app as modulo
+from modelos import db, User, ResultadoLotofacil
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def carregados_depois_de(codigo, tmp_path):
+    """Roda `codigo` num processo novo (banco e fila temporários) e devolve os módulos carregados."""
+    ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'frio.db'}", TAREFAS_ARQUIVO=str(tmp_path / 'fila.db'), TAREFAS_DIR=str(tmp_path / 'fila'))
+    saida = subprocess.run([sys.executable, '-c', codigo + '; import sys, json; print(json.dumps(sorted(sys.modules)))'],
+                           capture_output=True, text=True, cwd=RAIZ, env=ambiente, check=True)
+    return set(json.loads(saida.stdout.splitlines()[-1]))
+
+def test_app_sobe_sem_modulos_pesados(tmp_path):
+    carregados = carregados_depois_de('import app', tmp_path)
+    assert 'app' in carregados and not carregados & set(modulo.MODULOS_PESADOS) and 'google' not in carregados
+    assert not os.path.exists(tmp_path / 'fila.db')  # a fila só nasce na primeira tarefa
+
+def test_importadores_nao_carregam_o_app(tmp_path):
+    carregados = carregados_depois_de('import importar_resultados, importar_excel', tmp_path)
+    assert not carregados & {'app', 'flask_wtf', 'pandas', 'openpyxl'}
+
+def test_relatorio_de_inicializacao(app):
+    relatorio = app.extensions['inicializacao']
+    assert relatorio['importacoes'] >= 0 and relatorio['criar_app'] >= 0 and isinstance(relatorio['pesados_carregados'], list)
+
+def test_apps_independentes(app, tmp_path):
+    outro = modulo.criar_app({'TESTING': True, 'WTF_CSRF_ENABLED': False, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'outro.db'}"})
+    with outro.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(User(nome='Outro', email='outro@teste', senha=generate_password_hash('senha')))
+        db.session.commit()
+        assert ResultadoLotofacil.query.count() == 0
+    with app.app_context():
+        assert ResultadoLotofacil.query.count() == 60 and User.query.filter_by(email='outro@teste').first() is None
+    assert 'rotas.index' in {regra.endpoint for regra in outro.url_map.iter_rules()}
+    cliente = outro.test_client()
+    assert cliente.post('/login', data={'email': 'outro@teste', 'senha': 'senha'}).status_code == 302
+    assert cliente.get('/meus-jogos').status_code == 200
@@ -0,0 +1,69 @@
+from itertools import combinations
+
+import pytest
+
+import fechamento_garantia as fg
+
+def cobre_tudo(tamanho_pool, garantia, condicao, mascaras):
+    """Força bruta: todo cenário de `condicao` sorteadas dentro do pool tem um jogo com `garantia` acertos."""
+    cenarios = [sum(1 << p for p in c) for c in combinations(range(tamanho_pool), condicao)]
+    return all(any((c & m).bit_count() >= garantia for m in mascaras) for c in cenarios)
+
+@pytest.mark.parametrize('tamanho_pool, garantia, condicao', [(17, 14, 15), (18, 13, 14), (16, 11, 12), (16, 15, 15)])
+def test_desenho_cobre_todos_os_cenarios(tamanho_pool, garantia, condicao):
+    mascaras = fg.otimizar_fechamento(tamanho_pool, garantia, condicao)
+    assert all(m.bit_count() == fg.TAMANHO_JOGO and m < 1 << tamanho_pool for m in mascaras)
+    assert cobre_tudo(tamanho_pool, garantia, condicao, mascaras)
+
+def test_sem_jogos_redundantes():
+    mascaras = fg.otimizar_fechamento(18, 14, 15)
+    for i in range(len(mascaras)):
+        assert not cobre_tudo(18, 14, 15, mascaras[:i] + mascaras[i + 1:])
+
+def test_bem_menor_que_o_fechamento_completo():
+    assert len(fg.otimizar_fechamento(18, 14, 15)) < 816 // 3
+
+def test_determinista_e_com_progresso():
+    chamadas = []
+    mascaras = fg.otimizar_fechamento(17, 14, 15, progresso=lambda feitos, total: chamadas.append((feitos, total)))
+    assert mascaras == fg.otimizar_fechamento(17, 14, 15)
+    assert chamadas[-1] == (136, 136) and [f for f, _ in chamadas] == sorted(f for f, _ in chamadas)
+
+def test_aplicar_desenho():
+    assert fg.aplicar_desenho([25, 3, 7, 3], [0b101, 0b110]) == [[3, 25], [7, 25]]
+
+def test_validar_garantia():
+    assert fg.validar_garantia(17, 14, 15) is None
+    assert fg.validar_garantia(14, 11, 15)
+    assert fg.validar_garantia(17, 16, 15)
+    assert fg.validar_garantia(25, 11, 13)  # cenários demais
+    with pytest.raises(ValueError):
+        fg.otimizar_fechamento(15, 15, 15)
+
+def test_trabalho_estimado_cresce_com_o_pool():
+    estimativas = [fg.trabalho_estimado(n, 14, 15) for n in range(16, 26)]
+    assert estimativas == sorted(estimativas)
+    assert fg.trabalho_estimado(20, 14, 15) <= fg.LIMITE_TRABALHO_DIRETO < fg.trabalho_estimado(21, 14, 15)
+    assert fg.trabalho_estimado(23, 14, 15) <= fg.LIMITE_TRABALHO_FILA < fg.trabalho_estimado(25, 14, 15)
+
+def test_rota_exige_login_para_desenho_novo(app, cliente):
+    url = '/fechamento-garantia?pool=' + ','.join(map(str, range(3, 21))) + '&garantia=14&condicao=15'
+    assert app.test_client().get(url).status_code == 401
+    resposta = cliente.get(url).json
+    assert resposta['success'] and not resposta['em_cache'] and resposta['numeros_base'] == list(range(3, 21))
+    assert cobre_tudo(18, 14, 15, [sum(1 << (n - 3) for n in jogo) for jogo in resposta['jogos']])
+    # desenho em cache: serve para qualquer pool de 18 dezenas, com ou sem login
+    outro = app.test_client().get('/fechamento-garantia?pool=' + ','.join(map(str, range(8, 26))) + '&garantia=14&condicao=15').json
+    assert outro['em_cache'] and outro['total_jogos'] == resposta['total_jogos']
+
+def test_rota_recusa_desenho_grande_demais(cliente):
+    resposta = cliente.get('/fechamento-garantia?pool=' + ','.join(map(str, range(1, 26))) + '&garantia=14&condicao=15')
+    assert resposta.status_code == 422 and 'desenhar-fechamento' in resposta.json['message']
+
+def test_linha_de_comando(app):
+    from modelos import DesenhoFechamento
+    saida = app.test_cli_runner().invoke(args=['desenhar-fechamento', '17', '13', '14']).output
+    assert 'Desenho pronto' in saida
+    with app.app_context(): desenho = DesenhoFechamento.query.filter_by(tamanho_pool=17, garantia=13, condicao=14).one()
+    assert cobre_tudo(17, 13, 14, [int(m) for m in desenho.mascaras.split(',')])
+    assert 'já existe' in app.test_cli_runner().invoke(args=['desenhar-fechamento', '17', '13', '14']).output
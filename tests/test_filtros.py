@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import estrategias as est
+from estatisticas import PRIMOS, MOLDURA
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+ULTIMO = sorteios(1, semente=6)[0]
+
+def caracteristicas_python(jogo):
+    maior = atual = 1
+    for a, b in zip(jogo, jogo[1:]):
+        atual = atual + 1 if b == a + 1 else 1
+        maior = max(maior, atual)
+    return {'soma': sum(jogo), 'impares': sum(n % 2 for n in jogo), 'primos': len(set(jogo) & PRIMOS),
+            'moldura': len(set(jogo) & MOLDURA), 'repetidas': len(set(jogo) & set(ULTIMO)), 'consecutivas': maior}
+
+def test_caracteristicas_iguais_ao_calculo_direto():
+    jogos = np.array(sorteios(300, semente=11), dtype=np.uint8)
+    calculadas = est.caracteristicas(jogos, para_mascara(ULTIMO))
+    for i, jogo in enumerate(jogos.tolist()):
+        assert {k: int(v[i]) for k, v in calculadas.items()} == caracteristicas_python(jogo)
+
+def test_gerar_filtrado_respeita_filtros_e_fixos():
+    filtros = {'soma': (180, 210), 'impares': (7, 8), 'repetidas': (8, 10), 'consecutivas': (1, 4)}
+    snapshot = est.montar_snapshot(1, para_mascara(ULTIMO), [0] * 25)
+    resultado = est.gerar_filtrado(snapshot, fixos=[2, 13], qtd=300, filtros=filtros, rng=np.random.default_rng(3), minimo_fixos=1)
+    jogos = resultado['jogos'].tolist()
+    assert resultado['completo'] and len(jogos) == 300 and resultado['examinados'] >= 300
+    assert len({tuple(j) for j in jogos}) == 300  # distintos
+    for jogo in jogos:
+        valores = caracteristicas_python(jogo)
+        assert {2, 13} <= set(jogo) and all(lo <= valores[nome] <= hi for nome, (lo, hi) in filtros.items())
+
+def test_gerar_filtrado_para_no_limite_de_candidatos():
+    resultado = est.gerar_filtrado(None, qtd=10, filtros={'soma': (120, 120)}, rng=np.random.default_rng(0), max_examinados=20_000)
+    assert not resultado['completo'] and resultado['examinados'] == 20_000
+
+def test_nao_pede_mais_jogos_do_que_existem():
+    resultado = est.gerar_filtrado(None, fixos=list(range(1, 14)), qtd=100, rng=np.random.default_rng(0))
+    assert len(resultado['jogos']) == 66 and not resultado['completo']  # C(12, 2)
+
+def test_fixos_no_padrao_com_filtros():
+    with pytest.raises(ValueError, match="1 a 14"):
+        est.gerar_filtrado(None, fixos=[], qtd=1, filtros={'soma': (150, 220)}, minimo_fixos=1)
+    with pytest.raises(ValueError):
+        est.gerar_filtrado(None, fixos=list(range(1, 16)), qtd=1)
+    assert len(est.gerar_filtrado(None, fixos=[], qtd=3, rng=np.random.default_rng(0))['jogos']) == 3  # Surpresinha: sem fixos
+
+def test_ler_filtros():
+    assert est.ler_filtros({'soma_min': '180', 'soma_max': '', 'max_consecutivas': '5', 'primos_max': None}) == {'soma': (180, 270), 'consecutivas': (1, 5)}
+    for invalido in ({'soma_min': '200', 'soma_max': '190'}, {'impares_min': '14'}, {'moldura_max': '5'}):
+        with pytest.raises(ValueError):
+            est.ler_filtros(invalido)
+
+def test_repetidas_precisa_de_resultado():
+    with pytest.raises(ValueError):
+        est.gerar_filtrado(None, qtd=1, filtros={'repetidas': (8, 9)})
+
+def test_padrao_com_filtros_pela_tela(app, cliente):
+    resposta = cliente.post('/gerar-ouro', data={'numeros': ULTIMO, 'qtd_jogos': 3, 'soma_min': 150, 'soma_max': 220}, follow_redirects=True)
+    assert '1 a 14' in resposta.get_data(as_text=True)
+    resposta = cliente.post('/gerar-ouro', data={'numeros': ULTIMO, 'fixos': [2, 13], 'qtd_jogos': 3, 'soma_min': 150, 'soma_max': 220}, follow_redirects=True)
+    assert resposta.status_code == 200 and '1 a 14' not in resposta.get_data(as_text=True)
+
+def test_quantidade_da_tela_tem_teto(app, cliente):
+    import app as modulo
+    resposta = cliente.post('/gerar-ouro', data={'numeros': ULTIMO, 'fixos': [2, 13], 'qtd_jogos': 100_000, 'soma_min': 150, 'soma_max': 220}, follow_redirects=True)
+    html = resposta.get_data(as_text=True)
+    assert resposta.status_code == 200 and f'1 a {modulo.MAX_JOGOS_TELA}' in html and f'de {modulo.MAX_JOGOS_TELA} jogos passaram' in html
+    html = cliente.post('/gerar-ouro', data={'numeros': ULTIMO, 'fixos': [2, 13], 'qtd_jogos': 0}, follow_redirects=True).get_data(as_text=True)
+    assert f'1 a {modulo.MAX_JOGOS_TELA}: gerando 1' in html
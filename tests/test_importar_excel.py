@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+
+pd = pytest.importorskip('pandas')
+
+import importar_excel as imp
+from indice_sorteios import para_mascara
+from modelos import configurar_banco, db, ResultadoLotofacil, EstatisticaConcurso
+from conftest import sorteios
+
+SORTEIOS = sorteios(30)
+
+def planilha(linhas):
+    return pd.DataFrame([{'Concurso': c, 'Data': d, **{f'Bola{i}': b for i, b in enumerate(bolas, 1)}} for c, d, bolas in linhas])
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    aplicacao = Flask(__name__)
+    aplicacao.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'excel.db'}"
+    configurar_banco(aplicacao)
+    monkeypatch.setattr(imp, 'app', aplicacao)
+    with aplicacao.app_context():
+        db.create_all(bind_key=None)
+    return aplicacao
+
+def test_preparar_planilha_descarta_invalidas():
+    bolas = SORTEIOS[0][::-1]  # fora de ordem: sai ordenado
+    df = planilha([
+        (1, datetime(2024, 1, 2), bolas),
+        (2, '03/01/2024', SORTEIOS[1]),
+        (3, '2024-01-04 00:00:00', SORTEIOS[2]),
+        (4, '05/01/2024', SORTEIOS[3][:14] + [SORTEIOS[3][0]]),  # dezena repetida
+        (5, '06/01/2024', SORTEIOS[4][:14] + [26]),  # fora de 1..25
+        (6, '07/01/2024', SORTEIOS[5][:14] + ['x']),  # não numérica
+        (None, '08/01/2024', SORTEIOS[6]),  # sem concurso
+        (2, '03/01/2024', SORTEIOS[1]),  # repetido na planilha
+        (7, 'sem data', SORTEIOS[7]),  # data ilegível fica como texto
+    ])
+    linhas, invalidas = imp.preparar_planilha(df)
+    assert invalidas == 5
+    assert linhas['concurso'].tolist() == [1, 2, 3, 7]
+    assert linhas['dezenas'].iloc[0] == ", ".join(f"{n:02d}" for n in SORTEIOS[0])
+    assert linhas['mascara'].tolist() == [para_mascara(SORTEIOS[i]) for i in (0, 1, 2, 7)]
+    assert linhas['data_sorteio'].tolist() == ['02/01/2024', '03/01/2024', '04/01/2024', 'sem data']
+    assert linhas['data'].tolist() == [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4), None]
+
+def test_importa_em_lotes_so_os_novos(banco, tmp_path):
+    pytest.importorskip('openpyxl')
+    arquivo = tmp_path / 'resultados.xlsx'
+    planilha([(c, f"{c % 28 + 1:02d}/03/2022", d) for c, d in enumerate(SORTEIOS, 1)]).to_excel(arquivo, index=False)
+    with banco.app_context():
+        db.session.add(ResultadoLotofacil(concurso=5, data_sorteio='06/03/2022', dezenas=", ".join(f"{n:02d}" for n in SORTEIOS[4])))
+        db.session.commit()
+
+    lotes = []
+    assert imp.importar_do_excel(str(arquivo), tamanho_lote=10, progresso=lambda i, total: lotes.append((i, total))) == 29
+    assert lotes == [(10, 29), (20, 29), (29, 29)]
+    with banco.app_context():
+        assert db.session.query(ResultadoLotofacil).count() == 30
+        assert db.session.query(EstatisticaConcurso).count() == 30  # estatísticas sincronizadas no fim
+    assert imp.importar_do_excel(str(arquivo)) == 0  # de novo: nada novo
+
+def test_colunas_faltando(banco, tmp_path, capsys):
+    pytest.importorskip('openpyxl')
+    arquivo = tmp_path / 'ruim.xlsx'
+    pd.DataFrame({'Concurso': [1], 'Data': ['01/01/2020']}).to_excel(arquivo, index=False)
+    assert imp.importar_do_excel(str(arquivo)) is None
+    assert 'Bola1' in capsys.readouterr().out
+    assert imp.importar_do_excel(str(tmp_path / 'nao-existe.xlsx')) is None
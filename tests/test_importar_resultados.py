@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import Flask
+
+import importar_resultados as imp
+from modelos import configurar_banco, db, ResultadoLotofacil
+from conftest import sorteios
+
+SORTEIOS = sorteios(40)
+
+class ApiFalsa:
+    """Servidor HTTP local no formato da Loterias API. `falhas[concurso]` = status devolvidos antes do 200."""
+
+    def __init__(self, ultimo):
+        self.ultimo, self.falhas, self.pedidos = ultimo, {}, []
+        api = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_GET(self):
+                api.pedidos.append(self.path)
+                partes = self.path.rstrip('/').split('/')
+                if partes[-1] == 'lotofacil': return self.responder(200, {'concurso': api.ultimo})
+                concurso = int(partes[-1])
+                if api.falhas.get(concurso): return self.responder(api.falhas[concurso].pop(0), {'erro': 'tente depois'})
+                if concurso > api.ultimo: return self.responder(404, {'erro': 'não encontrado'})
+                self.responder(200, {'concurso': concurso, 'data': f"{concurso % 28 + 1:02d}/02/2021",
+                                     'dezenas': [f"{n:02d}" for n in SORTEIOS[concurso - 1]]})
+
+            def responder(self, status, corpo):
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json'); self.send_header('Content-Length', str(len(dados)))
+                self.end_headers(); self.wfile.write(dados)
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), Tratador)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}/api/lotofacil"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def pedidos_de(self, concurso):
+        return self.pedidos.count(f"/api/lotofacil/{concurso}")
+
+@pytest.fixture
+def api():
+    api = ApiFalsa(ultimo=30)
+    yield api
+    api.servidor.shutdown(); api.servidor.server_close()
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """O app de dados do importador apontando para um banco temporário, e o checkpoint numa pasta temporária."""
+    aplicacao = Flask(__name__)
+    aplicacao.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'importacao.db'}"
+    configurar_banco(aplicacao)
+    monkeypatch.setattr(imp, 'app', aplicacao)
+    monkeypatch.setattr(imp, 'ARQUIVO_CHECKPOINT', str(tmp_path / 'checkpoint.json'))
+    with aplicacao.app_context():
+        db.create_all(bind_key=None)
+        yield aplicacao
+        db.session.remove()
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Troca o sleep do backoff por um registro das esperas (sem a parte aleatória)."""
+    registradas = []
+    monkeypatch.setattr(imp.time, 'sleep', registradas.append)
+    monkeypatch.setattr(imp.random, 'uniform', lambda a, b: 0)
+    return registradas
+
+def concursos_no_banco():
+    return sorted(c for (c,) in db.session.query(ResultadoLotofacil.concurso))
+
+def test_retry_com_backoff(api, esperas):
+    api.falhas[5] = [429, 500]
+    registro = imp.baixar_concurso(imp.criar_sessao(1), imp.LimiteTaxa(1000), 5, api.url)
+    assert registro['concurso'] == 5 and registro['dezenas'] == ", ".join(f"{n:02d}" for n in SORTEIOS[4])
+    assert api.pedidos_de(5) == 3
+    assert esperas == [0.5, 1.0]
+
+def test_desiste_depois_das_tentativas(api, esperas):
+    api.falhas[7] = [500] * 10
+    with pytest.raises(RuntimeError, match="concurso 7"):
+        imp.baixar_concurso(imp.criar_sessao(1), imp.LimiteTaxa(1000), 7, api.url, tentativas=3)
+    assert api.pedidos_de(7) == 3
+    assert esperas == [0.5, 1.0, 2.0]
+
+def test_concurso_inexistente(api):
+    assert imp.baixar_concurso(imp.criar_sessao(1), imp.LimiteTaxa(1000), 31, api.url) is None
+    assert api.pedidos_de(31) == 1
+
+def test_concursos_faltando(banco):
+    imp.gravar_lote([{'concurso': c, 'data_sorteio': '01/01/2020', 'dezenas': '01'} for c in range(1, 11) if c not in (3, 7)])
+    assert imp.concursos_faltando(1, 10) == [7, 3]
+    assert imp.concursos_faltando(8, 12) == [12, 11]
+    assert imp.concursos_faltando(1, 2) == []
+
+def test_importa_so_o_que_falta(api, banco):
+    imp.gravar_lote([{'concurso': c, 'data_sorteio': '01/01/2020', 'dezenas': '01'} for c in range(21, 26)])
+    assert imp.importar_jogos(quantidade=10, workers=4, taxa=1000, url_base=api.url) == 5
+    assert concursos_no_banco() == list(range(21, 31))
+    assert all(api.pedidos_de(c) == 0 for c in range(21, 26))
+    assert not imp.os.path.exists(imp.ARQUIVO_CHECKPOINT)
+
+def test_retoma_do_checkpoint(api, banco):
+    def interromper(i, total):
+        if i == 8: raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        imp.importar_jogos(quantidade=0, workers=1, taxa=1000, tamanho_lote=5, url_base=api.url, progresso=interromper)
+    gravados = concursos_no_banco()
+    assert len(gravados) == 8  # o que já tinha chegado é gravado mesmo interrompido
+    with open(imp.ARQUIVO_CHECKPOINT, encoding='utf-8') as f:
+        assert json.load(f) == {'url': api.url, 'quantidade': 0, 'ultimo': 30}
+
+    api.ultimo, api.pedidos = 35, []  # saiu concurso novo: a retomada não pergunta de novo qual é o último
+    assert imp.importar_jogos(quantidade=0, workers=4, taxa=1000, url_base=api.url) == 22
+    assert concursos_no_banco() == list(range(1, 31))
+    assert '/api/lotofacil' not in api.pedidos
+    assert all(api.pedidos_de(c) == 0 for c in gravados)
+    assert not imp.os.path.exists(imp.ARQUIVO_CHECKPOINT)
+
+def test_erro_do_banco_nao_regrava_o_lote(api, banco, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    original, lotes = imp.gravar_lote, []
+    def gravar(registros):
+        lotes.append([r['concurso'] for r in registros])
+        if len(lotes) == 2: raise OperationalError('INSERT', {}, Exception('database is locked'))
+        return original(registros)
+    monkeypatch.setattr(imp, 'gravar_lote', gravar)
+    with pytest.raises(OperationalError, match='database is locked'):
+        imp.importar_jogos(quantidade=0, workers=1, taxa=1000, tamanho_lote=5, url_base=api.url)
+    # o lote que falhou não volta no finally, e o erro que sobe é o original
+    assert len(lotes) == 2 and concursos_no_banco() == sorted(lotes[0])
+
+def test_sem_conexao(banco):
+    assert imp.importar_jogos(quantidade=5, taxa=1000, url_base="http://127.0.0.1:9/api/lotofacil") is None
+
+def test_limite_de_taxa():
+    limite = imp.LimiteTaxa(taxa=50, capacidade=5)
+    inicio = time.monotonic()
+    for _ in range(5): limite.aguardar()
+    assert time.monotonic() - inicio < 0.05  # a rajada sai de uma vez
+    for _ in range(5): limite.aguardar()
+    assert time.monotonic() - inicio >= 0.09  # depois, uma a cada 1/50 s
+
+def test_limite_de_taxa_entre_threads():
+    limite, chegadas = imp.LimiteTaxa(taxa=100, capacidade=1), []
+    def pedir():
+        for _ in range(5): limite.aguardar(); chegadas.append(time.monotonic())
+    threads = [threading.Thread(target=pedir) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(chegadas) == 20
+    assert max(chegadas) - min(chegadas) >= 0.18  # 20 pedidos a 100/s, divididos entre as threads
@@ -0,0 +1,83 @@
+from collections import Counter
+
+from indice_sorteios import IndiceSorteios, extrair_dezenas, para_mascara, de_mascara, contar_acertos
+from conftest import sorteios
+
+SORTEIOS = sorteios(80)
+
+def carregado():
+    idx = IndiceSorteios()
+    idx.carregar((c, para_mascara(d)) for c, d in reversed(list(enumerate(SORTEIOS, 1))))  # fora de ordem de propósito
+    return idx
+
+def test_mascara_ida_e_volta():
+    for dezenas in SORTEIOS[:10]:
+        assert de_mascara(para_mascara(dezenas)) == dezenas
+    assert para_mascara([0, 1, 25, 26]) == 1 | 1 << 24
+    assert extrair_dezenas("01, 02;3 - 25") == [1, 2, 3, 25]
+    assert contar_acertos(para_mascara(range(1, 16)), para_mascara(range(11, 26))) == 5
+
+def test_carregar_ordena_e_assina():
+    idx = carregado()
+    assert list(idx.concursos) == list(range(1, 81))
+    assert idx.assinatura() == (80, 80, None)
+    assert idx.ultimo() == (80, para_mascara(SORTEIOS[-1]))
+
+def test_frequencias_iguais_a_contagem_direta():
+    idx = carregado()
+    for limite in (0, 1, 10, 80, 500):
+        contagem = Counter(n for d in (SORTEIOS[-limite:] if limite else SORTEIOS) for n in d)
+        assert idx.frequencias(limite) == [contagem[n] for n in range(1, 26)]
+
+def test_janela_e_ultimos():
+    idx = carregado()
+    assert list(idx.janela(3)) == [para_mascara(d) for d in SORTEIOS[-3:]]
+    assert list(idx.ultimos(3)) == [para_mascara(d) for d in SORTEIOS[-3:]][::-1]
+    assert len(idx.janela(0)) == 80
+
+def test_distribuicao_acertos():
+    idx, jogo = carregado(), SORTEIOS[0]
+    esperado = Counter(len(set(jogo) & set(d)) for d in SORTEIOS[-30:])
+    assert idx.distribuicao_acertos(para_mascara(jogo), 30) == [esperado[k] for k in range(16)]
+
+def test_contendo():
+    idx = carregado()
+    alvo = [SORTEIOS[5][0], SORTEIOS[5][1]]
+    assert idx.contendo(para_mascara(alvo)) == [c for c, d in enumerate(SORTEIOS, 1) if set(alvo) <= set(d)]
+
+def test_adicionar_e_remover():
+    idx = carregado()
+    idx.remover(40)
+    assert 40 not in idx.concursos and len(idx) == 79
+    idx.adicionar(40, 7)
+    idx.adicionar(40, 9)  # o mesmo concurso substitui
+    assert list(idx.concursos) == list(range(1, 81)) and idx.mascaras[39] == 9
+    idx.adicionar(100, 1)
+    assert idx.assinatura() == (81, 100, None)
+
+def test_rollback_nao_deixa_concurso_fantasma(app):
+    import modelos
+    from modelos import db, ResultadoLotofacil
+    from indice_sorteios import indice
+    with app.app_context():
+        antes = modelos.obter_indice().assinatura()
+        db.session.add(ResultadoLotofacil(concurso=61, data_sorteio='01/02/2020', dezenas=', '.join(f'{n:02d}' for n in range(1, 16))))
+        db.session.flush()
+        db.session.rollback()
+        assert 61 not in indice.concursos
+        assert modelos.obter_indice().assinatura() == antes
+
+def test_edicao_em_outro_processo_recarrega(app):
+    import sqlite3
+    import modelos
+    novo = list(range(11, 26))
+    with app.app_context():
+        modelos.versao_resultados()  # cria a linha de VersaoDados
+        assert modelos.obter_indice().mascaras[4] == para_mascara(sorteios(60)[4])
+        db_path = modelos.db.engine.url.database
+        # outro processo troca as dezenas do concurso 5: mesma quantidade e mesmo último concurso
+        with sqlite3.connect(db_path) as conexao:
+            conexao.execute("UPDATE resultado_lotofacil SET dezenas = ?, mascara = ? WHERE concurso = 5", (', '.join(map(str, novo)), para_mascara(novo)))
+            conexao.execute("UPDATE versao_dados SET valor = valor + 1 WHERE id = 1")
+        conexao.close()
+        assert modelos.obter_indice().mascaras[4] == para_mascara(novo)
@@ -0,0 +1,48 @@
+from itertools import combinations, islice
+from math import comb
+
+import pytest
+
+from loto_logic import unrank_combinacao, rank_combinacao, iterar_fechamento, pagina_fechamento, gerar_fechamento
+
+def test_rank_unrank_ida_e_volta():
+    for n, k in [(17, 15), (10, 4), (25, 15)]:
+        total = comb(n, k)
+        for indice in [0, 1, 2, total // 3, total // 2, total - 2, total - 1]:
+            posicoes = unrank_combinacao(indice, n, k)
+            assert len(posicoes) == k and posicoes == sorted(set(posicoes))
+            assert rank_combinacao(posicoes, n) == indice
+
+def test_unrank_segue_a_ordem_de_combinations():
+    for indice, esperado in enumerate(combinations(range(9), 4)):
+        assert unrank_combinacao(indice, 9, 4) == list(esperado)
+
+def test_unrank_fora_do_total():
+    with pytest.raises(IndexError):
+        unrank_combinacao(comb(16, 15), 16)
+    with pytest.raises(IndexError):
+        unrank_combinacao(-1, 16)
+
+def test_iterar_fechamento_igual_a_combinations():
+    pool = [2, 3, 5, 7, 11, 13, 17, 19, 21, 22, 23, 24, 25, 1, 4, 6, 8]
+    assert list(iterar_fechamento(pool)) == [list(c) for c in combinations(sorted(pool), 15)]
+    assert list(iterar_fechamento(pool, 40, 45)) == [list(c) for c in islice(combinations(sorted(pool), 15), 40, 45)]
+
+def test_pagina_fechamento():
+    pool = list(range(1, 19))
+    todos = [list(c) for c in combinations(pool, 15)]
+    assert pagina_fechamento(pool, 3, 100) == todos[200:300]
+    assert pagina_fechamento(pool, 9, 100) == todos[800:]  # última página incompleta (816 jogos)
+    assert pagina_fechamento(pool, 10, 100) == []
+
+def test_gerar_fechamento_sem_limite_e_preguicoso():
+    resultado = gerar_fechamento(25, [], numeros_variaveis=list(range(1, 26)))
+    assert resultado['total_jogos'] == 3_268_760
+    assert next(resultado['jogos']) == list(range(1, 16))
+
+def test_gerar_fechamento_valida():
+    assert 'erro' in gerar_fechamento(14, [], numeros_variaveis=list(range(1, 15)))
+    assert 'erro' in gerar_fechamento(16, list(range(1, 17)))
+    assert 'erro' in gerar_fechamento(16, [], numeros_variaveis=list(range(10, 27)))
+    fixos = gerar_fechamento(17, list(range(1, 14)), completar_aleatorio=True)
+    assert fixos['total_jogos'] == 136 and set(range(1, 14)) <= set(fixos['numeros_base'])
@@ -0,0 +1,39 @@
+from sqlalchemy import func, inspect, text
+
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+def test_mascara_preenchida_ao_gravar(app):
+    from modelos import db, JogoSalvo, ResultadoLotofacil
+    with app.app_context():
+        jogo = JogoSalvo(user_id=1, numeros="15, 01, 02, 03, 04, 05, 06, 07, 08, 09, 10, 11, 12, 13, 14", tipo='Manual')
+        db.session.add(jogo); db.session.commit()
+        assert jogo.mascara == (1 << 15) - 1
+        jogo.numeros = "11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25"; db.session.commit()
+        assert jogo.mascara == ((1 << 25) - 1) ^ ((1 << 10) - 1)
+        resultado = ResultadoLotofacil.query.filter_by(concurso=1).one()
+        assert resultado.mascara == para_mascara(sorteios(60)[0]) and resultado.data is not None
+
+def test_filtro_e_popcount_no_sql(app):
+    from modelos import db, ResultadoLotofacil, contem_dezenas
+    todos = sorteios(60)
+    with app.app_context():
+        alvo = todos[3][:3]
+        encontrados = [c for (c,) in db.session.query(ResultadoLotofacil.concurso).filter(contem_dezenas(ResultadoLotofacil.mascara, alvo)).order_by(ResultadoLotofacil.concurso)]
+        assert encontrados == [c for c, d in enumerate(todos, 1) if set(alvo) <= set(d)]
+        jogo = para_mascara(todos[0])
+        acertos = dict(db.session.query(ResultadoLotofacil.concurso, func.popcount(ResultadoLotofacil.mascara.op('&')(jogo))))
+        assert acertos == {c: len(set(todos[0]) & set(d)) for c, d in enumerate(todos, 1)}
+
+def test_migracao_de_banco_antigo(app):
+    from modelos import db, preparar_banco, ResultadoLotofacil
+    todos = sorteios(60)
+    with app.app_context():
+        # banco de versão anterior: máscaras vazias e o índice só de 'mascara'
+        db.session.execute(text('UPDATE resultado_lotofacil SET mascara = NULL WHERE concurso <= 10'))
+        db.session.execute(text('CREATE INDEX ix_resultado_lotofacil_mascara ON resultado_lotofacil (mascara)'))
+        db.session.commit()
+        preparar_banco()
+        assert dict(db.session.query(ResultadoLotofacil.concurso, ResultadoLotofacil.mascara)) == {c: para_mascara(d) for c, d in enumerate(todos, 1)}
+        indices = {i['name'] for t in ('resultado_lotofacil', 'jogo_salvo') for i in inspect(db.engine).get_indexes(t)}
+        assert 'ix_resultado_lotofacil_mascara' not in indices and 'ix_jogo_salvo_user_mascara' in indices
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+import app as modulo
+import metricas
+
+def test_texto_do_registro():
+    registro = metricas.Registro()
+    registro.contador('x_total', "Contador.")
+    registro.histograma('y_segundos', "Histograma.", buckets=(0.1, 1.0))
+    registro.inc('x_total', rota='/a"b\n'); registro.inc('x_total', 2, rota='/a"b\n')
+    for valor in (0.05, 0.5, 3.0): registro.observar('y_segundos', valor, rota='/c')
+    registro.coletor(lambda: [('z', 'gauge', "Medida.", [({'pool': 'leitura'}, 4)])])
+    assert registro.texto().splitlines() == [
+        '# HELP x_total Contador.', '# TYPE x_total counter', 'x_total{rota="/a\\"b\\n"} 3',
+        '# HELP y_segundos Histograma.', '# TYPE y_segundos histogram',
+        'y_segundos_bucket{rota="/c",le="0.1"} 1', 'y_segundos_bucket{rota="/c",le="1"} 2', 'y_segundos_bucket{rota="/c",le="+Inf"} 3',
+        'y_segundos_sum{rota="/c"} 3.550000', 'y_segundos_count{rota="/c"} 3',
+        '# HELP z Medida.', '# TYPE z gauge', 'z{pool="leitura"} 4']
+
+def test_perfilador_grava_so_as_lentas(tmp_path, monkeypatch):
+    perfilador = metricas.Perfilador(str(tmp_path), amostra=0.0, limite_ms=100, maximo_arquivos=2)
+    assert perfilador.iniciar() is None
+    perfilador.amostra = 1.0
+    assert perfilador.finalizar(perfilador.iniciar(), '/rapida', 5) is None
+    for i, rota in enumerate(('/a', '/b', '/api/<int:x>')):
+        caminho = perfilador.finalizar(perfilador.iniciar(), rota, 200 + i)
+        os.utime(caminho, (i, i))
+    assert sorted(nome.split('_', 1)[1] for nome in os.listdir(tmp_path)) == ['api__int_x_202ms.prof', 'b_201ms.prof']
+
+@pytest.fixture
+def sem_liberacao(monkeypatch):
+    monkeypatch.delenv('METRICAS_TOKEN', raising=False)
+    monkeypatch.delenv('METRICAS_ABERTO', raising=False)
+
+def test_metrics_exige_autorizacao(app, cliente, monkeypatch, sem_liberacao, tmp_path):
+    anonimo = app.test_client()
+    assert anonimo.get('/metrics').status_code == 401
+    cliente.get('/').close()  # a medição fecha junto com a resposta (call_on_close)
+    resposta = cliente.get('/metrics')
+    assert resposta.status_code == 200 and 'lotofacil_requisicao_segundos_bucket' in resposta.get_data(as_text=True)
+    monkeypatch.setenv('METRICAS_ABERTO', '1')
+    assert anonimo.get('/metrics').status_code == 200
+    monkeypatch.setenv('METRICAS_TOKEN', 'segredo')  # com token, METRICAS_ABERTO não vale mais
+    assert anonimo.get('/metrics').status_code == 401
+    assert anonimo.get('/metrics', headers={'Authorization': 'Bearer errado'}).status_code == 401
+    assert anonimo.get('/metrics', headers={'Authorization': 'Bearer segredo'}).status_code == 200
+    assert not os.path.exists(tmp_path / 'tarefas.db')  # ler a contagem da fila não cria o arquivo
+
+def test_metrics_em_debug(app, sem_liberacao):
+    app.debug = True
+    assert app.test_client().get('/metrics').status_code == 200
+
+def serie(texto, nome):
+    return next((float(l.rsplit(' ', 1)[1]) for l in texto.splitlines() if l.startswith(nome + ' ')), 0)
+
+def test_requisicoes_e_sql_por_rota(app, cliente, sem_liberacao):
+    # O registro é do processo (outros testes também medem): compara antes e depois
+    contagem = 'lotofacil_requisicao_segundos_count{metodo="GET",rota="/api/estatisticas/<int:limite>",status="200"}'
+    consultas = 'lotofacil_requisicao_sql_consultas_count{rota="/api/estatisticas/<int:limite>"}'
+    antes = cliente.get('/metrics').get_data(as_text=True)
+    cliente.get('/api/estatisticas/10').close()
+    depois = cliente.get('/metrics').get_data(as_text=True)
+    assert serie(depois, contagem) == serie(antes, contagem) + 1
+    assert serie(depois, consultas) == serie(antes, consultas) + 1
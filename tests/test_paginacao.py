@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+import app as modulo
+from conftest import sorteios
+
+SORTEIOS = dict(enumerate(sorteios(60), 1))  # os mesmos da fixture `app`
+
+def percorrer(busca='', por_pagina=7):
+    """Vai até o fim com `antes` e volta ao começo com `depois`; devolve os concursos nas duas direções."""
+    ida, pagina = [], modulo.buscar_resultados(busca, por_pagina=por_pagina)
+    assert not pagina.tem_anterior
+    while True:
+        ida += [r.concurso for r in pagina.items]
+        assert len(pagina.items) <= por_pagina
+        if not pagina.tem_proxima: break
+        pagina = modulo.buscar_resultados(busca, antes=pagina.antes, por_pagina=por_pagina)
+    volta = [r.concurso for r in pagina.items]
+    while pagina.tem_anterior:
+        pagina = modulo.buscar_resultados(busca, depois=pagina.depois, por_pagina=por_pagina)
+        volta = [r.concurso for r in pagina.items] + volta
+    return ida, volta
+
+@pytest.mark.parametrize('busca, esperado', [
+    ('', list(SORTEIOS)),
+    ('07 13', [c for c, s in SORTEIOS.items() if {7, 13} <= set(s)]),
+    ('1, 2, 3', [c for c, s in SORTEIOS.items() if {1, 2, 3} <= set(s)]),
+    ('01/2020', list(SORTEIOS)),
+    ('/2021', []),
+    ('05/01/2020', [c for c in SORTEIOS if c % 28 + 1 == 5]),
+    ('2020-01-05', [c for c in SORTEIOS if c % 28 + 1 == 5]),
+    ('42', [42]),
+])
+def test_cursor_igual_a_listagem_completa(app, busca, esperado):
+    with app.app_context():
+        ida, volta = percorrer(busca)
+    esperado = sorted(esperado, reverse=True)
+    assert ida == volta == esperado
+
+def test_pagina_exata_sem_proxima(app):
+    with app.app_context():
+        pagina = modulo.buscar_resultados(por_pagina=60)
+        assert len(pagina.items) == 60 and not pagina.tem_proxima and not pagina.tem_anterior
+        assert modulo.buscar_resultados(antes=1).items == []
+
+def test_intervalo_de_datas():
+    assert modulo.intervalo_de_datas('12/2023') == (date(2023, 12, 1), date(2023, 12, 31))
+    assert modulo.intervalo_de_datas('2024-02') == (date(2024, 2, 1), date(2024, 2, 29))
+    assert modulo.intervalo_de_datas('/2023') == (date(2023, 1, 1), date(2023, 12, 31))
+    assert modulo.intervalo_de_datas('31/02/2023') is None and modulo.intervalo_de_datas('abc') is None
+
+def test_rotas_com_cursor(app, cliente):
+    pagina = app.test_client().get('/resultados?antes=30').get_data(as_text=True)
+    assert 'antes=10' in pagina and 'depois=29' in pagina
+    assert cliente.get('/admin?antes=30').status_code == 200
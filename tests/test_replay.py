@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import app as modulo
+import estrategias
+import replay
+from replay import ReplayEstrategias, ler_parametros, jogos_estimados, JANELA_PURA
+from indice_sorteios import para_mascara
+from conftest import sorteios
+
+SORTEIOS = sorteios(200, semente=21)
+CONCURSOS, MASCARAS = list(range(1001, 1201)), [para_mascara(s) for s in SORTEIOS]
+
+def replay_direto(estrategia, parametros):
+    """Walk-forward sem prefixos nem trechos: frequências recontadas a cada concurso."""
+    pontos = np.zeros(16, dtype=np.int64)
+    inicio = JANELA_PURA - 1
+    if parametros.get('janela'): inicio = max(inicio, len(SORTEIOS) - 1 - parametros['janela'])
+    for i in range(inicio, len(SORTEIOS) - 1):
+        frequencias = [sum(n in s for s in SORTEIOS[i + 1 - JANELA_PURA:i + 1]) for n in range(1, 26)]
+        jogos = replay._jogos_do_concurso(estrategia, parametros, CONCURSOS[i], MASCARAS[i], frequencias)
+        for jogo in jogos.tolist(): pontos[len(set(jogo) & set(SORTEIOS[i + 1]))] += 1
+    return pontos
+
+@pytest.mark.parametrize('estrategia, dados, fixos', [
+    ('pura', {}, ()), ('padrao', {'qtd': 2, 'semente': 7, 'janela': 100}, (3, 11, 20)),
+    ('metodo25', {'qtd': 1, 'escolha': 'aleatorias'}, ()), ('surpresinha', {'qtd': 2}, ())])
+def test_igual_ao_walk_forward_direto(estrategia, dados, fixos):
+    parametros = ler_parametros(estrategia, dados, fixos)
+    resultado = ReplayEstrategias(trecho=17).rodar(estrategia, parametros, CONCURSOS, MASCARAS)
+    pontos = replay_direto(estrategia, parametros)
+    assert resultado['distribuicao'] == {str(k): int(pontos[k]) for k in range(16)}
+    assert resultado['ultimo_concurso'] == 1200 and resultado['jogos'] == jogos_estimados(parametros, len(CONCURSOS))
+
+def test_mesmos_totais_com_1_e_n_processos(monkeypatch):
+    monkeypatch.setattr(replay, 'MINIMO_PARA_POOL', 0)
+    parametros = ler_parametros('padrao', {'qtd': 3, 'semente': 5}, (1, 2, 3, 4))
+    sozinho = ReplayEstrategias(processos=1).rodar('padrao', parametros, CONCURSOS, MASCARAS)
+    em_pool, progresso = ReplayEstrategias(processos=2, trecho=40), []
+    try:
+        dividido = em_pool.rodar('padrao', parametros, CONCURSOS, MASCARAS, progresso=lambda feitos, total: progresso.append((feitos, total)))
+    finally:
+        em_pool._descartar_pool()
+    assert dividido.pop('processos') == 2 and sozinho.pop('processos') == 1
+    assert dividido == sozinho
+    assert progresso == [(i, 5) for i in range(1, 6)]
+
+def test_ler_parametros():
+    assert ler_parametros('pura', {'janela': '1'}) == {'janela': 50}
+    assert ler_parametros('pura', {'janela': '120'}, total=1000) == {'janela': 150}
+    assert ler_parametros('pura', {'janela': '990'}, total=1000) == {'janela': 0}  # cobre o histórico inteiro
+    assert ler_parametros('surpresinha', {}) == {'janela': 0, 'qtd': 1, 'semente': 0}
+    assert ler_parametros('padrao', {'semente': '999'}, ['5', 3, 5])['fixos'] == [3, 5]
+    assert ler_parametros('metodo25', {'escolha': ' Aleatorias '})['escolha'] == 'aleatorias'
+    for estrategia, dados, fixos in [('pura', {'janela': -1}, ()), ('surpresinha', {'semente': 1000}, ()), ('surpresinha', {'qtd': 51}, ()),
+                                     ('padrao', {}, ()), ('padrao', {}, (0, 3)), ('metodo25', {'escolha': 'outra'}, ()), ('nada', {}, ())]:
+        with pytest.raises(ValueError):
+            ler_parametros(estrategia, dados, fixos)
+
+def test_jogos_estimados():
+    assert jogos_estimados({'janela': 0}, 200) == 190 * 3
+    assert jogos_estimados({'janela': 50, 'qtd': 4}, 200) == 200 and jogos_estimados({'janela': 0, 'qtd': 2}, 5) == 0
+
+def test_historico_curto():
+    with pytest.raises(ValueError):
+        ReplayEstrategias().rodar('pura', {'janela': 0}, CONCURSOS[:JANELA_PURA], MASCARAS[:JANELA_PURA])
+
+def test_rota_na_hora_e_pela_fila(app, cliente, monkeypatch):
+    anonimo = app.test_client()
+    direto = anonimo.get('/api/v1/replay/surpresinha?qtd=2&semente=4').get_json()
+    assert direto['success'] and direto['jogos'] == 50 * 2
+    monkeypatch.setattr(modulo.replay, 'rodar', None)  # daqui para frente, recalcular quebraria
+    assert anonimo.get('/api/v1/replay/surpresinha?qtd=2&semente=4').get_json()['distribuicao'] == direto['distribuicao']
+    assert anonimo.get('/api/v1/replay/surpresinha?qtd=2&semente=1000').status_code == 400
+
+    monkeypatch.setattr(modulo, 'REPLAY_DIRETO', 10)
+    url = '/api/v1/replay/padrao?qtd=2&fixos=3&fixos=9'
+    assert anonimo.get(url).status_code == 401
+    pedido = cliente.get(url)
+    assert pedido.status_code == 202 and cliente.get(url).get_json()['tarefa'] == pedido.get_json()['tarefa']  # reaproveita
+    tarefa = modulo.fila.pegar_proxima()
+    modulo.fila.executar(tarefa, app)
+    assert modulo.fila.obter(tarefa['id'])['situacao'] == 'concluida'
+    pronto = cliente.get(url).get_json()
+    assert anonimo.get(url).get_json() == pronto  # depois disso, do cache para qualquer um
+    assert pronto['success'] and pronto['jogos'] == 100 and pronto['parametros']['fixos'] == [3, 9]
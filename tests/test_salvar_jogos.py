@@ -0,0 +1,56 @@
+import app as modulo
+from modelos import db, User, JogoSalvo
+from conftest import sorteios
+
+def carteira(app):
+    with app.app_context():
+        return sorted((j.numeros, j.tipo) for j in JogoSalvo.query.all())
+
+def test_lote_com_duplicados_e_invalidos(app):
+    with app.app_context():
+        user_id = User.query.filter_by(email='admin@teste').one().id
+        entradas = [([15, 14, 13, 12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1], 'A'),
+                    ("1 2 3 4 5 6 7 8 9 10 11 12 13 14 15", 'B'),   # mesmo jogo, outro formato
+                    ("11-12-13-14-15-16-17-18-19-20-21-22-23-24-25", None),
+                    (list(range(1, 15)), 'C'),                       # 14 dezenas
+                    (list(range(12, 27)), 'D'),                      # 26 não existe
+                    ([1] * 15, 'E'), (None, 'F')]
+        assert modulo.salvar_jogos(user_id, entradas) == (2, 0, 4)  # repetido no lote não conta como 'já salvo'
+        assert modulo.salvar_jogos(user_id, entradas[:3]) == (0, 2, 0)
+    assert carteira(app) == [("01, 02, 03, 04, 05, 06, 07, 08, 09, 10, 11, 12, 13, 14, 15", 'A'),
+                             ("11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25", 'Manual')]
+
+def test_lote_grande_consulta_em_pedacos(app):
+    jogos = [tuple(j) for j in sorteios(1500, semente=8)]
+    distintos = len(set(jogos))
+    with app.app_context():
+        user_id = User.query.filter_by(email='admin@teste').one().id
+        assert modulo.salvar_jogos(user_id, [(j, 'X') for j in jogos[:700]]) == (len(set(jogos[:700])), 0, 0)
+        novos, ja_salvos, _ = modulo.salvar_jogos(user_id, [(j, 'X') for j in jogos])
+        assert novos == distintos - len(set(jogos[:700])) and ja_salvos == len(set(jogos[:700]))
+        assert JogoSalvo.query.count() == distintos
+
+def test_carteiras_separadas_por_usuario(app, cliente):
+    jogo = ", ".join(f"{n:02d}" for n in range(1, 16))
+    with app.app_context():
+        db.session.add(JogoSalvo(numeros=jogo, tipo='Outro', user_id=999)); db.session.commit()
+    assert cliente.post('/salvar-jogo', data={'numeros_salvar': jogo, 'tipo_salvar': 'Manual'}).get_json()['novos'] == 1
+    resposta = cliente.post('/salvar-jogo', data={'numeros_salvar': jogo}).get_json()
+    assert resposta['success'] and resposta['novos'] == 0 and 'já estava' in resposta['message']
+    assert not cliente.post('/salvar-jogo', data={'numeros_salvar': '1 2 3'}).get_json()['success']
+
+def test_rota_salvar_multiplos(app, cliente, monkeypatch):
+    jogos = [{'numeros': list(range(1, 16)), 'tipo': 'Estratégia Padrão'}, list(range(2, 17)), list(range(2, 17)), 'nada']
+    resposta = cliente.post('/salvar-multiplos', json={'jogos': jogos}).get_json()
+    assert (resposta['novos'], resposta['ja_salvos'], resposta['invalidos']) == (2, 0, 1)
+    assert resposta['message'] == '2 jogos salvos! 1 inválido ignorado.'
+    resposta = cliente.post('/salvar-multiplos', json={'jogos': jogos[:2]}).get_json()
+    assert resposta['message'] == '0 jogos salvos! 2 já estavam na sua carteira.'
+    assert not cliente.post('/salvar-multiplos', json={'jogos': []}).get_json()['success']
+    monkeypatch.setattr(modulo, 'MAX_JOGOS_POR_SALVAMENTO', 3)
+    assert 'no máximo 3' in cliente.post('/salvar-multiplos', json={'jogos': jogos}).get_json()['message']
+    assert app.test_client().post('/salvar-multiplos', json={'jogos': jogos}).status_code in (302, 401)
+
+def test_mensagem_salvamento():
+    assert modulo.mensagem_salvamento(1, 0, 0) == '1 jogo salvo!'
+    assert modulo.mensagem_salvamento(0, 2, 3) == '0 jogos salvos! 2 já estavam na sua carteira. 3 inválidos ignorados.'
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import app as modulo
+import tarefas
+from tarefas import FilaTarefas, LimiteTarefas, tipo_tarefa
+from modelos import db, User
+
+@tipo_tarefa('teste-eco')
+def tarefa_eco(execucao):
+    print("começou")
+    for i in range(1, execucao.parametros.get('passos', 1) + 1): execucao.progresso(i, execucao.parametros.get('passos', 1))
+    if execucao.parametros.get('falhar'): raise RuntimeError("deu errado")
+    if execucao.parametros.get('arquivo'):
+        with open(execucao.caminho('saida.txt'), 'w') as f: f.write(str(execucao.parametros))
+        return {'arquivo': 'saida.txt', 'nome': 'saida.txt', 'mime': 'text/plain', 'mensagem': 'pronto'}
+
+@pytest.fixture
+def fila(tmp_path, monkeypatch):
+    monkeypatch.setattr(tarefas, 'INTERVALO_PROGRESSO', 0)
+    return FilaTarefas(str(tmp_path / 'fila.db'), str(tmp_path / 'fila'))
+
+def test_ordem_de_chegada_e_sem_duplicar(fila, tmp_path):
+    ids = [fila.enfileirar('teste-eco', {'n': i}) for i in range(40)]
+    pegas, lock = [], threading.Lock()
+    def trabalhador():
+        propria = FilaTarefas(fila.arquivo, fila.pasta)  # como um processo do pool: conexão própria
+        while (tarefa := propria.pegar_proxima()) is not None:
+            with lock: pegas.append(tarefa['id'])
+    threads = [threading.Thread(target=trabalhador) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert sorted(pegas) == sorted(ids) and len(set(pegas)) == 40
+    assert fila.contagem() == {'rodando': 40}
+
+def test_fifo(fila):
+    primeira, segunda = fila.enfileirar('teste-eco', {}), fila.enfileirar('teste-eco', {})
+    assert fila.pegar_proxima()['id'] == primeira and fila.pegar_proxima()['id'] == segunda and fila.pegar_proxima() is None
+
+def test_reaproveitar(fila, app):
+    a = fila.enfileirar('teste-eco', {'x': 1, 'y': [2]}, reaproveitar=True)
+    assert fila.enfileirar('teste-eco', {'y': [2], 'x': 1}, reaproveitar=True) == a  # ordem das chaves não importa
+    assert fila.enfileirar('teste-eco', {'y': [2], 'x': 1}) != a
+    fila.executar(fila.pegar_proxima(), app)  # concluída sem arquivo próprio (só o log)
+    com_arquivo = fila.enfileirar('teste-eco', {'arquivo': True}, reaproveitar=True)
+    assert fila.pegar_proxima()['id'] != com_arquivo  # antes dela, a segunda 'x: 1'
+    fila.executar(fila.pegar_proxima(), app)
+    assert fila.enfileirar('teste-eco', {'arquivo': True}, reaproveitar=True) == com_arquivo
+    errada = fila.enfileirar('teste-eco', {'falhar': True}, reaproveitar=True)
+    fila.executar(fila.pegar_proxima(), app)
+    assert fila.enfileirar('teste-eco', {'falhar': True}, reaproveitar=True) != errada  # erro não é reaproveitado
+
+def test_limite_por_usuario(fila, app):
+    gravados = []
+    for i in range(2): fila.enfileirar('teste-eco', {'i': i}, user_id=7, maximo_ativas=2)
+    with pytest.raises(LimiteTarefas):
+        fila.enfileirar('teste-eco', {'i': 2}, user_id=7, maximo_ativas=2, anexos={'a.txt': gravados.append})
+    assert gravados == []  # o limite é conferido antes de gravar os anexos
+    assert fila.enfileirar('teste-eco', {}, user_id=8, maximo_ativas=2)  # outro usuário tem a própria cota
+    fila.executar(fila.pegar_proxima(), app)
+    assert fila.enfileirar('teste-eco', {'i': 3}, user_id=7, maximo_ativas=2)
+
+def test_tipo_desconhecido(fila):
+    with pytest.raises(ValueError):
+        fila.enfileirar('nao-existe', {})
+
+def test_executar(fila, app):
+    boa = fila.enfileirar('teste-eco', {'arquivo': True, 'passos': 3})
+    ruim = fila.enfileirar('teste-eco', {'falhar': True})
+    for _ in range(2): fila.executar(fila.pegar_proxima(), app)
+    boa, ruim = fila.obter(boa), fila.obter(ruim)
+    assert (boa['situacao'], boa['mensagem'], boa['feitos'], boa['total'], boa['arquivo']) == ('concluida', 'pronto', 3, 3, 'saida.txt')
+    assert (ruim['situacao'], ruim['mensagem'], ruim['arquivo']) == ('erro', 'deu errado', 'log.txt')
+    with open(os.path.join(fila.pasta_da(ruim['id']), 'log.txt'), encoding='utf-8') as f: assert f.read() == "começou\n"
+
+def test_cancelar(fila, app):
+    na_fila = fila.enfileirar('teste-eco', {})
+    assert fila.cancelar(na_fila) and fila.obter(na_fila)['situacao'] == 'cancelada' and fila.pegar_proxima() is None
+    rodando = fila.enfileirar('teste-eco', {'passos': 5})
+    tarefa = fila.pegar_proxima()
+    assert fila.cancelar(rodando) and fila.obter(rodando)['cancelar'] == 1
+    fila.executar(tarefa, app)  # para na primeira chamada de progresso
+    assert fila.obter(rodando)['situacao'] == 'cancelada' and fila.obter(rodando)['feitos'] == 1
+    assert not fila.cancelar(rodando)
+
+def test_orfas_e_antigas(fila, app, monkeypatch):
+    orfa = fila.enfileirar('teste-eco', {})
+    fila.pegar_proxima()
+    assert fila.recuperar_orfas(tempo=60) == 0
+    agora = time.time()
+    monkeypatch.setattr(tarefas.time, 'time', lambda: agora + 3600)
+    assert fila.recuperar_orfas(tempo=60) == 1 and fila.obter(orfa)['situacao'] == 'erro'
+    velha = fila.enfileirar('teste-eco', {'arquivo': True})
+    fila.executar(fila.pegar_proxima(), app)
+    monkeypatch.setattr(tarefas.time, 'time', lambda: agora + 8 * 86400)
+    assert fila.limpar_antigas(dias=7) == 2
+    assert fila.obter(velha) is None and not os.path.exists(fila.pasta_da(velha))
+
+def test_contagem_nao_cria_a_fila(tmp_path):
+    fila = FilaTarefas(str(tmp_path / 'nada.db'), str(tmp_path / 'nada'))
+    assert fila.contagem() == {} and not os.path.exists(tmp_path / 'nada.db')
+
+def test_rotas_de_tarefas(app, cliente, monkeypatch):
+    with app.app_context():
+        db.session.add(User(nome='Outra', email='outra@teste', senha=generate_password_hash('senha'))); db.session.commit()
+    outra = app.test_client()
+    outra.post('/login', data={'email': 'outra@teste', 'senha': 'senha'})
+    monkeypatch.setitem(tarefas.TIPOS, 'fechamento', tarefa_eco)  # compartilhada, sem calcular fechamento de verdade
+
+    with app.test_request_context(), app.app_context():
+        from flask_login import login_user
+        login_user(User.query.filter_by(email='admin@teste').one())
+        privada = modulo.enfileirar('teste-eco', {'arquivo': True})
+        compartilhada = modulo.enfileirar('fechamento', {'arquivo': True})
+        assert modulo.enfileirar('fechamento', {'arquivo': True}) == compartilhada
+    assert outra.get(f'/tarefas/{privada}').status_code == 404
+    assert outra.get(f'/tarefas/{compartilhada}').get_json()['tarefa']['situacao'] == 'fila'
+    assert outra.post(f'/tarefas/{compartilhada}/cancelar').status_code == 404  # vê, mas não cancela
+    assert app.test_client().get(f'/tarefas/{compartilhada}').status_code == 404
+    assert [t['id'] for t in outra.get('/tarefas').get_json()['tarefas']] == []
+
+    for _ in range(2): modulo.fila.executar(modulo.fila.pegar_proxima(), app)
+    assert outra.get(f'/tarefas/{compartilhada}/arquivo').get_data(as_text=True) == "{'arquivo': True}"
+    assert cliente.get(f'/tarefas/{privada}').get_json()['tarefa']['progresso'] == 1.0
+    assert cliente.post(f'/tarefas/{privada}/cancelar').status_code == 409
+
+    monkeypatch.setattr(modulo, 'TAREFAS_POR_USUARIO', 1)
+    monkeypatch.setattr(modulo, 'REPLAY_DIRETO', 0)
+    assert cliente.get('/api/v1/replay/surpresinha?semente=1').status_code == 202
+    assert cliente.get('/api/v1/replay/surpresinha?semente=1').status_code == 202  # a mesma: reaproveitada, não conta de novo
+    limite = cliente.get('/api/v1/replay/surpresinha?semente=2')
+    assert limite.status_code == 429 and 'tarefas em andamento' in limite.get_json()['message']
+    pagina = cliente.get('/exportar/csv?fundo=1', headers={'Referer': '/meus-jogos'}, follow_redirects=True)  # rota de página: avisa e volta
+    assert pagina.status_code == 200 and 'tarefas em andamento' in pagina.get_data(as_text=True)